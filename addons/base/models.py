@@ -1,10 +1,11 @@
 import abc
 import os
-import time
+from multiprocessing.pool import ThreadPool
 
 import markupsafe
 import requests
-from django.db import models
+from django.db import connections, models
+from django.db.models import prefetch_related_objects
 from framework.auth import Auth
 from framework.auth.decorators import must_be_logged_in
 from framework.exceptions import HTTPError, PermissionsError
@@ -16,9 +17,13 @@ from osf.models.user import OSFUser
 from osf.utils.datetime_aware_jsonfield import DateTimeAwareJSONField
 from website import settings
 from addons.base import logger, serializer
+from addons.base.utils import get_rate_limiter
 from website.oauth.signals import oauth_complete
 from website.util import waterbutler_api_url_for
 
+#: Shared so metadata requests made while walking file trees reuse connections to WaterButler
+waterbutler_session = requests.Session()
+
 lookup = TemplateLookup(
     directories=[
         settings.TEMPLATES_PATH
@@ -580,19 +585,72 @@ class BaseStorageAddon(object):
             **kwargs
         )
 
-        res = requests.get(metadata_url)
+        get_rate_limiter(self.config.short_name).consume()
+        res = waterbutler_session.get(metadata_url)
 
         if res.status_code != 200:
             raise HTTPError(res.status_code, data={'error': res.json()})
 
-        # TODO: better throttling?
-        time.sleep(1.0 / 5.0)
-
         data = res.json().get('data', None)
         if data:
             return [child['attributes'] for child in data]
         return []
 
+    @staticmethod
+    def _is_file_metadata(filenode):
+        return filenode.get('kind') == 'file' or 'size' in filenode
+
+    def _walk_file_tree(self, filenode, user=None, cookie=None, version=None):
+        """
+        Breadth-first walk of the folders below `filenode`, yielding `(folder, children)`
+        pairs. Every folder on a level is fetched concurrently, bounded by
+        FILE_TREE_WALK_CONCURRENCY and the provider's rate limiter. As with the former
+        recursive walk, `version` only applies to the children of `filenode`.
+        """
+        # Resolve anything that needs the database here rather than in the worker threads
+        if not cookie and user:
+            cookie = user.get_or_create_cookie()
+        prefetch_related_objects([self.owner], 'guids')
+
+        def fetch_children(args):
+            folder, folder_version = args
+            try:
+                return self._get_fileobj_child_metadata(folder, user, cookie=cookie, version=folder_version)
+            finally:
+                # Worker threads don't share this thread's connections, close any they opened
+                connections.close_all()
+
+        pool = ThreadPool(settings.FILE_TREE_WALK_CONCURRENCY)
+        try:
+            level = [(filenode, version)]
+            while level:
+                next_level = []
+                for (folder, _), children in zip(level, pool.map(fetch_children, level)):
+                    yield folder, children
+                    next_level.extend((child, None) for child in children if not self._is_file_metadata(child))
+                level = next_level
+        finally:
+            pool.terminate()
+
+    def _iter_file_tree_files(self, filenode=None, user=None, cookie=None, version=None):
+        """
+        Yield `(sha256, metadata)` for every file below `filenode` without keeping the
+        whole tree in memory
+        """
+        filenode = filenode or {
+            'path': '/',
+            'kind': 'folder',
+            'name': self.root_node.name,
+        }
+        if self._is_file_metadata(filenode):
+            yield filenode['extra']['hashes']['sha256'], filenode
+            return
+
+        for folder, children in self._walk_file_tree(filenode, user, cookie=cookie, version=version):
+            for child in children:
+                if self._is_file_metadata(child):
+                    yield child['extra']['hashes']['sha256'], child
+
     def _get_file_tree(self, filenode=None, user=None, cookie=None, version=None):
         """
         Recursively get file metadata
@@ -602,17 +660,14 @@ class BaseStorageAddon(object):
             'kind': 'folder',
             'name': self.root_node.name,
         }
-        if filenode.get('kind') == 'file' or 'size' in filenode:
+        if self._is_file_metadata(filenode):
             return filenode
 
-        kwargs = {
-            'version': version,
-            'cookie': cookie,
-        }
-        filenode['children'] = [
-            self._get_file_tree(child, user, cookie=cookie)
-            for child in self._get_fileobj_child_metadata(filenode, user, **kwargs)
-        ]
+        for folder, children in self._walk_file_tree(filenode, user, cookie=cookie, version=version):
+            folder['children'] = children
+            for child in children:
+                if not self._is_file_metadata(child):
+                    child['children'] = []
         return filenode
 
 
@@ -1,3 +1,5 @@
+import threading
+import time
 from os.path import basename
 
 from website import settings
@@ -20,3 +22,42 @@ def serialize_addon_config(config, user):
 def get_addons_by_config_type(config_type, user):
     addons = [addon for addon in settings.ADDONS_AVAILABLE if config_type in addon.configs]
     return [serialize_addon_config(addon_config, user) for addon_config in sorted(addons, key=lambda cfg: cfg.full_name.lower())]
+
+
+class TokenBucket(object):
+    """Thread-safe token bucket. `consume` blocks until a token is available, allowing
+    bursts of up to `capacity` calls and `rate` calls per second on average.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = self.capacity
+        self.updated = time.time()
+        self.lock = threading.Lock()
+
+    def consume(self):
+        while True:
+            with self.lock:
+                now = time.time()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+def get_rate_limiter(provider):
+    """Return the process-wide `TokenBucket` that throttles WaterButler requests for `provider`"""
+    with _rate_limiters_lock:
+        if provider not in _rate_limiters:
+            _rate_limiters[provider] = TokenBucket(
+                rate=settings.WATERBUTLER_METADATA_RATE_LIMIT,
+                capacity=settings.WATERBUTLER_METADATA_BURST,
+            )
+        return _rate_limiters[provider]
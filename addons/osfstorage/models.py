@@ -22,44 +22,55 @@ logger = logging.getLogger(__name__)
 class OsfStorageFileNode(BaseFileNode):
     _provider = 'osfstorage'
 
+    # Rewrites the stored paths of everything under a folder after it is
+    # renamed or moved, by replacing the folder's old path prefix
+    SUBTREE_PATH_QUERY = """
+        WITH RECURSIVE descendants(id) AS (
+          SELECT T.id
+          FROM %s AS T
+          WHERE T.parent_id = %s
+          UNION ALL
+          SELECT T.id
+          FROM descendants AS D
+            JOIN %s AS T ON T.parent_id = D.id
+        )
+        UPDATE %s
+        SET _materialized_path = %s || substr(_materialized_path, %s)
+        WHERE id IN (SELECT id FROM descendants);
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        inst = super(OsfStorageFileNode, cls).from_db(db, field_names, values)
+        inst._remember_location()
+        return inst
+
+    def _remember_location(self):
+        self._original_location = (self.__dict__.get('parent_id'), self.__dict__.get('name'))
+
     @property
     def materialized_path(self):
-        sql = """
-            WITH RECURSIVE materialized_path_cte(parent_id, GEN_PATH) AS (
-              SELECT
-                T.parent_id,
-                T.name :: TEXT AS GEN_PATH
-              FROM %s AS T
-              WHERE T.id = %s
-              UNION ALL
-              SELECT
-                T.parent_id,
-                (T.name || '/' || R.GEN_PATH) AS GEN_PATH
-              FROM materialized_path_cte AS R
-                JOIN %s AS T ON T.id = R.parent_id
-              WHERE R.parent_id IS NOT NULL
-            )
-            SELECT gen_path
-            FROM materialized_path_cte AS N
-            WHERE parent_id IS NULL
-            LIMIT 1;
+        """The path of the file from the root folder, stored in ``_materialized_path``
+        and kept up to date by `save` when the file is created, renamed or moved.
         """
-        with connection.cursor() as cursor:
-            cursor.execute(sql, [AsIs(self._meta.db_table), self.pk, AsIs(self._meta.db_table)])
-            row = cursor.fetchone()
-            if not row:
-                return '/'
-
-            path = row[0]
-            if not self.is_file:
-                path = path + '/'
-            return path
+        return self._materialized_path or '/'
 
     @materialized_path.setter
     def materialized_path(self, val):
         # raise Exception('Cannot set materialized path on OSFStorage as it is computed.')
         logger.warn('Cannot set materialized path on OSFStorage because it\'s computed.')
 
+    def _compute_materialized_path(self):
+        suffix = '' if self.is_file else '/'
+        if self.parent_id is None:
+            return self.name + suffix
+        return self.parent.materialized_path + self.name + suffix
+
+    def _update_descendant_paths(self, old_path, new_path):
+        table = AsIs(self._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(self.SUBTREE_PATH_QUERY, [table, self.pk, table, table, new_path, len(old_path) + 1])
+
     @classmethod
     def get(cls, _id, node):
         return cls.objects.get(_id=_id, node=node)
@@ -141,7 +152,6 @@ class OsfStorageFileNode(BaseFileNode):
 
     def delete(self, user=None, parent=None, **kwargs):
         self._path = self.path
-        self._materialized_path = self.materialized_path
         return super(OsfStorageFileNode, self).delete(user=user, parent=parent) if self._check_delete_allowed() else None
 
     def move_under(self, destination_parent, name=None):
@@ -198,8 +208,14 @@ class OsfStorageFileNode(BaseFileNode):
 
     def save(self):
         self._path = ''
-        self._materialized_path = ''
-        return super(OsfStorageFileNode, self).save()
+        old_path = self._materialized_path
+        if not old_path or getattr(self, '_original_location', None) != (self.parent_id, self.name):
+            self._materialized_path = self._compute_materialized_path()
+        ret = super(OsfStorageFileNode, self).save()
+        if old_path and old_path != self._materialized_path and not self.is_file:
+            self._update_descendant_paths(old_path, self._materialized_path)
+        self._remember_location()
+        return ret
 
 
 class OsfStorageFile(OsfStorageFileNode, File):
@@ -248,10 +264,32 @@ class OsfStorageFile(OsfStorageFileNode, File):
 
         version.save()
         self.versions.add(version)
+        self.latest_version = version
+        self.earliest_version_id = self.earliest_version_id or version.id
+        self.version_count = int(version.identifier)
         self.save()
 
         return version
 
+    def update_version_fields(self, save=True):
+        """Recompute the denormalized version fields after versions were added
+        other than by `create_version`.
+        """
+        versions = self.versions.order_by('created')
+        self.earliest_version = versions.first()
+        self.latest_version = versions.last()
+        self.version_count = versions.count()
+        if save:
+            self.save()
+
+    def clone(self):
+        cloned = super(OsfStorageFile, self).clone()
+        # copy_files gives the copy the same versions, but downloads are counted per file
+        cloned.latest_version_id = self.latest_version_id
+        cloned.earliest_version_id = self.earliest_version_id
+        cloned.download_count = 0
+        return cloned
+
     def get_version(self, version=None, required=False):
         if version is None:
             if self.versions.exists():
@@ -333,37 +371,18 @@ class OsfStorageFile(OsfStorageFileNode, File):
 class OsfStorageFolder(OsfStorageFileNode, Folder):
 
     @property
-    def is_checked_out(self):
-        sql = """
-            WITH RECURSIVE is_checked_out_cte(id, parent_id, checkout_id) AS (
-              SELECT
-                T.id,
-                T.parent_id,
-                T.checkout_id
-              FROM %s AS T
-              WHERE T.id = %s
-              UNION ALL
-              SELECT
-                T.id,
-                T.parent_id,
-                T.checkout_id
-              FROM is_checked_out_cte AS R
-                JOIN %s AS T ON T.parent_id = R.id
-            )
-            SELECT N.checkout_id
-            FROM is_checked_out_cte as N
-            WHERE N.checkout_id IS NOT NULL
-            LIMIT 1;
+    def descendants(self):
+        """Files and folders anywhere under this folder, found by the prefix of
+        their materialized path.
         """
+        return OsfStorageFileNode.objects.filter(
+            node_id=self.node_id,
+            _materialized_path__startswith=self.materialized_path
+        ).exclude(id=self.id)
 
-        with connection.cursor() as cursor:
-            cursor.execute(sql, [AsIs(self._meta.db_table), self.pk, AsIs(self._meta.db_table)])
-            row = cursor.fetchone()
-
-            if row and row[0]:
-                return True
-
-        return False
+    @property
+    def is_checked_out(self):
+        return self.checkout_id is not None or self.descendants.filter(checkout__isnull=False).exists()
 
     @property
     def is_preprint_primary(self):
@@ -5,6 +5,8 @@ import unittest
 
 import pytest
 import pytz
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from nose.tools import *  # noqa
 
@@ -251,6 +253,45 @@ class TestOsfstorageFileNode(StorageTestCase):
         child = self.node_settings.get_root().append_folder('Cloud').append_file('Carp')
         assert_equals('/Cloud/Carp', child.materialized_path)
 
+    def test_materialized_path_is_stored(self):
+        child = self.node_settings.get_root().append_folder('Cloud').append_file('Carp')
+        child = OsfStorageFileNode.load(child._id)
+        with CaptureQueriesContext(connection) as queries:
+            assert_equals('/Cloud/Carp', child.materialized_path)
+        assert_equal(len(queries), 0)
+
+    def test_materialized_path_move_folder(self):
+        root = self.node_settings.get_root()
+        to_move = root.append_folder('Carp')
+        child = to_move.append_folder('Fish').append_file('Tuna')
+        move_to = root.append_folder('Cloud')
+
+        to_move.move_under(move_to, name='Koi')
+        child.reload()
+
+        assert_equals('/Cloud/Koi/', to_move.materialized_path)
+        assert_equals('/Cloud/Koi/Fish/Tuna', child.materialized_path)
+
+    def test_materialized_path_move_across_nodes(self):
+        other_node_settings = ProjectFactory().get_addon('osfstorage')
+        to_move = self.node_settings.get_root().append_folder('Carp')
+        child = to_move.append_file('Tuna')
+
+        to_move.move_under(other_node_settings.get_root().append_folder('Cloud'))
+        child.reload()
+
+        assert_equals('/Cloud/Carp/Tuna', child.materialized_path)
+        assert_equal(other_node_settings.owner, child.node)
+
+    def test_descendants(self):
+        root = self.node_settings.get_root()
+        folder = root.append_folder('Cloud')
+        child = folder.append_file('Carp')
+        nested = folder.append_folder('Fish').append_file('Tuna')
+        root.append_file('Cloudy')
+
+        assert_equal(set(folder.descendants), {child, nested, nested.parent})
+
     def test_copy(self):
         to_copy = self.node_settings.get_root().append_file('Carp')
         copy_to = self.node_settings.get_root().append_folder('Cloud')
@@ -599,6 +640,37 @@ class TestOsfStorageFileVersion(StorageTestCase):
         assert_false(version1.is_duplicate(version2))
         assert_false(version2.is_duplicate(version1))
 
+    def test_create_version_updates_version_fields(self):
+        fnode = self.node_settings.get_root().append_file('MyCoolTestFile')
+        locations = [
+            {'service': 'cloud', settings.WATERBUTLER_RESOURCE: 'osf', 'object': obj}
+            for obj in ('06d80e', 'd077f2')
+        ]
+        version1 = fnode.create_version(self.user, locations[0])
+        version2 = fnode.create_version(self.user, locations[1])
+        fnode.create_version(self.user, locations[1])  # Duplicate
+
+        fnode.reload()
+        assert_equal(fnode.version_count, 2)
+        assert_equal(fnode.earliest_version, version1)
+        assert_equal(fnode.latest_version, version2)
+
+    def test_copy_resets_download_count(self):
+        root = self.node_settings.get_root()
+        fnode = root.append_file('MyCoolTestFile')
+        version = fnode.create_version(self.user, {
+            'service': 'cloud', settings.WATERBUTLER_RESOURCE: 'osf', 'object': '06d80e'
+        })
+        fnode.download_count = 5
+        fnode.save()
+
+        copied = fnode.copy_under(root.append_folder('Cloud'))
+        copied.reload()
+        assert_equal(copied.download_count, 0)
+        assert_equal(copied.version_count, 1)
+        assert_equal(copied.latest_version, version)
+        assert_equal(copied.earliest_version, version)
+
     def test_validate_location(self):
         creator = factories.AuthUserFactory()
         version = factories.FileVersionFactory.build(creator=creator, location={'invalid': True})
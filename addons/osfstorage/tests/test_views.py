@@ -81,7 +81,7 @@ class TestGetMetadataHook(HookTestCase):
         record = recursively_create_file(self.node_settings, path)
         version = factories.FileVersionFactory()
         record.versions.add(version)
-        record.save()
+        record.update_version_fields()
         res = self.send_hook(
             'osfstorage_get_children',
             {'fid': record.parent._id},
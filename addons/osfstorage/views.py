@@ -67,8 +67,7 @@ def osfstorage_get_revisions(file_node, node_addon, payload, **kwargs):
     counter_prefix = 'download:{}:{}:'.format(file_node.node._id, file_node._id)
 
     version_count = file_node.versions.count()
-    # Don't worry. The only % at the end of the LIKE clause, the index is still used
-    counts = dict(PageCounter.objects.filter(_id__startswith=counter_prefix).values_list('_id', 'total'))
+    counts = PageCounter.get_download_counts(counter_prefix)
     qs = FileVersion.includable_objects.filter(basefilenode__id=file_node.id).include('creator__guids').order_by('-created')
 
     for i, version in enumerate(qs):
@@ -140,8 +139,8 @@ def osfstorage_get_children(file_node, **kwargs):
                         , 'name', F.name
                         , 'kind', 'file'
                         , 'size', LATEST_VERSION.size
-                        , 'downloads',  COALESCE(DOWNLOAD_COUNT, 0)
-                        , 'version', (SELECT COUNT(*) FROM osf_basefilenode_versions WHERE osf_basefilenode_versions.basefilenode_id = F.id)
+                        , 'downloads', F.download_count
+                        , 'version', F.version_count
                         , 'contentType', LATEST_VERSION.content_type
                         , 'modified', LATEST_VERSION.created
                         , 'created', EARLIEST_VERSION.created
@@ -159,34 +158,18 @@ def osfstorage_get_children(file_node, **kwargs):
                 END
             )
             FROM osf_basefilenode AS F
-            LEFT JOIN LATERAL (
-                SELECT * FROM osf_fileversion
-                JOIN osf_basefilenode_versions ON osf_fileversion.id = osf_basefilenode_versions.fileversion_id
-                WHERE osf_basefilenode_versions.basefilenode_id = F.id
-                ORDER BY created DESC
-                LIMIT 1
-            ) LATEST_VERSION ON TRUE
-            LEFT JOIN LATERAL (
-                SELECT * FROM osf_fileversion
-                JOIN osf_basefilenode_versions ON osf_fileversion.id = osf_basefilenode_versions.fileversion_id
-                WHERE osf_basefilenode_versions.basefilenode_id = F.id
-                ORDER BY created ASC
-                LIMIT 1
-            ) EARLIEST_VERSION ON TRUE
+            -- Maintained by OsfStorageFile.create_version and PageCounter.fold_increments
+            LEFT JOIN osf_fileversion AS LATEST_VERSION ON LATEST_VERSION.id = F.latest_version_id
+            LEFT JOIN osf_fileversion AS EARLIEST_VERSION ON EARLIEST_VERSION.id = F.earliest_version_id
             LEFT JOIN LATERAL (
                 SELECT _id from osf_guid
                 WHERE object_id = F.checkout_id
                 AND content_type_id = %s
                 LIMIT 1
             ) CHECKOUT_GUID ON TRUE
-            LEFT JOIN LATERAL (
-                SELECT P.total AS DOWNLOAD_COUNT FROM osf_pagecounter AS P
-                WHERE P._id = 'download:' || %s || ':' || F._id
-                LIMIT 1
-            ) DOWNLOAD_COUNT ON TRUE
             WHERE parent_id = %s
             AND (NOT F.type IN ('osf.trashedfilenode', 'osf.trashedfile', 'osf.trashedfolder'))
-        ''', [ContentType.objects.get_for_model(OSFUser).id, file_node.node._id, file_node.id])
+        ''', [ContentType.objects.get_for_model(OSFUser).id, file_node.id])
 
         return cursor.fetchone()[0] or []
 
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.7 on 2017-12-21 14:03
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0080_nodecsl'),
+        ('addons_wiki', '0005_auto_20170713_1125'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RenderedWiki',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('renderer_version', models.PositiveIntegerField()),
+                ('html', models.TextField(blank=True)),
+                ('text', models.TextField(blank=True)),
+                ('node', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='osf.AbstractNode')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='renderedwiki',
+            unique_together=set([('node', 'content_hash', 'renderer_version')]),
+        ),
+    ]
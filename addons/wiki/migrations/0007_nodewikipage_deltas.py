@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.7 on 2017-12-22 11:40
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import osf.utils.datetime_aware_jsonfield
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('addons_wiki', '0006_renderedwiki'),
+    ]
+
+    operations = [
+        # The column keeps its name, only the model field is renamed
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RenameField(
+                    model_name='nodewikipage',
+                    old_name='content',
+                    new_name='_content',
+                ),
+                migrations.AlterField(
+                    model_name='nodewikipage',
+                    name='_content',
+                    field=models.TextField(blank=True, db_column='content', default=''),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='nodewikipage',
+            name='base',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='addons_wiki.NodeWikiPage'),
+        ),
+        migrations.AddField(
+            model_name='nodewikipage',
+            name='content_delta',
+            field=osf.utils.datetime_aware_jsonfield.DateTimeAwareJSONField(blank=True, null=True),
+        ),
+    ]
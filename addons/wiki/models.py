@@ -1,19 +1,27 @@
 # -*- coding: utf-8 -*-
+import collections
 import datetime
 import functools
+import hashlib
+import json
 import logging
+import threading
 
 import markdown
 import pytz
 from addons.base.models import BaseNodeSettings
 from bleach.callbacks import nofollow
-from django.db import models
+from django.db import connection, models
+from django.db.models import Q
+from django.utils import timezone
 from framework.forms.utils import sanitize
 from markdown.extensions import codehilite, fenced_code, wikilinks
 from osf.models import AbstractNode, NodeLog
 from osf.models.base import BaseModel, GuidMixin
+from osf.utils.datetime_aware_jsonfield import DateTimeAwareJSONField
 from osf.utils.fields import NonNaiveDateTimeField
 from website import settings
+from addons.wiki import settings as wiki_settings
 from addons.wiki import utils as wiki_utils
 from website.exceptions import NodeStateError
 from website.util import api_v2_url
@@ -36,6 +44,27 @@ SHAREJS_DB_URL = 'mongodb://{}:{}/{}'.format(settings.DB_HOST, settings.DB_PORT,
 # TODO: Change to release date for wiki change
 WIKI_CHANGE_DATE = datetime.datetime.utcfromtimestamp(1423760098).replace(tzinfo=pytz.utc)
 
+# Content of versions stored as deltas, and of their keyframes, by primary key,
+# least recently used first
+_versions = collections.OrderedDict()
+_versions_lock = threading.Lock()
+
+
+def get_cached_version(pk):
+    with _versions_lock:
+        content = _versions.pop(pk, None)
+        if content is not None:
+            _versions[pk] = content
+        return content
+
+
+def cache_version(pk, content):
+    with _versions_lock:
+        _versions[pk] = content
+        while len(_versions) > wiki_settings.VERSION_CACHE_SIZE:
+            _versions.popitem(last=False)
+
+
 def validate_page_name(value):
     value = (value or '').strip()
 
@@ -73,17 +102,185 @@ def render_content(content, node):
     return sanitized_content
 
 
+def render_html(content, node):
+    """The cleaned and linkified HTML of wiki content"""
+    sanitized_content = render_content(content, node=node)
+    try:
+        from bleach import linkify
+
+        return linkify(
+            sanitized_content,
+            [nofollow, ],
+        )
+    except TypeError:
+        logger.warning('Returning unlinkified content.')
+        return sanitized_content
+
+
 def build_wiki_url(node, label, base, end):
     return '/{pid}/wiki/{wname}/'.format(pid=node._id, wname=label)
 
 
+class RenderedWiki(BaseModel):
+    """HTML and plain text of wiki content as rendered by `render_html` for a
+    node, shared by every version and copy of a page with the same content.
+
+    Wiki links point into the node, so the node is part of the key. Bump
+    RENDERER_VERSION whenever the output of `render_html` changes, e.g. with
+    new Markdown extensions or a new WIKI_WHITELIST; rows of older versions are
+    then ignored.
+    """
+    RENDERER_VERSION = 1
+
+    # Renderings made concurrently are the same, keep whichever was stored first
+    INSERT_QUERY = '''
+        INSERT INTO "{table}" (created, modified, node_id, content_hash, renderer_version, html, text)
+        VALUES {values}
+        ON CONFLICT (node_id, content_hash, renderer_version) DO NOTHING;
+    '''
+
+    node = models.ForeignKey('osf.AbstractNode', on_delete=models.CASCADE)
+    content_hash = models.CharField(max_length=64)
+    renderer_version = models.PositiveIntegerField()
+    html = models.TextField(blank=True)
+    text = models.TextField(blank=True)
+
+    class Meta:
+        unique_together = ('node', 'content_hash', 'renderer_version')
+
+    @staticmethod
+    def hash_content(content):
+        return hashlib.sha256((content or '').encode('utf-8')).hexdigest()
+
+    @classmethod
+    def render(cls, content, node):
+        html = render_html(content, node)
+        return cls(
+            node=node,
+            content_hash=cls.hash_content(content),
+            renderer_version=cls.RENDERER_VERSION,
+            html=html,
+            text=sanitize(html, tags=[], strip=True),
+        )
+
+    @classmethod
+    def get(cls, content, node):
+        """Return the rendering of `content` for `node`, rendering and storing it on a miss."""
+        return cls.get_many([(content, node)])[0]
+
+    @classmethod
+    def get_many(cls, items):
+        """Return the renderings of many (content, node) pairs, in order, with one
+        query for the stored ones and one insert for the rest.
+        """
+        keys = [(node.id, cls.hash_content(content)) for content, node in items]
+        stored = {
+            (rendered.node_id, rendered.content_hash): rendered
+            for rendered in cls.objects.filter(
+                renderer_version=cls.RENDERER_VERSION,
+                node_id__in=set(node_id for node_id, _ in keys),
+                content_hash__in=set(content_hash for _, content_hash in keys),
+            )
+        }
+        missing = {}
+        for key, (content, node) in zip(keys, items):
+            if key not in stored and key not in missing:
+                missing[key] = cls.render(content, node)
+        if missing:
+            cls._insert(missing.values())
+            stored.update(missing)
+        return [stored[key] for key in keys]
+
+    @classmethod
+    def _insert(cls, renderings):
+        now = timezone.now()
+        params = []
+        for rendered in renderings:
+            params.extend([now, now, rendered.node_id, rendered.content_hash, rendered.renderer_version, rendered.html, rendered.text])
+        with connection.cursor() as cursor:
+            cursor.execute(cls.INSERT_QUERY.format(
+                table=cls._meta.db_table,
+                values=', '.join(['(%s, %s, %s, %s, %s, %s, %s)'] * len(renderings)),
+            ), params)
+
+    @classmethod
+    def unused(cls, nodes, before=None):
+        """Return the renderings for `nodes` that none of their current wiki pages
+        use: those of older renderer versions and, if created before `before`,
+        those of content that has since been edited.
+        """
+        wiki_ids = [wiki_id for node in nodes for wiki_id in node.wiki_pages_current.values()]
+        used = {
+            (page.node_id, cls.hash_content(page.content))
+            for page in NodeWikiPage.objects.filter(guids___id__in=wiki_ids)
+        }
+        renderings = cls.objects.filter(node__in=nodes)
+        edited = renderings.filter(renderer_version=cls.RENDERER_VERSION)
+        if before:
+            edited = edited.filter(created__lt=before)
+        edited_ids = [
+            pk for pk, node_id, content_hash in edited.values_list('id', 'node_id', 'content_hash')
+            if (node_id, content_hash) not in used
+        ]
+        return renderings.filter(~Q(renderer_version=cls.RENDERER_VERSION) | Q(id__in=edited_ids))
+
+    @classmethod
+    def prerender(cls, nodes):
+        """Render the current wiki pages of `nodes` ahead of e.g. a search reindex.
+
+        :return: Number of pages
+        """
+        wiki_ids = [wiki_id for node in nodes for wiki_id in node.wiki_pages_current.values()]
+        pages = NodeWikiPage.objects.filter(guids___id__in=wiki_ids).select_related('node')
+        return len(cls.get_many([(page.content, page.node) for page in pages]))
+
+
 class NodeWikiPage(GuidMixin, BaseModel):
     page_name = models.CharField(max_length=200, validators=[validate_page_name, ])
     version = models.IntegerField(default=1)
     date = NonNaiveDateTimeField(auto_now_add=True)
-    content = models.TextField(default='', blank=True)
+    _content = models.TextField(default='', blank=True, db_column='content')
     user = models.ForeignKey('osf.OSFUser', null=True, blank=True, on_delete=models.CASCADE)
     node = models.ForeignKey('osf.AbstractNode', null=True, blank=True, on_delete=models.CASCADE)
+    # Versions stored as a delta are rebuilt from the content of the keyframe
+    # version `base` and `content_delta`, see `store_as_delta`
+    base = models.ForeignKey('self', null=True, blank=True, related_name='+', on_delete=models.CASCADE)
+    content_delta = DateTimeAwareJSONField(null=True, blank=True)
+
+    @property
+    def content(self):
+        if self.content_delta is None:
+            return self._content
+        content = get_cached_version(self.pk)
+        if content is None:
+            base_content = get_cached_version(self.base_id)
+            if base_content is None:
+                base_content = NodeWikiPage.objects.filter(pk=self.base_id).values_list('_content', flat=True).get()
+                cache_version(self.base_id, base_content)
+            content = wiki_utils.apply_delta(base_content, self.content_delta)
+            cache_version(self.pk, content)
+        return content
+
+    @content.setter
+    def content(self, value):
+        self._content = value
+        self.base_id = None
+        self.content_delta = None
+
+    def store_as_delta(self, previous):
+        """Store the content of this new version as a delta against the keyframe
+        of `previous`, the page's previous version, unless it is time for a new
+        keyframe.
+        """
+        keyframe = previous if previous.content_delta is None else previous.base
+        if self.version - keyframe.version >= wiki_settings.KEYFRAME_INTERVAL:
+            return
+        delta = wiki_utils.make_delta(keyframe.content, self._content)
+        if len(json.dumps(delta)) > len(self._content) * wiki_settings.KEYFRAME_DELTA_RATIO:
+            return
+        self._content = ''
+        self.base = keyframe
+        self.content_delta = delta
 
     @property
     def is_current(self):
@@ -139,22 +336,12 @@ class NodeWikiPage(GuidMixin, BaseModel):
 
     def html(self, node):
         """The cleaned HTML of the page"""
-        sanitized_content = render_content(self.content, node=node)
-        try:
-            from bleach import linkify
-
-            return linkify(
-                sanitized_content,
-                [nofollow, ],
-            )
-        except TypeError:
-            logger.warning('Returning unlinkified content.')
-            return sanitized_content
+        return RenderedWiki.get(self.content, node).html
 
     def raw_text(self, node):
         """ The raw text of the page, suitable for using in a test search"""
 
-        return sanitize(self.html(node), tags=[], strip=True)
+        return RenderedWiki.get(self.content, node).text
 
     def get_draft(self, node):
         """
@@ -208,9 +395,10 @@ class NodeWikiPage(GuidMixin, BaseModel):
     def to_json(self):
         return {}
 
-    def clone_wiki(self, node_id):
+    def clone_wiki(self, node_id, base=None):
         """Clone a node wiki page.
         :param node: The Node of the cloned wiki page
+        :param base: The clone of this page's keyframe, if it is stored as a delta
         :return: The cloned wiki page
         """
         node = AbstractNode.load(node_id)
@@ -219,6 +407,11 @@ class NodeWikiPage(GuidMixin, BaseModel):
         clone = self.clone()
         clone.node = node
         clone.user = self.user
+        if self.content_delta is not None:
+            if base:
+                clone.base = base
+            else:
+                clone.content = self.content
         clone.save()
         return clone
 
@@ -236,9 +429,11 @@ class NodeWikiPage(GuidMixin, BaseModel):
 
         for key in node.wiki_pages_versions:
             copy.wiki_pages_versions[key] = []
+            clones = {}
             for wiki_id in node.wiki_pages_versions[key]:
                 node_wiki = NodeWikiPage.load(wiki_id)
-                cloned_wiki = node_wiki.clone_wiki(copy._id)
+                cloned_wiki = node_wiki.clone_wiki(copy._id, base=clones.get(node_wiki.base_id))
+                clones[node_wiki.pk] = cloned_wiki
                 copy.wiki_pages_versions[key].append(cloned_wiki._id)
                 if node_wiki.is_current:
                     copy.wiki_pages_current[key] = cloned_wiki._id
@@ -13,3 +13,16 @@ SHAREJS_DB_URL = os.environ.get('SHAREJS_DB_URL', 'mongodb://{}:{}/{}'.format(se
 
 # TODO: Change to release date for wiki change
 WIKI_CHANGE_DATE = datetime.datetime.utcfromtimestamp(1423760098).replace(tzinfo=pytz.utc)
+
+# Store new versions of wiki pages as deltas against the latest keyframe
+# version instead of the full content
+DELTA_STORAGE = False
+# Store a full keyframe at least every this many versions of a page, or when
+# a delta is larger than this fraction of the content
+KEYFRAME_INTERVAL = 20
+KEYFRAME_DELTA_RATIO = 0.5
+# Number of reconstructed versions kept in memory by each process
+VERSION_CACHE_SIZE = 200
+# Renderings of edited wiki content are kept for this long before
+# scripts.remove_unused_rendered_wikis deletes them
+RENDERED_WIKI_RETENTION = datetime.timedelta(days=7)
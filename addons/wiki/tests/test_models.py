@@ -1,8 +1,14 @@
+import datetime
+
 import pytest
+from django.utils import timezone
 
+from addons.wiki import settings as wiki_settings
 from addons.wiki.exceptions import NameMaximumLengthError
 
-from addons.wiki.models import NodeWikiPage
+from addons.wiki.models import NodeWikiPage, RenderedWiki, render_html
+from addons.wiki.utils import apply_delta, make_delta
+from framework.auth import Auth
 from addons.wiki.tests.factories import NodeWikiFactory
 from osf_tests.factories import NodeFactory, UserFactory, ProjectFactory
 from tests.base import OsfTestCase
@@ -48,6 +54,131 @@ class TestNodeWikiPageModel:
         assert ver.is_current is False
 
 
+class TestRenderedWiki:
+
+    def test_html_is_rendered_once(self):
+        node = NodeFactory()
+        ver1 = NodeWikiPage(page_name='foo', node=node, content='[[bar]] *baz*')
+        ver2 = NodeWikiPage(page_name='foo', node=node, content='[[bar]] *baz*')
+        ver1.save()
+        ver2.save()
+
+        assert ver1.html(node) == render_html('[[bar]] *baz*', node)
+        assert ver1.raw_text(node) == 'bar baz'
+        assert ver2.html(node) == ver1.html(node)
+        assert RenderedWiki.objects.filter(node=node).count() == 1
+
+    def test_keyed_by_node_and_content(self):
+        node, other_node = NodeFactory(), NodeFactory()
+        page = NodeWikiPage(page_name='foo', node=node, content='[[bar]]')
+        page.save()
+
+        assert node._id in page.html(node)
+        assert other_node._id in page.html(other_node)
+        page.content = '[[baz]]'
+        assert 'baz' in page.html(node)
+        assert RenderedWiki.objects.count() == 3
+
+    def test_renderer_version(self, monkeypatch):
+        node = NodeFactory()
+        RenderedWiki.get('*foo*', node)
+        monkeypatch.setattr(RenderedWiki, 'RENDERER_VERSION', RenderedWiki.RENDERER_VERSION + 1)
+        RenderedWiki.get('*foo*', node)
+        assert RenderedWiki.objects.filter(node=node).count() == 2
+
+    def test_prerender(self):
+        nodes = [NodeFactory(), NodeFactory()]
+        for node in nodes:
+            page = NodeWikiPage(page_name='home', node=node, content='Hello')
+            page.save()
+            node.wiki_pages_current['home'] = page._id
+            node.save()
+
+        assert RenderedWiki.prerender(nodes) == 2
+        assert RenderedWiki.objects.filter(node__in=nodes).count() == 2
+
+    def test_conflicting_renderings_are_skipped(self):
+        node = NodeFactory()
+        RenderedWiki.get('*foo*', node)
+        RenderedWiki._insert([RenderedWiki.render('*foo*', node), RenderedWiki.render('*bar*', node)])
+        assert RenderedWiki.objects.filter(node=node).count() == 2
+
+    def test_unused(self, monkeypatch):
+        node = NodeFactory()
+        node.update_node_wiki('home', '*foo*', Auth(node.creator))
+        node.get_wiki_page('home').html(node)
+        node.update_node_wiki('home', '*bar*', Auth(node.creator))
+        current = node.get_wiki_page('home')
+        current.html(node)
+        # Renderings of edited content are kept until they are old enough
+        assert list(RenderedWiki.unused([node], before=timezone.now() - datetime.timedelta(days=1))) == []
+
+        previous = RenderedWiki.objects.get(node=node, content_hash=RenderedWiki.hash_content('*foo*'))
+        assert list(RenderedWiki.unused([node], before=timezone.now())) == [previous]
+        assert list(RenderedWiki.unused([node])) == [previous]
+
+        monkeypatch.setattr(RenderedWiki, 'RENDERER_VERSION', RenderedWiki.RENDERER_VERSION + 1)
+        assert RenderedWiki.unused([node]).count() == 2
+
+
+class TestDeltaStorage:
+
+    @pytest.fixture(autouse=True)
+    def delta_storage(self, monkeypatch):
+        monkeypatch.setattr(wiki_settings, 'DELTA_STORAGE', True)
+        monkeypatch.setattr(wiki_settings, 'KEYFRAME_INTERVAL', 3)
+
+    @pytest.fixture()
+    def project(self):
+        return ProjectFactory()
+
+    def contents(self, version):
+        return '\n'.join('line {}'.format(i) for i in range(20)) + '\nversion {}\n'.format(version)
+
+    def update(self, project, versions):
+        for version in range(1, versions + 1):
+            project.update_node_wiki('home', self.contents(version), Auth(project.creator))
+
+    def test_make_delta(self):
+        base = 'foo\nbar\nbaz\n'
+        content = 'foo\nqux\nbaz\nquux'
+        delta = make_delta(base, content)
+        assert delta == [[0, 1], 'qux\n', [2, 3], 'quux']
+        assert apply_delta(base, delta) == content
+
+    def test_versions_are_rebuilt(self, project):
+        self.update(project, 7)
+        versions = [NodeWikiPage.load(_id) for _id in project.wiki_pages_versions['home']]
+
+        assert [version.content for version in versions] == [self.contents(i) for i in range(1, 8)]
+        assert [version.version for version in versions if version.content_delta is None] == [1, 4, 7]
+        assert versions[2].base == versions[0]
+        assert versions[2]._content == ''
+
+    def test_small_changes_are_keyframes(self, project):
+        project.update_node_wiki('home', 'foo', Auth(project.creator))
+        project.update_node_wiki('home', 'bar', Auth(project.creator))
+        assert project.get_wiki_page('home').content_delta is None
+
+    def test_setting_content_clears_delta(self, project):
+        self.update(project, 2)
+        page = project.get_wiki_page('home')
+        page.content = 'foo'
+        page.save()
+        page.reload()
+        assert page.content == 'foo'
+        assert page.content_delta is None
+        assert page.base is None
+
+    def test_fork(self, project):
+        self.update(project, 5)
+        fork = project.fork_node(Auth(project.creator))
+        versions = [NodeWikiPage.load(_id) for _id in fork.wiki_pages_versions['home']]
+
+        assert [version.content for version in versions] == [self.contents(i) for i in range(1, 6)]
+        assert all(version.base.node == fork for version in versions if version.content_delta is not None)
+
+
 class TestNodeWikiPage(OsfTestCase):
 
     def setUp(self):
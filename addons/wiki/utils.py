@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import difflib
 import os
 import urllib
 import uuid
@@ -28,6 +29,31 @@ def to_mongo_key(item):
     return to_mongo(item).strip().lower()
 
 
+def make_delta(base, content):
+    """Return a line-based delta that turns `base` into `content`, for use
+    with `apply_delta`. Each entry is either a ``[start, end]`` range of lines
+    copied from `base` or a string of new text.
+    """
+    base_lines = base.splitlines(True)
+    lines = content.splitlines(True)
+    delta = []
+    matcher = difflib.SequenceMatcher(None, base_lines, lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            delta.append([i1, i2])
+        elif j1 != j2:
+            delta.append(''.join(lines[j1:j2]))
+    return delta
+
+
+def apply_delta(base, delta):
+    base_lines = base.splitlines(True)
+    return ''.join(
+        part if isinstance(part, basestring) else ''.join(base_lines[part[0]:part[1]])
+        for part in delta
+    )
+
+
 def generate_private_uuid(node, wname):
     """
     Generate private uuid for internal use in sharejs namespacing.
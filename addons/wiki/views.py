@@ -76,10 +76,11 @@ def _get_wiki_versions(node, name, anonymous=False):
     if key not in node.wiki_pages_versions:
         return []
 
-    versions = [
-        NodeWikiPage.load(version_wiki_id)
-        for version_wiki_id in node.wiki_pages_versions[key]
-    ]
+    # Listing versions doesn't need their content, which may have to be
+    # rebuilt from a delta
+    versions = NodeWikiPage.objects.filter(
+        guids___id__in=node.wiki_pages_versions[key]
+    ).select_related('user').defer('_content', 'content_delta').order_by('-version')
 
     return [
         {
@@ -87,7 +88,7 @@ def _get_wiki_versions(node, name, anonymous=False):
             'user_fullname': privacy_info_handle(version.user.fullname, anonymous, name=True),
             'date': '{} UTC'.format(version.date.replace(microsecond=0).isoformat().replace('T', ' ')),
         }
-        for version in reversed(versions)
+        for version in versions
     ]
 
 
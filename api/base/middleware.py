@@ -5,6 +5,7 @@ import pstats
 import threading
 
 from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
 from raven.contrib.django.raven_compat.models import sentry_exception_handler
 import corsheaders.middleware
 
@@ -17,6 +18,8 @@ from framework.celery_tasks.handlers import (
     celery_after_request,
     celery_teardown_request
 )
+from osf.db import router
+from osf.utils import permission_cache
 from .api_globals import api_globals
 from api.base import settings as api_settings
 
@@ -107,6 +110,40 @@ class PostcommitTaskMiddleware(object):
         return response
 
 
+class ReadReplicaMiddleware(object):
+    """
+    Allow reads made while handling safe requests to views that set `read_from_replica` to be served by a replica.
+    Only set it on views that don't write, or whose writes don't depend on reads made earlier in the request.
+    """
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, 'cls', view_func)
+        router.set_read_only(request.method in SAFE_METHODS and getattr(view, 'read_from_replica', False))
+
+    def process_exception(self, request, exception):
+        router.set_read_only(False)
+        return None
+
+    def process_response(self, request, response):
+        router.set_read_only(False)
+        return response
+
+
+class PermissionCacheMiddleware(object):
+    """
+    Cache users' permissions on nodes for the length of the request.
+    """
+    def process_request(self, request):
+        permission_cache.enable()
+
+    def process_exception(self, request, exception):
+        permission_cache.disable()
+        return None
+
+    def process_response(self, request, response):
+        permission_cache.disable()
+        return response
+
+
 # Adapted from http://www.djangosnippets.org/snippets/186/
 # Original author: udfalkso
 # Modified by: Shwagroo Team and Gun.io
@@ -14,7 +14,8 @@ from api.base.serializers import is_anonymized
 from api.base.settings import MAX_PAGE_SIZE
 from api.base.utils import absolute_reverse
 
-from osf.models import AbstractNode, Comment, Guid
+from osf.models import AbstractNode, BaseFileNode, Comment, Guid
+from osf.models.base import GuidMixin
 from website.search.elastic_search import DOC_TYPE_TO_MODEL
 
 
@@ -224,6 +225,46 @@ class SearchPaginator(DjangoPaginator):
         model = DOC_TYPE_TO_MODEL[obj_type]
         return model.load(obj_id)
 
+    def get_result_model(self, result):
+        return DOC_TYPE_TO_MODEL[result.get('_type')]
+
+    def get_queryset(self, model, ids):
+        """Objects of `model` with the given `_id`s, with what their serializers need."""
+        if issubclass(model, GuidMixin):
+            queryset = model.objects.filter(guids___id__in=ids)
+        else:
+            queryset = model.objects.filter(_id__in=ids)
+        if issubclass(model, AbstractNode):
+            queryset = queryset.select_related('node_license').include('contributor__user__guids', 'root__guids', limit_includes=10)
+        elif issubclass(model, BaseFileNode):
+            queryset = queryset.prefetch_related('node__guids', 'versions', 'tags').include('guids')
+        return queryset
+
+    def hydrate(self, results):
+        """Load the objects of the search hits in `results` with one query per
+        model, in the order of the hits. Hits whose objects no longer exist are dropped.
+        """
+        ids_by_model = OrderedDict()
+        for result in results:
+            ids_by_model.setdefault(self.get_result_model(result), []).append(result.get('_id'))
+
+        loaded = {}
+        for model, ids in ids_by_model.items():
+            for obj in self.get_queryset(model, ids):
+                if isinstance(obj, GuidMixin):
+                    # Any of the object's guids may be the one that was indexed
+                    for guid in obj.guids.all():
+                        loaded[(model, guid._id)] = obj
+                else:
+                    loaded[(model, obj._id)] = obj
+
+        items = []
+        for result in results:
+            obj = loaded.get((self.get_result_model(result), result.get('_id')))
+            if obj is not None:
+                items.append(obj)
+        return items
+
     def _get_count(self):
         self._count = self.object_list['aggs']['total']
         return self._count
@@ -231,11 +272,7 @@ class SearchPaginator(DjangoPaginator):
 
     def page(self, number):
         number = self.validate_number(number)
-        results = self.object_list['results']
-        items = [
-            self.search_type_to_model(result.get('_id'), result.get('_type'))
-            for result in results
-        ]
+        items = self.hydrate(self.object_list['results'])
         return self._get_page(items, number, self)
 
 
@@ -245,14 +282,8 @@ class SearchModelPaginator(SearchPaginator):
         super(SearchModelPaginator, self).__init__(object_list, per_page)
         self.model = model
 
-    def page(self, number):
-        number = self.validate_number(number)
-        results = self.object_list['results']
-        items = [
-            self.model.load(result.get('_id'))
-            for result in results
-        ]
-        return self._get_page(items, number, self)
+    def get_result_model(self, result):
+        return self.model
 
 
 class SearchPagination(JSONAPIPagination):
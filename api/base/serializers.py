@@ -1055,6 +1055,15 @@ class JSONAPIListSerializer(ser.ListSerializer):
                 self.child.to_esi_representation(item, envelope=None) for item in data
             ]
         else:
+            # Compute related counts and resolve embedded relationships for the whole
+            # page before serializing each item
+            prefetch_related_counts = getattr(self.child, 'prefetch_related_counts', None)
+            if prefetch_related_counts:
+                prefetch_related_counts(data)
+            for embed in self.context.get('embed', {}).values():
+                prefetch = getattr(embed, 'prefetch', None)
+                if prefetch:
+                    prefetch(data)
             ret = [
                 self.child.to_representation(item, envelope=envelope) for item in data
             ]
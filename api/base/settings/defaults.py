@@ -32,6 +32,10 @@ DATABASES = {
 }
 
 DATABASE_ROUTERS = ['osf.db.router.PostgreSQLFailoverRouter', ]
+# Replicas further behind the master than this many seconds are not read from
+REPLICA_MAX_LAG = 5
+# How often, in seconds, each process re-checks the lag of each replica
+REPLICA_LAG_CHECK_INTERVAL = 10
 CELERY_IMPORTS = [
     'osf.management.commands.migratedata',
     'osf.management.commands.migraterelations',
@@ -198,6 +202,8 @@ MIDDLEWARE_CLASSES = (
     'api.base.middleware.DjangoGlobalMiddleware',
     'api.base.middleware.CeleryTaskMiddleware',
     'api.base.middleware.PostcommitTaskMiddleware',
+    'api.base.middleware.ReadReplicaMiddleware',
+    'api.base.middleware.PermissionCacheMiddleware',
 
     # A profiling middleware. ONLY FOR DEV USE
     # Uncomment and add "prof" to url params to recieve a profile for that url
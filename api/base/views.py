@@ -43,10 +43,35 @@ class JSONAPIBaseView(generics.GenericAPIView):
         self.view_fqn = ':'.join([self.view_category, self.view_name])
         super(JSONAPIBaseView, self).__init__(**kwargs)
 
+    def _get_embed_request(self):
+        if isinstance(self.request, EmbeddedRequest):
+            request = EmbeddedRequest(self.request._request)
+        else:
+            request = EmbeddedRequest(self.request)
+
+        if not hasattr(request._request._request, '_embed_cache'):
+            request._request._request._embed_cache = {}
+        return request
+
+    def _can_batch_embeds(self):
+        """Batched embed results are fetched with the embedded view's default filtering and
+        ordering, so only use them when the request does not filter or sort.
+        """
+        return not any(
+            key.startswith('filter[') or key == 'sort'
+            for key in self.request.query_params.keys()
+        )
+
     def _get_embed_partial(self, field_name, field):
         """Create a partial function to fetch the values of an embedded field. A basic
         example is to include a Node's children in a single response.
 
+        The returned function exposes a ``prefetch`` attribute which accepts every item on
+        the page being serialized. Embedded list views that implement the ``get_embed_batch``
+        classmethod resolve the field for all of those items with one grouped query; the
+        partitioned results are cached on the request and used in place of per-item
+        ``get_queryset`` calls.
+
         :param str field_name: Name of field of the view's serializer_class to load
         results for
         :return function object -> dict:
@@ -54,19 +79,35 @@ class JSONAPIBaseView(generics.GenericAPIView):
         if getattr(field, 'field', None):
             field = field.field
 
+        def prefetch(items):
+            if not self._can_batch_embeds():
+                return
+
+            request = self._get_embed_request()
+            cache = request._request._request._embed_cache
+
+            parents_by_view = defaultdict(list)
+            for item in items:
+                try:
+                    v, view_args, view_kwargs = field.resolve(item, field_name, self.request)
+                except Exception:
+                    continue
+                if v and getattr(v.cls, 'get_embed_batch', None):
+                    parents_by_view[v.cls].append(item)
+
+            for view_cls, parents in parents_by_view.items():
+                batch = cache.setdefault(('batch', view_cls, field_name), {})
+                missing = [parent for parent in parents if parent.pk not in batch]
+                if missing:
+                    batch.update(view_cls.get_embed_batch(missing, request))
+
         def partial(item):
             # resolve must be implemented on the field
             v, view_args, view_kwargs = field.resolve(item, field_name, self.request)
             if not v:
                 return None
 
-            if isinstance(self.request, EmbeddedRequest):
-                request = EmbeddedRequest(self.request._request)
-            else:
-                request = EmbeddedRequest(self.request)
-
-            if not hasattr(request._request._request, '_embed_cache'):
-                request._request._request._embed_cache = {}
+            request = self._get_embed_request()
             cache = request._request._request._embed_cache
 
             request.parents.setdefault(type(item), {})[item._id] = item
@@ -104,13 +145,21 @@ class JSONAPIBaseView(generics.GenericAPIView):
                 cache[view.get_serializer_class()] = view.get_serializer_class()(many=isinstance(view, ListModelMixin), context=view.get_serializer_context())
             ser = cache[view.get_serializer_class()]
 
+            batch = cache.get(('batch', v.cls, field_name), {})
+
             try:
                 ser._context = view.get_serializer_context()
 
                 if not isinstance(view, ListModelMixin):
                     ret = ser.to_representation(item)
                 else:
-                    queryset = view.filter_queryset(view.get_queryset())
+                    if item.pk in batch:
+                        # Batched views are node-scoped; get_node performs the permission
+                        # check that get_queryset would otherwise have done
+                        view.get_node()
+                        queryset = batch[item.pk]
+                    else:
+                        queryset = view.filter_queryset(view.get_queryset())
                     page = view.paginate_queryset(getattr(queryset, '_results_cache', None) or queryset)
 
                     ret = ser.to_representation(page or queryset)
@@ -132,6 +181,7 @@ class JSONAPIBaseView(generics.GenericAPIView):
 
             return ret
 
+        partial.prefetch = prefetch
         return partial
 
     def get_serializer_context(self):
@@ -1,85 +1,122 @@
+import re
+import time
 import urlparse
 
 import requests
 import logging
+from gevent.pool import Pool
 
+from framework.postcommit_tasks.handlers import enqueue_postcommit_batch
 from website import settings
 
 logger = logging.getLogger(__name__)
 
+BAN_TIMEOUT = 0.3  # 300ms timeout for bans
+# Path keyed bans are sent to. A varnish running a VCL without X-Ban-Keys
+# support bans by the request URL instead, which matches no cached object.
+BAN_KEYS_PATH = '/__ban_keys__'
+
+# Reuse connections to the varnish servers across bans
+varnish_session = requests.Session()
+
 
 def get_varnish_servers():
     #  TODO: this should get the varnish servers from HAProxy or a setting
     return settings.VARNISH_SERVERS
 
 
-def get_bannable_urls(instance):
+def _get_api_path(instance):
+    return urlparse.urlparse(instance.absolute_api_v2_url).path
+
+
+def get_surrogate_keys(instance):
+    """Return the set of API paths whose cached responses are stale once ``instance``
+    changes: the instance itself and, for comments, their target and root target.
+    """
     from osf.models import Comment
-    bannable_urls = []
-    parsed_absolute_url = {}
 
     if not hasattr(instance, 'absolute_api_v2_url'):
         logger.warning('Tried to ban {}:{} but it didn\'t have a absolute_api_v2_url method'.format(instance.__class__, instance))
-        return [], ''
-
-    for host in get_varnish_servers():
-        # add instance url
-        varnish_parsed_url = urlparse.urlparse(host)
-        parsed_absolute_url = urlparse.urlparse(instance.absolute_api_v2_url)
-        url_string = '{scheme}://{netloc}{path}.*'.format(scheme=varnish_parsed_url.scheme,
-                                                          netloc=varnish_parsed_url.netloc,
-                                                          path=parsed_absolute_url.path)
-        bannable_urls.append(url_string)
-        if isinstance(instance, Comment):
-            try:
-                parsed_target_url = urlparse.urlparse(instance.target.referent.absolute_api_v2_url)
-            except AttributeError:
-                # some referents don't have an absolute_api_v2_url
-                # I'm looking at you NodeWikiPage
-                pass
-            else:
-                url_string = '{scheme}://{netloc}{path}.*'.format(scheme=varnish_parsed_url.scheme,
-                                                                  netloc=varnish_parsed_url.netloc,
-                                                                  path=parsed_target_url.path)
-                bannable_urls.append(url_string)
-
-            try:
-                parsed_root_target_url = urlparse.urlparse(instance.root_target.referent.absolute_api_v2_url)
-            except AttributeError:
-                # some root_targets don't have an absolute_api_v2_url
-                pass
-            else:
-                url_string = '{scheme}://{netloc}{path}.*'.format(scheme=varnish_parsed_url.scheme,
-                                                              netloc=varnish_parsed_url.netloc,
-                                                              path=parsed_root_target_url.path)
-                bannable_urls.append(url_string)
-
-    return bannable_urls, parsed_absolute_url.hostname
-
-
-def ban_url(instance):
-    # TODO: Refactor; Pull url generation into postcommit_task handling so we only ban urls once per request
-    timeout = 0.3  # 300ms timeout for bans
+        return set()
+
+    keys = {_get_api_path(instance)}
+    if isinstance(instance, Comment):
+        try:
+            keys.add(_get_api_path(instance.target.referent))
+        except AttributeError:
+            # some referents don't have an absolute_api_v2_url
+            # I'm looking at you NodeWikiPage
+            pass
+        try:
+            keys.add(_get_api_path(instance.root_target.referent))
+        except AttributeError:
+            # some root_targets don't have an absolute_api_v2_url
+            pass
+    return keys
+
+
+def _chunk_ban_keys(keys, max_bytes):
+    """Split the escaped, sorted ``keys`` into lists whose space-joined X-Ban-Keys value
+    stays under ``max_bytes``, so no BAN exceeds varnish's ``http_req_hdr_len``. A key
+    longer than ``max_bytes`` on its own is still sent, alone.
+    """
+    chunks, chunk, size = [], [], 0
+    for key in sorted(keys):
+        escaped = re.escape(key)
+        length = len(escaped.encode('utf-8'))
+        if chunk and size + 1 + length > max_bytes:
+            chunks.append(chunk)
+            chunk, size = [], 0
+        size += length + (1 if chunk else 0)
+        chunk.append(escaped)
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def _ban_on_server(host, chunks):
+    """Send one BAN per chunk of escaped keys to one varnish server. The server bans
+    every cached object whose URL starts with one of the keys.
+    """
+    for chunk in chunks:
+        started = time.time()
+        try:
+            response = varnish_session.request('BAN', urlparse.urljoin(host, BAN_KEYS_PATH), timeout=BAN_TIMEOUT, headers={
+                'X-Ban-Keys': ' '.join(chunk),
+            })
+        except Exception as ex:
+            logger.error('Banning {} keys on {} failed: {}'.format(len(chunk), host, ex.message))
+            continue
+        elapsed = (time.time() - started) * 1000
+        if not response.ok:
+            logger.error('Banning {} keys on {} failed after {:.0f}ms: {}'.format(len(chunk), host, elapsed, response.text))
+        else:
+            logger.info('Banning {} keys on {} succeeded in {:.0f}ms'.format(len(chunk), host, elapsed))
+
+
+def ban_surrogate_keys(keys):
+    """Ban ``keys`` on every varnish server in parallel, in as few BANs as the header
+    size limit allows.
+    """
+    if not settings.ENABLE_VARNISH or not keys:
+        return
+    servers = get_varnish_servers()
+    if not servers:
+        return
+    chunks = _chunk_ban_keys(keys, settings.VARNISH_BAN_KEYS_MAX_BYTES)
+    started = time.time()
+    pool = Pool(len(servers))
+    for host in servers:
+        pool.spawn(_ban_on_server, host, chunks)
+    pool.join()
+    logger.info('Invalidated {} keys on {} varnish servers in {:.0f}ms'.format(
+        len(keys), len(servers), (time.time() - started) * 1000
+    ))
+
+
+def enqueue_ban(instance):
+    """Ban ``instance`` from the cache once the current request commits. Bans for
+    every object touched during the request are sent together.
+    """
     if settings.ENABLE_VARNISH:
-        bannable_urls, hostname = get_bannable_urls(instance)
-
-        for url_to_ban in set(bannable_urls):
-            try:
-                response = requests.request('BAN', url_to_ban, timeout=timeout, headers=dict(
-                    Host=hostname
-                ))
-            except Exception as ex:
-                logger.error('Banning {} failed: {}'.format(
-                    url_to_ban,
-                    ex.message
-                ))
-            else:
-                if not response.ok:
-                    logger.error('Banning {} failed: {}'.format(
-                        url_to_ban,
-                        response.text
-                    ))
-                else:
-                    logger.info('Banning {} succeeded'.format(
-                        url_to_ban
-                    ))
+        enqueue_postcommit_batch(ban_surrogate_keys, get_surrogate_keys(instance))
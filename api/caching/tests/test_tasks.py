@@ -0,0 +1,62 @@
+import mock
+import pytest
+
+from api.caching import tasks
+from framework.postcommit_tasks.handlers import postcommit_before_request, postcommit_queue
+from osf_tests.factories import CommentFactory, ProjectFactory
+
+
+@pytest.mark.django_db
+class TestCacheInvalidation:
+
+    @pytest.fixture(autouse=True)
+    def varnish(self, monkeypatch):
+        monkeypatch.setattr(tasks.settings, 'ENABLE_VARNISH', True)
+        monkeypatch.setattr(tasks.settings, 'VARNISH_SERVERS', ['http://varnish1:8080', 'http://varnish2:8080'])
+
+    def test_get_surrogate_keys_for_comment(self):
+        comment = CommentFactory()
+        keys = tasks.get_surrogate_keys(comment)
+        assert keys == {
+            '/v2/comments/{}/'.format(comment._id),
+            '/v2/nodes/{}/'.format(comment.node._id),
+        }
+
+    def test_enqueue_ban_coalesces_objects_touched_in_a_request(self):
+        postcommit_before_request()
+        project = ProjectFactory()
+        comment = CommentFactory(node=project)
+
+        tasks.enqueue_ban(project)
+        tasks.enqueue_ban(comment)
+        tasks.enqueue_ban(project)
+
+        assert len(postcommit_queue()) == 1
+        batch = postcommit_queue().values()[0]
+        assert batch.func is tasks.ban_surrogate_keys
+        assert batch.args[0] == tasks.get_surrogate_keys(comment)
+
+    def test_ban_surrogate_keys_sends_one_ban_per_server(self):
+        with mock.patch.object(tasks.varnish_session, 'request') as mock_request:
+            mock_request.return_value.ok = True
+            tasks.ban_surrogate_keys({'/v2/nodes/abcde/', '/v2/comments/fghij/'})
+
+        assert mock_request.call_count == 2
+        hosts = sorted(call[0][1] for call in mock_request.call_args_list)
+        assert hosts == ['http://varnish1:8080/__ban_keys__', 'http://varnish2:8080/__ban_keys__']
+        for call in mock_request.call_args_list:
+            assert call[0][0] == 'BAN'
+            assert call[1]['headers']['X-Ban-Keys'] == '\\/v2\\/comments\\/fghij\\/ \\/v2\\/nodes\\/abcde\\/'
+
+    def test_ban_surrogate_keys_splits_keys_over_header_limit(self, monkeypatch):
+        monkeypatch.setattr(tasks.settings, 'VARNISH_BAN_KEYS_MAX_BYTES', 64)
+        keys = {'/v2/nodes/{:05d}/'.format(i) for i in range(10)}
+        with mock.patch.object(tasks.varnish_session, 'request') as mock_request:
+            mock_request.return_value.ok = True
+            tasks.ban_surrogate_keys(keys)
+
+        headers = [call[1]['headers']['X-Ban-Keys'] for call in mock_request.call_args_list]
+        assert len(headers) > 2
+        assert all(len(header) <= 64 for header in headers)
+        banned = [key for header in headers for key in header.split(' ')]
+        assert sorted(banned) == sorted(2 * [tasks.re.escape(key) for key in keys])
@@ -1,5 +1,7 @@
+import collections
 import os
 import re
+import threading
 
 from citeproc import CitationStylesStyle, CitationStylesBibliography
 from citeproc import Citation, CitationItem
@@ -8,7 +10,11 @@ from citeproc.source.json import CiteProcJSON
 
 from osf.models import PreprintService
 from website.citations.utils import datetime_to_csl
-from website.settings import CITATION_STYLES_PATH, BASE_PATH, CUSTOM_CITATIONS
+from website.settings import CITATION_STYLES_PATH, CITATION_STYLE_CACHE_SIZE, BASE_PATH, CUSTOM_CITATIONS
+
+# Parsed styles by path, least recently used first
+_styles = collections.OrderedDict()
+_styles_lock = threading.Lock()
 
 
 def clean_up_common_errors(cit):
@@ -42,31 +48,60 @@ def preprint_csl(preprint, node):
     return csl
 
 
-def render_citation(node, style='apa'):
-    """Given a node, return a citation"""
-    csl = None
-    if isinstance(node, PreprintService):
-        csl = preprint_csl(node, node.node)
-        data = [csl, ]
-    else:
-        data = [node.csl, ]
-
-    bib_source = CiteProcJSON(data)
+def get_style(style):
+    """Return the parsed `CitationStylesStyle` for a style id, keeping the
+    CITATION_STYLE_CACHE_SIZE most recently used styles of the process parsed.
 
+    :raises ValueError: If the style does not exist
+    """
     custom = CUSTOM_CITATIONS.get(style, False)
     path = os.path.join(BASE_PATH, 'static', custom) if custom else os.path.join(CITATION_STYLES_PATH, style)
+    with _styles_lock:
+        bib_style = _styles.pop(path, None)
+        if bib_style is not None:
+            _styles[path] = bib_style
+            return bib_style
+
     bib_style = CitationStylesStyle(path, validate=False)
+    with _styles_lock:
+        _styles[path] = bib_style
+        while len(_styles) > CITATION_STYLE_CACHE_SIZE:
+            _styles.popitem(last=False)
+    return bib_style
+
+
+def get_csl(node):
+    if isinstance(node, PreprintService):
+        return preprint_csl(node, node.node)
+    return node.csl
+
+
+def render_citation(node, style='apa'):
+    """Given a node, return a citation"""
+    return render_csl(get_csl(node), get_style(style))
+
+
+def render_citations(nodes, style='apa'):
+    """Given nodes and preprints, return their citations in one style, in order.
+    The style is parsed once for all of them.
+    """
+    bib_style = get_style(style)
+    return [render_csl(get_csl(node), bib_style) for node in nodes]
+
+
+def render_csl(csl, bib_style):
+    bib_source = CiteProcJSON([csl, ])
 
     bibliography = CitationStylesBibliography(bib_style, bib_source, formatter.plain)
 
-    citation = Citation([CitationItem(node._id)])
+    citation = Citation([CitationItem(csl['id'])])
 
     bibliography.register(citation)
 
     bib = bibliography.bibliography()
     cit = unicode(bib[0] if len(bib) else '')
 
-    title = csl['title'] if csl else node.csl['title']
+    title = csl['title']
     if cit.count(title) == 1:
         i = cit.index(title)
         prefix = clean_up_common_errors(cit[0:i])
@@ -1,12 +1,20 @@
+import re
+
 from api.base import permissions as base_permissions
 from api.base.filters import ListFilterMixin
-from api.base.pagination import NoMaxPageSizePagination
-from api.base.utils import get_object_or_error
+from api.base.pagination import MaxSizePagination, NoMaxPageSizePagination
+from api.base.settings import MAX_PAGE_SIZE
+from api.base.utils import get_object_or_error, get_user_auth
 from api.base.views import JSONAPIBaseView
 from api.citations.serializers import CitationSerializer
+from api.citations.utils import render_citations
+from api.nodes.serializers import NodeCitationStyleSerializer
+from api.preprints.permissions import PreprintPublishedOrAdmin
 from framework.auth.oauth_scopes import CoreScopes
 from rest_framework import permissions as drf_permissions
 from rest_framework import generics
+from rest_framework.exceptions import NotFound, ValidationError
+from osf.models import AbstractNode, Guid, PreprintService
 from osf.models.citation import CitationStyle
 
 
@@ -80,3 +88,71 @@ class CitationStyleDetail(JSONAPIBaseView, generics.RetrieveAPIView):
         cit = get_object_or_error(CitationStyle, self.kwargs['citation_id'], self.request)
         self.check_object_permissions(self.request, cit)
         return cit
+
+
+class CitationStyleCitationList(JSONAPIBaseView, generics.ListAPIView):
+    '''Citations of several nodes, registrations and preprints in one style. *Read-only*
+
+    ##Note
+    **This API endpoint is under active development, and is subject to change in the future**
+
+    ##Citation Attributes
+
+        name           type               description
+    =========================================================================
+    citation           string             complete citation in the style
+    id                 string             guid of the node, registration or preprint
+
+    ##Query Params
+
+    + `filter[id]=<guid>,<guid>` -- Required. Up to 100 guids of nodes, registrations or preprints. Citations are
+    returned in the order of the guids; guids that cannot be found or viewed are left out.
+    '''
+    permission_classes = (
+        drf_permissions.IsAuthenticatedOrReadOnly,
+        base_permissions.TokenHasScope
+    )
+
+    required_read_scopes = [CoreScopes.NODE_CITATIONS_READ]
+    required_write_scopes = [CoreScopes.NULL]
+    serializer_class = NodeCitationStyleSerializer
+    pagination_class = MaxSizePagination
+    view_category = 'citations'
+    view_name = 'citation-style-citations'
+
+    def get_guids(self):
+        ids = [guid.strip() for guid in self.request.query_params.get('filter[id]', '').split(',') if guid.strip()]
+        if not ids:
+            raise ValidationError('filter[id] is required.')
+        if len(ids) > MAX_PAGE_SIZE:
+            raise ValidationError('Citations can be rendered for at most {} guids at a time.'.format(MAX_PAGE_SIZE))
+        return ids
+
+    def can_view(self, referent, auth):
+        if isinstance(referent, PreprintService):
+            # Same rules as the preprint's own citation endpoints
+            return PreprintPublishedOrAdmin().has_object_permission(self.request, self, referent)
+        if isinstance(referent, AbstractNode):
+            return not referent.is_deleted and (referent.is_public or referent.can_view(auth))
+        return False
+
+    def get_queryset(self):
+        ids = self.get_guids()
+        auth = get_user_auth(self.request)
+        guids = {guid._id: guid for guid in Guid.objects.filter(_id__in=ids).prefetch_related('referent')}
+        referents = [
+            guids[guid].referent for guid in ids
+            if guid in guids and self.can_view(guids[guid].referent, auth)
+        ]
+
+        style = self.kwargs['citation_id']
+        try:
+            citations = render_citations(referents, style=style)
+        except ValueError as err:  # style requested could not be found
+            csl_name = re.findall('[a-zA-Z]+\.csl', err.message)[0]
+            raise NotFound('{} is not a known style.'.format(csl_name))
+
+        return [
+            {'id': referent._id, 'citation': citation}
+            for referent, citation in zip(referents, citations)
+        ]
@@ -1,4 +1,7 @@
+from collections import Counter
+
 from django.db import connection
+from django.db.models import Count
 
 from api.base.exceptions import (Conflict, EndpointNotImplementedError,
                                  InvalidModelValueError,
@@ -12,7 +15,7 @@ from api.base.serializers import (DateByVersion, HideIfRegistration, IDField,
                                   WaterbutlerLink, relationship_diff, BaseAPISerializer)
 from api.base.settings import ADDONS_FOLDER_CONFIGURABLE
 from api.base.utils import (absolute_reverse, get_object_or_error,
-                            get_user_auth, is_truthy)
+                            get_user_auth, is_truthy, is_falsy)
 from django.apps import apps
 from django.conf import settings
 from django.core.exceptions import ValidationError
@@ -24,7 +27,7 @@ from rest_framework import exceptions
 from addons.base.exceptions import InvalidAuthError, InvalidFolderError
 from website.exceptions import NodeStateError
 from osf.models import (Comment, DraftRegistration, Institution,
-                        MetaSchema, AbstractNode, PrivateLink)
+                        MetaSchema, AbstractNode, PrivateLink, NodeLog, NodeRelation)
 from osf.models.external import ExternalAccount
 from osf.models.licenses import NodeLicense
 from osf.models.preprint_service import PreprintService
@@ -341,24 +344,104 @@ class NodeSerializer(JSONAPISerializer):
     def get_absolute_url(self, obj):
         return obj.get_absolute_url()
 
+    # Count methods that can be computed for a whole page of nodes at once, mapped to
+    # the method that computes them. See prefetch_related_counts.
+    bulk_related_counts = {
+        'get_logs_count': '_bulk_logs_count',
+        'get_node_count': '_bulk_node_count',
+        'get_registration_count': '_bulk_registration_count',
+        'get_node_links_count': '_bulk_node_links_count',
+        'get_registration_links_count': '_bulk_registration_links_count',
+    }
+
+    def prefetch_related_counts(self, nodes):
+        """Called by JSONAPIListSerializer with the page of nodes being rendered. Computes
+        each requested related count for every node with one grouped query and stores the
+        results in the serializer context, where the get_*_count methods pick them up.
+        """
+        request = self.context['request']
+        params = request.query_params.get('related_counts', False)
+        if is_falsy(params) or (request.parser_context.get('kwargs') or {}).get('is_embedded'):
+            return
+        auth = get_user_auth(request)
+        # Anonymous view-only links restrict visibility in ways the node queryset can't express
+        if getattr(auth.private_link, 'anonymous', False):
+            return
+
+        requested = None if is_truthy(params) else set(params.split(','))
+        methods = set()
+        for field_name, field in self.fields.items():
+            if requested is not None and field_name not in requested:
+                continue
+            field = getattr(field, 'field', field)
+            for meta in (getattr(field, 'related_meta', None), getattr(field, 'self_meta', None)):
+                methods.update(value for value in (meta or {}).values() if value in self.bulk_related_counts)
+        if not methods:
+            return
+
+        node_ids = [node.pk for node in nodes]
+        related_counts = self.context.setdefault('related_counts', {})
+        for method in methods:
+            counts = dict.fromkeys(node_ids, 0)
+            counts.update(getattr(self, self.bulk_related_counts[method])(node_ids, auth))
+            related_counts[method] = counts
+
+    def get_prefetched_count(self, method, obj):
+        """Return the count stored by prefetch_related_counts, or None if it was not computed for `obj`."""
+        return self.context.get('related_counts', {}).get(method, {}).get(obj.pk)
+
+    def _bulk_logs_count(self, node_ids, auth):
+        return NodeLog.objects.filter(node_id__in=node_ids).order_by().values_list('node_id').annotate(Count('id'))
+
+    def _count_viewable_relations(self, relations, queryset, auth):
+        """Given (parent_id, child_id) pairs, count the children in `queryset` that `auth` may view, per parent."""
+        relations = list(relations)
+        viewable = set(
+            queryset.filter(pk__in=[child_id for _, child_id in relations])
+            .can_view(user=auth.user, private_link=auth.private_key)
+            .values_list('pk', flat=True)
+        )
+        return Counter(parent_id for parent_id, child_id in relations if child_id in viewable)
+
+    def _bulk_node_count(self, node_ids, auth):
+        relations = NodeRelation.objects.filter(parent_id__in=node_ids, is_node_link=False).values_list('parent_id', 'child_id')
+        return self._count_viewable_relations(relations, AbstractNode.objects.filter(is_deleted=False), auth)
+
+    def _bulk_registration_count(self, node_ids, auth):
+        Registration = apps.get_model('osf.Registration')
+        relations = Registration.objects.filter(registered_from_id__in=node_ids).values_list('registered_from_id', 'pk')
+        return self._count_viewable_relations(relations, Registration.objects.all(), auth)
+
+    def _bulk_node_links_count(self, node_ids, auth):
+        relations = NodeRelation.objects.filter(parent_id__in=node_ids, is_node_link=True).values_list('parent_id', 'child_id')
+        queryset = AbstractNode.objects.filter(is_deleted=False).exclude(type__in=['osf.collection', 'osf.registration'])
+        return self._count_viewable_relations(relations, queryset, auth)
+
+    def _bulk_registration_links_count(self, node_ids, auth):
+        relations = NodeRelation.objects.filter(parent_id__in=node_ids, is_node_link=True).values_list('parent_id', 'child_id')
+        queryset = AbstractNode.objects.filter(is_deleted=False, type='osf.registration')
+        return self._count_viewable_relations(relations, queryset, auth)
+
     # TODO: See if we can get the count filters into the filter rather than the serializer.
 
     def get_logs_count(self, obj):
+        count = self.get_prefetched_count('get_logs_count', obj)
+        if count is not None:
+            return count
         return obj.logs.count()
 
     def get_node_count(self, obj):
+        count = self.get_prefetched_count('get_node_count', obj)
+        if count is not None:
+            return count
         auth = get_user_auth(self.context['request'])
         user_id = getattr(auth.user, 'id', None)
         with connection.cursor() as cursor:
             cursor.execute('''
-                WITH RECURSIVE parents AS (
-                  SELECT parent_id, child_id
-                  FROM osf_noderelation
-                  WHERE child_id = %s AND is_node_link IS FALSE
-                UNION ALL
-                  SELECT osf_noderelation.parent_id, parents.parent_id AS child_id
-                  FROM parents JOIN osf_noderelation ON parents.PARENT_ID = osf_noderelation.child_id
-                  WHERE osf_noderelation.is_node_link IS FALSE
+                WITH parents AS (
+                  SELECT ancestor_id AS parent_id
+                  FROM osf_nodeancestor
+                  WHERE descendant_id = %s
                 ), has_admin AS (SELECT * FROM osf_contributor WHERE (node_id IN (SELECT parent_id FROM parents) OR node_id = %s) AND user_id = %s AND admin IS TRUE LIMIT 1)
                 SELECT DISTINCT
                   COUNT(child_id)
@@ -384,6 +467,9 @@ class NodeSerializer(JSONAPISerializer):
         return len(obj.contributors)
 
     def get_registration_count(self, obj):
+        count = self.get_prefetched_count('get_registration_count', obj)
+        if count is not None:
+            return count
         auth = get_user_auth(self.context['request'])
         registrations = [node for node in obj.registrations_all if node.can_view(auth)]
         return len(registrations)
@@ -392,6 +478,9 @@ class NodeSerializer(JSONAPISerializer):
         return obj.linked_nodes.count()
 
     def get_node_links_count(self, obj):
+        count = self.get_prefetched_count('get_node_links_count', obj)
+        if count is not None:
+            return count
         count = 0
         auth = get_user_auth(self.context['request'])
         for pointer in obj.linked_nodes.filter(is_deleted=False).exclude(type='osf.collection').exclude(type='osf.registration'):
@@ -400,6 +489,9 @@ class NodeSerializer(JSONAPISerializer):
         return count
 
     def get_registration_links_count(self, obj):
+        count = self.get_prefetched_count('get_registration_links_count', obj)
+        if count is not None:
+            return count
         count = 0
         auth = get_user_auth(self.context['request'])
         for pointer in obj.linked_nodes.filter(is_deleted=False, type='osf.registration').exclude(type='osf.collection'):
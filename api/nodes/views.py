@@ -49,7 +49,7 @@ from api.base.views import (
     LinkedRegistrationsRelationship,
     WaterButlerMixin
 )
-from api.caching.tasks import ban_url
+from api.caching.tasks import enqueue_ban
 from api.citations.utils import render_citation
 from api.comments.permissions import CanCommentOrPublic
 from api.comments.serializers import (CommentCreateSerializer,
@@ -97,11 +97,10 @@ from api.registrations.serializers import RegistrationSerializer
 from api.users.views import UserMixin
 from api.wikis.serializers import NodeWikiSerializer
 from framework.auth.oauth_scopes import CoreScopes
-from framework.postcommit_tasks.handlers import enqueue_postcommit_task
 from osf.models import AbstractNode
 from osf.models import (Node, PrivateLink, Institution, Comment, DraftRegistration,)
 from osf.models import OSFUser
-from osf.models import NodeRelation, Guid
+from osf.models import NodeRelation, Guid, Contributor
 from osf.models import BaseFileNode
 from osf.models.files import File, Folder
 from addons.wiki.models import NodeWikiPage
@@ -681,6 +680,22 @@ class NodeContributorsList(BaseContributorList, bulk_views.BulkUpdateJSONAPIView
             queryset = queryset.filter(user__guids___id__in=contrib_ids)
         return queryset
 
+    @classmethod
+    def get_embed_batch(cls, parents, request):
+        """Fetch the contributors of every node in `parents` with a single query.
+        Used by JSONAPIBaseView when `embed=contributors` is requested on a list.
+        """
+        parents_by_pk = {parent.pk: parent for parent in parents}
+        ret = {pk: [] for pk in parents_by_pk}
+        contributors = Contributor.objects.filter(
+            node__in=parents
+        ).include('user__guids').order_by('node_id', '_order')
+        for contributor in contributors:
+            # Avoid a query per contributor when serializing its _id
+            contributor.node = parents_by_pk[contributor.node_id]
+            ret[contributor.node_id].append(contributor)
+        return ret
+
     # Overrides BulkDestroyJSONAPIView
     def perform_destroy(self, instance):
         auth = get_user_auth(self.request)
@@ -1254,6 +1269,28 @@ class NodeChildrenList(JSONAPIBaseView, bulk_views.ListBulkCreateJSONAPIView, No
                 .values_list('child__pk', flat=True)
         return self.get_queryset_from_request().filter(pk__in=node_pks).can_view(auth.user).order_by('-modified')
 
+    @classmethod
+    def get_embed_batch(cls, parents, request):
+        """Fetch the viewable children of every node in `parents` with a single query.
+        Used by JSONAPIBaseView when `embed=children` is requested on a list.
+        """
+        auth = get_user_auth(request)
+        relations = NodeRelation.objects.filter(
+            parent__in=parents, is_node_link=False
+        ).values_list('parent_id', 'child_id')
+        parent_ids_by_child = {}
+        for parent_id, child_id in relations:
+            parent_ids_by_child.setdefault(child_id, []).append(parent_id)
+
+        ret = {parent.pk: [] for parent in parents}
+        children = default_node_list_queryset(model_cls=Node).filter(
+            pk__in=parent_ids_by_child.keys()
+        ).can_view(auth.user).order_by('-modified')
+        for child in children:
+            for parent_id in parent_ids_by_child[child.pk]:
+                ret[parent_id].append(child)
+        return ret
+
     # overrides ListBulkCreateJSONAPIView
     def perform_create(self, serializer):
         user = self.request.user
@@ -3331,7 +3368,7 @@ class NodeViewOnlyLinkDetail(JSONAPIBaseView, generics.RetrieveUpdateDestroyAPIV
         assert isinstance(link, PrivateLink), 'link must be a PrivateLink'
         link.is_deleted = True
         link.save()
-        enqueue_postcommit_task(ban_url, (self.get_node(),), {}, celery=True, once_per_request=True)
+        enqueue_ban(self.get_node())
 
 
 class NodeIdentifierList(NodeMixin, IdentifierList):
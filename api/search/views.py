@@ -34,6 +34,8 @@ class BaseSearchView(JSONAPIBaseView, generics.ListAPIView):
 
     pagination_class = SearchPagination
 
+    read_from_replica = True
+
     def __init__(self):
         super(BaseSearchView, self).__init__()
         self.doc_type = getattr(self, 'doc_type', None)
@@ -12,7 +12,10 @@ from django.test.utils import override_settings
 
 from website.util import api_v2_url
 from api.base import settings
-from api.base.middleware import CorsMiddleware
+from api.base.middleware import CorsMiddleware, ReadReplicaMiddleware
+from api.nodes.views import NodeList
+from api.search.views import Search
+from osf.db import router
 from tests.base import ApiTestCase
 from osf_tests import factories
 
@@ -113,3 +116,28 @@ class TestCorsMiddleware(MiddlewareTestCase):
         self.middleware.process_request(request)
         processed = self.middleware.process_response(request, response)
         assert_equal(response['Access-Control-Allow-Origin'], domain.geturl())
+
+
+class TestReadReplicaMiddleware(MiddlewareTestCase):
+    MIDDLEWARE = ReadReplicaMiddleware
+
+    def tearDown(self):
+        super(TestReadReplicaMiddleware, self).tearDown()
+        router.set_read_only(False)
+
+    def test_views_opt_in_to_replica_reads(self):
+        request = self.request_factory.get(api_v2_url('search/'))
+        self.middleware.process_view(request, Search.as_view(), (), {})
+        assert_true(router.is_read_only())
+        self.middleware.process_response(request, HttpResponse())
+        assert_false(router.is_read_only())
+
+    def test_other_views_read_from_master(self):
+        request = self.request_factory.get(api_v2_url('nodes/'))
+        self.middleware.process_view(request, NodeList.as_view(), (), {})
+        assert_false(router.is_read_only())
+
+    def test_unsafe_requests_read_from_master(self):
+        request = self.request_factory.post(api_v2_url('search/'))
+        self.middleware.process_view(request, Search.as_view(), (), {})
+        assert_false(router.is_read_only())
@@ -5,7 +5,8 @@ from osf_tests import factories
 from tests.base import ApiTestCase
 
 from api.base import settings
-from api.base.pagination import MaxSizePagination
+from api.base.pagination import MaxSizePagination, SearchModelPaginator, SearchPaginator
+from osf.models import AbstractNode
 
 
 class TestMaxPagination(ApiTestCase):
@@ -53,3 +54,37 @@ class TestJSONAPIPagination(ApiTestCase):
         assert_not_in('meta', links)
         assert_in('total', meta)
         assert_in('per_page', meta)
+
+
+class TestSearchPaginator(ApiTestCase):
+
+    def setUp(self):
+        super(TestSearchPaginator, self).setUp()
+        self.user = factories.UserFactory()
+        self.project = factories.ProjectFactory(creator=self.user)
+        self.component = factories.NodeFactory(parent=self.project, creator=self.user)
+
+    def search_results(self, hits):
+        return {
+            'results': [{'_id': _id, '_type': _type} for _id, _type in hits],
+            'aggs': {'total': len(hits)},
+        }
+
+    def test_page_loads_hits_in_order(self):
+        results = self.search_results([
+            (self.component._id, 'component'),
+            (self.user._id, 'user'),
+            ('gone1', 'project'),
+            (self.project._id, 'project'),
+        ])
+        page = SearchPaginator(results, 10).page(1)
+        assert_equal(list(page), [self.component, self.user, self.project])
+
+    def test_model_page_loads_hits_in_order(self):
+        results = self.search_results([
+            (self.project._id, 'project'),
+            ('gone1', 'project'),
+            (self.component._id, 'component'),
+        ])
+        page = SearchModelPaginator(results, 10, AbstractNode).page(1)
+        assert_equal(list(page), [self.project, self.component])
@@ -0,0 +1,73 @@
+import pytest
+
+from api.base.settings.defaults import API_BASE
+from api.citations.utils import render_citation
+from osf_tests.factories import (
+    AuthUserFactory,
+    PreprintFactory,
+    ProjectFactory,
+)
+
+
+@pytest.mark.django_db
+class TestCitationStyleCitationList:
+
+    @pytest.fixture()
+    def user(self):
+        return AuthUserFactory()
+
+    @pytest.fixture()
+    def public_project(self, user):
+        return ProjectFactory(creator=user, is_public=True)
+
+    @pytest.fixture()
+    def private_project(self, user):
+        return ProjectFactory(creator=user)
+
+    @pytest.fixture()
+    def preprint(self, user):
+        return PreprintFactory(creator=user)
+
+    @pytest.fixture()
+    def url(self):
+        return '/{}citations/styles/apa/citations/'.format(API_BASE)
+
+    def test_citations_in_order(self, app, url, public_project, preprint):
+        res = app.get(url, {'filter[id]': '{},{}'.format(preprint._id, public_project._id)})
+        assert res.status_code == 200
+        assert [each['id'] for each in res.json['data']] == [preprint._id, public_project._id]
+        assert res.json['data'][0]['attributes']['citation'] == render_citation(preprint, 'apa')
+        assert res.json['data'][1]['attributes']['citation'] == render_citation(public_project, 'apa')
+
+    def test_private_nodes_are_left_out(self, app, url, user, public_project, private_project):
+        guids = '{},{},notaguid'.format(public_project._id, private_project._id)
+
+        res = app.get(url, {'filter[id]': guids})
+        assert [each['id'] for each in res.json['data']] == [public_project._id]
+
+        res = app.get(url, {'filter[id]': guids}, auth=user.auth)
+        assert [each['id'] for each in res.json['data']] == [public_project._id, private_project._id]
+
+    def test_unpublished_preprints_are_left_out(self, app, url, user):
+        unpublished = PreprintFactory(creator=user, is_published=False)
+        unpublished.node.is_public = True
+        unpublished.node.save()
+
+        res = app.get(url, {'filter[id]': unpublished._id})
+        assert res.json['data'] == []
+
+        res = app.get(url, {'filter[id]': unpublished._id}, auth=user.auth)
+        assert [each['id'] for each in res.json['data']] == [unpublished._id]
+
+    def test_ids_are_required(self, app, url):
+        res = app.get(url, expect_errors=True)
+        assert res.status_code == 400
+
+    def test_too_many_ids(self, app, url):
+        res = app.get(url, {'filter[id]': ','.join(['abcde'] * 101)}, expect_errors=True)
+        assert res.status_code == 400
+
+    def test_unknown_style(self, app, public_project):
+        url = '/{}citations/styles/not-a-style/citations/'.format(API_BASE)
+        res = app.get(url, {'filter[id]': public_project._id}, expect_errors=True)
+        assert res.status_code == 404
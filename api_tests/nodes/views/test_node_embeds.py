@@ -128,3 +128,28 @@ class TestNodeEmbeds:
         res = app.get(url, auth=write_contrib_one.auth)
         assert res.status_code == 200
         assert res.json['data']['embeds']['contributors']['meta']['total_bibliographic'] == 3
+
+    def test_node_list_embeds_are_batched_per_parent(self, app, user, write_contribs, root_node, child_one, child_two):
+
+    #   test_embed_children_on_list
+        url = '/{}users/me/nodes/?embed=children&embed=contributors'.format(API_BASE)
+        res = app.get(url, auth=user.auth)
+        assert res.status_code == 200
+        by_id = {node['id']: node for node in res.json['data']}
+
+        root_children = [child['id'] for child in by_id[root_node._id]['embeds']['children']['data']]
+        assert set(root_children) == {child_one._id, child_two._id}
+        assert by_id[child_one._id]['embeds']['children']['data'] == []
+
+    #   test_embed_contributors_on_list
+        root_contribs = [contrib['id'] for contrib in by_id[root_node._id]['embeds']['contributors']['data']]
+        assert root_contribs == ['{}-{}'.format(root_node._id, contrib._id) for contrib in [user] + write_contribs]
+        child_two_contribs = [contrib['id'] for contrib in by_id[child_two._id]['embeds']['contributors']['data']]
+        assert child_two_contribs == ['{}-{}'.format(child_two._id, user._id)]
+
+    #   test_filtered_list_does_not_use_batched_embeds
+        url = '/{}users/me/nodes/?embed=children&filter[title]={}'.format(API_BASE, root_node.title)
+        res = app.get(url, auth=user.auth)
+        assert res.status_code == 200
+        for node in res.json['data']:
+            assert 'children' in node['embeds']
@@ -119,6 +119,27 @@ class TestNodeList:
             project = AbstractNode.load(project_json['id'])
             assert project_json['embeds']['root']['data']['id'] == project.root._id
 
+    def test_node_list_related_counts(self, app, user, non_contrib, url, public_project):
+        NodeFactory(parent=public_project, is_public=True, creator=user)
+        NodeFactory(parent=public_project, is_public=False, creator=user)
+        RegistrationFactory(project=public_project, creator=user, is_public=True)
+        other_project = ProjectFactory(is_public=True, creator=user)
+
+    #   test_counts_for_contributor
+        res = app.get('{}?related_counts=true&filter[id]={},{}'.format(url, public_project._id, other_project._id), auth=user.auth)
+        assert res.status_code == 200
+        by_id = {each['id']: each['relationships'] for each in res.json['data']}
+        assert by_id[public_project._id]['children']['links']['related']['meta']['count'] == 2
+        assert by_id[public_project._id]['registrations']['links']['related']['meta']['count'] == 1
+        assert by_id[public_project._id]['logs']['links']['related']['meta']['count'] == public_project.logs.count()
+        assert by_id[other_project._id]['children']['links']['related']['meta']['count'] == 0
+
+    #   test_counts_respect_permissions
+        res = app.get('{}?related_counts=children&filter[id]={}'.format(url, public_project._id), auth=non_contrib.auth)
+        assert res.status_code == 200
+        relationships = res.json['data'][0]['relationships']
+        assert relationships['children']['links']['related']['meta']['count'] == 1
+
     def test_node_list_sorting(self, app, url):
         res = app.get('{}?sort=-created'.format(url))
         assert res.status_code == 200
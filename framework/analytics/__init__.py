@@ -3,11 +3,13 @@
 
 import functools
 import logging
+import time
 
 from flask import request
 
 from framework.celery_tasks import app
 from framework.postcommit_tasks.handlers import run_postcommit
+from website import settings
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +29,26 @@ def increment_user_activity_counters(user_id, action, date_string):
     return UserActivityCounter.increment(user_id, action, date_string)
 
 
+@app.task(name='framework.analytics.fold_counter_increments')
+def fold_counter_increments(time_limit=None):
+    """Fold increments recorded by `update_counter` and
+    `increment_user_activity_counters` into their aggregate counters, one
+    batch at a time until none are left or `time_limit` seconds have passed.
+    """
+    from osf.models import PageCounter, UserActivityCounter
+    time_limit = time_limit or settings.ANALYTICS_FOLD_TIME_LIMIT
+    started = time.time()
+    pages = actions = 0
+    while True:
+        folded_pages = PageCounter.fold_increments()
+        folded_actions = UserActivityCounter.fold_increments()
+        pages += folded_pages
+        actions += folded_actions
+        if not (folded_pages or folded_actions) or time.time() - started >= time_limit:
+            break
+    logger.info('Folded {} page counter and {} user activity increments'.format(pages, actions))
+
+
 def get_total_activity_count(user_id):
     from osf.models import UserActivityCounter
     return UserActivityCounter.get_total_activity_count(user_id)
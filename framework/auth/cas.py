@@ -1,9 +1,13 @@
 # -*- coding: utf-8 -*-
 
 import furl
+import hashlib
 import httplib as http
 import json
+import threading
+import time
 import urllib
+from collections import OrderedDict
 
 from lxml import etree
 import requests
@@ -53,6 +57,73 @@ class CasResponse(object):
         self.attributes = attributes or {}
 
 
+class TokenCache(object):
+    """A size-bounded LRU cache of successful CAS profile lookups with a per-entry TTL.
+
+    Entries are keyed by a SHA-256 hash of the access token so raw tokens are never held
+    in memory longer than the request that presented them. Only the user GUID and the
+    response attributes (including the token scopes, but not the token itself) are stored.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(access_token):
+        return hashlib.sha256(access_token.encode('utf-8')).hexdigest()
+
+    def get(self, access_token):
+        """Return a fresh `CasResponse` for a cached token, or None on a miss."""
+        if not self.ttl:
+            return None
+        key = self._key(access_token)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            expires, user, attributes = entry
+            if expires < time.time():
+                return None
+            # Re-insert to mark as most recently used
+            self._entries[key] = entry
+        attributes = dict(attributes)
+        attributes['accessToken'] = access_token
+        attributes['accessTokenScope'] = set(attributes['accessTokenScope'])
+        return CasResponse(authenticated=True, user=user, attributes=attributes)
+
+    def set(self, access_token, cas_response):
+        if not self.ttl or not cas_response.authenticated:
+            return
+        key = self._key(access_token)
+        attributes = dict(cas_response.attributes)
+        # The token is restored from the caller's argument in `get`, never stored
+        attributes.pop('accessToken', None)
+        attributes['accessTokenScope'] = frozenset(attributes.get('accessTokenScope', []))
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time() + self.ttl, cas_response.user, attributes)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, access_token):
+        with self._lock:
+            self._entries.pop(self._key(access_token), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+#: Process-wide cache of validated access tokens, shared by every `CasClient`
+token_cache = TokenCache(max_size=settings.CAS_TOKEN_CACHE_SIZE, ttl=settings.CAS_TOKEN_CACHE_TTL)
+
+#: Pooled HTTP session so repeated CAS calls reuse keep-alive connections
+_session = requests.Session()
+
+
 class CasClient(object):
     """HTTP client for the CAS server."""
 
@@ -114,7 +185,7 @@ class CasClient(object):
         url.args['ticket'] = ticket
         url.args['service'] = service_url
 
-        resp = requests.get(url.url)
+        resp = _session.get(url.url)
         if resp.status_code == 200:
             return self._parse_service_validation(resp.content)
         else:
@@ -122,20 +193,27 @@ class CasClient(object):
 
     def profile(self, access_token):
         """
-        Send request to get profile information, given an access token.
+        Send request to get profile information, given an access token. Successful
+        responses are cached in `token_cache` for `CAS_TOKEN_CACHE_TTL` seconds.
 
         :param str access_token: CAS access_token.
         :rtype: CasResponse
         :raises: CasError if an unexpected response is returned.
         """
 
+        cas_resp = token_cache.get(access_token)
+        if cas_resp is not None:
+            return cas_resp
+
         url = self.get_profile_url()
         headers = {
             'Authorization': 'Bearer {}'.format(access_token),
         }
-        resp = requests.get(url, headers=headers)
+        resp = _session.get(url, headers=headers)
         if resp.status_code == 200:
-            return self._parse_profile(resp.content, access_token)
+            cas_resp = self._parse_profile(resp.content, access_token)
+            token_cache.set(access_token, cas_resp)
+            return cas_resp
         else:
             self._handle_error(resp)
 
@@ -182,7 +260,14 @@ class CasClient(object):
         """Revoke a tokens based on payload"""
         url = self.get_auth_token_revocation_url()
 
-        resp = requests.post(url, data=payload)
+        # Evict before revoking so a failed or partial revocation never leaves a stale entry.
+        # Application-wide revocations can't be mapped to individual tokens, so drop everything.
+        if 'token' in payload:
+            token_cache.invalidate(payload['token'])
+        else:
+            token_cache.clear()
+
+        resp = _session.post(url, data=payload)
         if resp.status_code == 204:
             return True
         else:
@@ -1,5 +1,8 @@
+import contextlib
 import smtplib
 import logging
+import threading
+import time
 from email.mime.text import MIMEText
 
 from framework.celery_tasks import app
@@ -10,6 +13,78 @@ import sendgrid
 logger = logging.getLogger(__name__)
 
 
+class SMTPConnectionPool(object):
+    """Authenticated SMTP connections kept open between sends by this worker, so
+    consecutive emails skip the EHLO/STARTTLS/LOGIN handshake.
+    """
+
+    def __init__(self, max_idle):
+        self.max_idle = max_idle
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _connect(self, key):
+        server, username, password, ttls, login = key
+        connection = smtplib.SMTP(server)
+        connection.ehlo()
+        if ttls:
+            connection.starttls()
+            connection.ehlo()
+        if login:
+            connection.login(username, password)
+        return connection
+
+    def _checkout(self, key):
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                connection = idle.pop() if idle else None
+            if connection is None:
+                return self._connect(key)
+            try:
+                # The server may have dropped the connection while it was idle
+                if connection.noop()[0] == 250:
+                    return connection
+            except smtplib.SMTPException:
+                pass
+            self._close(connection)
+
+    def _checkin(self, key, connection):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(connection)
+                return
+        self._close(connection)
+
+    def _close(self, connection):
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, IOError):
+            connection.close()
+
+    @contextlib.contextmanager
+    def connection(self, username, password, ttls=True, login=True):
+        key = (settings.MAIL_SERVER, username, password, ttls, login)
+        connection = self._checkout(key)
+        try:
+            yield connection
+        except Exception:
+            self._close(connection)
+            raise
+        self._checkin(key, connection)
+
+    def clear(self):
+        with self._lock:
+            connections = [connection for idle in self._idle.values() for connection in idle]
+            self._idle = {}
+        for connection in connections:
+            self._close(connection)
+
+
+smtp_pool = SMTPConnectionPool(max_idle=settings.MAIL_SMTP_POOL_SIZE)
+
+
 @app.task
 def send_email(from_addr, to_addr, subject, message, mimetype='html', ttls=True, login=True,
                 username=None, password=None, categories=None, attachment_name=None, attachment_content=None):
@@ -33,6 +108,48 @@ def send_email(from_addr, to_addr, subject, message, mimetype='html', ttls=True,
     """
     if not settings.USE_EMAIL:
         return
+    return _send(
+        from_addr=from_addr,
+        to_addr=to_addr,
+        subject=subject,
+        message=message,
+        mimetype=mimetype,
+        ttls=ttls,
+        login=login,
+        username=username,
+        password=password,
+        categories=categories,
+        attachment_name=attachment_name,
+        attachment_content=attachment_content,
+    )
+
+
+@app.task
+def send_emails(messages):
+    """Send a batch of emails over pooled connections.
+
+    :param list messages: Dicts of keyword arguments for `send_email`
+    :return: Number of emails sent
+    """
+    if not settings.USE_EMAIL:
+        return
+    started = time.time()
+    sent = 0
+    for message in messages:
+        try:
+            if _send(**message):
+                sent += 1
+        except Exception:
+            logger.exception('Failed to send email to {}'.format(message.get('to_addr')))
+    elapsed = time.time() - started
+    logger.info('Sent {} of {} emails in {:.2f}s ({:.1f} emails/s)'.format(
+        sent, len(messages), elapsed, sent / elapsed if elapsed else float(sent)
+    ))
+    return sent
+
+
+def _send(from_addr, to_addr, subject, message, mimetype='html', ttls=True, login=True,
+          username=None, password=None, categories=None, attachment_name=None, attachment_content=None):
     if settings.SENDGRID_API_KEY:
         return _send_with_sendgrid(
             from_addr=from_addr,
@@ -70,24 +187,28 @@ def _send_with_smtp(from_addr, to_addr, subject, message, mimetype='html', ttls=
     msg['From'] = from_addr
     msg['To'] = to_addr
 
-    s = smtplib.SMTP(settings.MAIL_SERVER)
-    s.ehlo()
-    if ttls:
-        s.starttls()
-        s.ehlo()
-    if login:
-        s.login(username, password)
-    s.sendmail(
-        from_addr=from_addr,
-        to_addrs=[to_addr],
-        msg=msg.as_string()
-    )
-    s.quit()
+    with smtp_pool.connection(username, password, ttls=ttls, login=login) as s:
+        s.sendmail(
+            from_addr=from_addr,
+            to_addrs=[to_addr],
+            msg=msg.as_string()
+        )
     return True
 
+
+_sendgrid_client = None
+
+
+def _get_sendgrid_client():
+    global _sendgrid_client
+    if _sendgrid_client is None:
+        _sendgrid_client = sendgrid.SendGridClient(settings.SENDGRID_API_KEY)
+    return _sendgrid_client
+
+
 def _send_with_sendgrid(from_addr, to_addr, subject, message, mimetype='html', categories=None, attachment_name=None, attachment_content=None, client=None):
     if (settings.SENDGRID_WHITELIST_MODE and to_addr in settings.SENDGRID_EMAIL_WHITELIST) or settings.SENDGRID_WHITELIST_MODE is False:
-        client = client or sendgrid.SendGridClient(settings.SENDGRID_API_KEY)
+        client = client or _get_sendgrid_client()
         mail = sendgrid.Mail()
         mail.set_from(from_addr)
         mail.add_to(to_addr)
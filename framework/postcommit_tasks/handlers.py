@@ -83,6 +83,16 @@ def enqueue_postcommit_task(fn, args, kwargs, celery=False, once_per_request=Tru
     else:
         postcommit_queue().update({key: functools.partial(fn, *args, **kwargs)})
 
+def enqueue_postcommit_batch(fn, items):
+    """Add `items` to a set that is passed to a single call of `fn` once the
+    request has been committed, so work for many objects can be coalesced.
+    """
+    key = 'batch:{}.{}'.format(fn.__module__, fn.__name__)
+    queue = postcommit_queue()
+    if key not in queue:
+        queue[key] = functools.partial(fn, set())
+    queue[key].args[0].update(items)
+
 handlers = {
     'before_request': postcommit_before_request,
     'after_request': postcommit_after_request,
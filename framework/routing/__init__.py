@@ -9,7 +9,6 @@ import os
 
 from flask import request, make_response
 from mako.lookup import TemplateLookup
-from mako.template import Template
 import markupsafe
 from werkzeug.exceptions import NotFound
 import werkzeug.wrappers
@@ -18,6 +17,7 @@ from framework import sentry
 from framework.exceptions import HTTPError
 from framework.flask import app, redirect
 from framework.sessions import session
+from framework.templates import template_cache
 
 from website import settings
 
@@ -33,7 +33,8 @@ _TPL_LOOKUP = TemplateLookup(
         TEMPLATE_DIR,
         settings.ADDON_PATH,
     ],
-    module_directory='/tmp/mako_modules'
+    # Each lookup compiles with its own filters, so each needs its own modules
+    module_directory=os.path.join(settings.MAKO_MODULE_DIRECTORY, 'trusted'),
 )
 
 _TPL_LOOKUP_SAFE = TemplateLookup(
@@ -49,7 +50,7 @@ _TPL_LOOKUP_SAFE = TemplateLookup(
         TEMPLATE_DIR,
         settings.ADDON_PATH,
     ],
-    module_directory='/tmp/mako_modules',
+    module_directory=os.path.join(settings.MAKO_MODULE_DIRECTORY, 'escaped'),
 )
 
 REDIRECT_CODES = [
@@ -207,7 +208,14 @@ def render_mustache_string(tpl_string, data):
 def render_jinja_string(tpl, data):
     pass
 
-mako_cache = {}
+def _mako_template_args():
+    return {
+        'format_exceptions': settings.DEBUG_MODE,  # thanks to abought
+        'input_encoding': 'utf-8',
+        'output_encoding': 'utf-8',
+    }
+
+
 def render_mako_string(tpldir, tplname, data, trust=True):
     """Render a mako template to a string.
 
@@ -217,31 +225,40 @@ def render_mako_string(tpldir, tplname, data, trust=True):
     :param trust: Optional. If ``False``, markup-save escaping will be enabled
     """
 
-    show_errors = settings.DEBUG_MODE  # thanks to abought
     # TODO: The "trust" flag is expected to be temporary, and should be removed
     #       once all templates manually set it to False.
 
     lookup_obj = _TPL_LOOKUP_SAFE if trust is False else _TPL_LOOKUP
 
-    tpl = mako_cache.get(tplname)
-    if tpl is None:
-        with open(os.path.join(tpldir, tplname)) as f:
-            tpl_text = f.read()
-        tpl = Template(
-            tpl_text,
-            format_exceptions=show_errors,
-            lookup=lookup_obj,
-            input_encoding='utf-8',
-            output_encoding='utf-8',
-            default_filters=lookup_obj.template_args['default_filters'],
-            imports=lookup_obj.template_args['imports']  # FIXME: Temporary workaround for data stored in wrong format in DB. Unescape it before it gets re-escaped by Markupsafe. See [#OSF-4432]
-        )
-    # Don't cache in debug mode
-    if not app.debug:
-        mako_cache[tplname] = tpl
+    tpl = template_cache.get_template(
+        lookup_obj,
+        os.path.join(tpldir, tplname),
+        # Don't cache in debug mode
+        cached=not app.debug,
+        **_mako_template_args()
+    )
     return tpl.render(**data)
 
 
+# (template_dir, template_name, trust) of the mako templates rendered by WebRenderers
+web_templates = set()
+
+
+def warm_templates():
+    """Compile the templates of the WebRenderers created so far, e.g. by
+    `make_url_map`, before the first requests.
+
+    :return: Number of templates compiled
+    """
+    filenames = {_TPL_LOOKUP: [], _TPL_LOOKUP_SAFE: []}
+    for template_dir, template_name, trust in web_templates:
+        lookup_obj = _TPL_LOOKUP_SAFE if trust is False else _TPL_LOOKUP
+        filenames[lookup_obj].append(os.path.join(template_dir, template_name))
+    return sum(
+        template_cache.warm(lookup_obj, paths, **_mako_template_args())
+        for lookup_obj, paths in filenames.items()
+    )
+
 renderer_extension_map = {
     '.stache': render_mustache_string,
     '.jinja': render_jinja_string,
@@ -447,6 +464,10 @@ class WebRenderer(Renderer):
             error_renderer,
             self.error_template
         )
+        if self.renderer is render_mako_string and template_name:
+            web_templates.add((template_dir, template_name, trust))
+        if self.error_renderer is render_mako_string:
+            web_templates.add((template_dir, self.error_template, trust))
 
     def handle_error(self, error):
         """Handle an HTTPError.
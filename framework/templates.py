@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""Process-wide cache of compiled Mako templates, shared by the web renderers
+and the email templates.
+
+Templates are compiled to Python modules in the module directory of their
+lookup, so a new worker loads the modules written by the previous one instead
+of compiling every template again, and can be filled at startup with `warm`.
+"""
+import errno
+import logging
+import os
+import re
+import threading
+import time
+
+from mako.template import Template
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateCache(object):
+    """Compiled templates keyed by (lookup, template filename).
+
+    A template is compiled with the arguments of its lookup, so the escaped and
+    trusted lookups get their own copy of the same file. Includes and inherits
+    resolve from the root of the lookup directories.
+    """
+
+    def __init__(self):
+        self._templates = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.compile_time = 0.0
+
+    def get_template(self, lookup, filename, cached=True, **template_args):
+        """Return the compiled template for `filename`, compiling it on a miss.
+
+        :param TemplateLookup lookup: Lookup used for includes and inherits; its
+            template arguments are the defaults for the template
+        :param str filename: Path of the template file
+        :param bool cached: If ``False``, compile without caching, e.g. in debug mode
+        :param template_args: Overrides for the lookup's template arguments
+        :raises IOError: If the template file does not exist
+        """
+        filename = os.path.abspath(filename)
+        if not cached:
+            return self._compile(lookup, filename, template_args)
+        key = (lookup, filename)
+        template = self._templates.get(key)
+        if template is not None:
+            self.hits += 1
+            return template
+        with self._lock:
+            template = self._templates.get(key)
+            if template is None:
+                self.misses += 1
+                template = self._templates[key] = self._compile(lookup, filename, template_args)
+            else:
+                self.hits += 1
+        return template
+
+    def _compile(self, lookup, filename, template_args):
+        if not os.path.isfile(filename):
+            raise IOError(errno.ENOENT, 'Template not found', filename)
+        args = dict(lookup.template_args, **template_args)
+        started = time.time()
+        template = Template(
+            filename=filename,
+            # A top-level uri keeps relative includes resolving from the lookup
+            # directories, and gives each file its own module
+            uri='/' + re.sub(r'\W', '_', filename),
+            lookup=lookup,
+            **args
+        )
+        self.compile_time += time.time() - started
+        return template
+
+    def warm(self, lookup, filenames, **template_args):
+        """Compile `filenames` ahead of the first requests.
+
+        :return: Number of templates compiled
+        """
+        compiled = 0
+        for filename in filenames:
+            try:
+                self.get_template(lookup, filename, **template_args)
+            except Exception:
+                logger.exception('Could not compile template {}'.format(filename))
+            else:
+                compiled += 1
+        return compiled
+
+    def clear(self):
+        with self._lock:
+            self._templates = {}
+
+    def stats(self):
+        return {
+            'templates': len(self._templates),
+            'hits': self.hits,
+            'misses': self.misses,
+            'compile_time': self.compile_time,
+        }
+
+
+def find_templates(directory, extension='.mako'):
+    """Paths of the templates under `directory`."""
+    for root, dirs, files in os.walk(directory):
+        for name in files:
+            if name.endswith(extension):
+                yield os.path.join(root, name)
+
+
+template_cache = TemplateCache()
@@ -8,9 +8,14 @@ from django.db import transaction
 from flask import request, current_app, has_request_context, _request_ctx_stack
 from werkzeug.local import LocalProxy
 
+from osf.db import router
+from website import settings
+
 
 LOCK_ERROR_CODE = httplib.BAD_REQUEST
 NO_AUTO_TRANSACTION_ATTR = '_no_auto_transaction'
+READ_ONLY_ATTR = '_read_only_request'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +32,16 @@ def no_auto_transaction(func):
     return func
 
 
+def read_only_request(func):
+    """Run GET/HEAD/OPTIONS requests to the view in autocommit mode, with their
+    reads eligible for a replica. Only annotate views that don't write, or
+    whose writes neither rely on rollback nor on reads made earlier in the
+    request; all other requests are wrapped in a transaction.
+    """
+    setattr(func, READ_ONLY_ATTR, True)
+    return func
+
+
 def view_has_annotation(attr):
     try:
         endpoint = request.url_rule.endpoint
@@ -36,12 +51,31 @@ def view_has_annotation(attr):
     return getattr(view, attr, False)
 
 
+def is_read_only_request():
+    """Whether the current request should skip the per-request transaction.
+    """
+    return (
+        settings.READ_ONLY_REQUESTS and
+        request.method in SAFE_METHODS and
+        view_has_annotation(READ_ONLY_ATTR)
+    )
+
+
+def _is_read_only_context():
+    return getattr(_request_ctx_stack.top, 'read_only', False)
+
+
 def transaction_before_request():
-    """Setup transaction before handling the request.
+    """Setup transaction before handling the request. Read-only requests run
+    in autocommit and may have their reads routed to a replica.
     """
     if view_has_annotation(NO_AUTO_TRANSACTION_ATTR):
         return None
     ctx = _request_ctx_stack.top
+    if is_read_only_request():
+        ctx.read_only = True
+        router.set_read_only(True)
+        return None
     atomic = transaction.atomic()
     atomic.__enter__()
     ctx.current_atomic = atomic
@@ -53,6 +87,9 @@ def transaction_after_request(response, base_status_code_error=500):
     """
     if view_has_annotation(NO_AUTO_TRANSACTION_ATTR):
         return response
+    if _is_read_only_context():
+        router.set_read_only(False)
+        return response
     if response.status_code >= base_status_code_error:
         # Construct an error in order to trigger rollback in transaction.atomic().__exit__
         exc_type = HTTPError
@@ -70,6 +107,9 @@ def transaction_teardown_request(error=None):
     """
     if view_has_annotation(NO_AUTO_TRANSACTION_ATTR):
         return
+    if _is_read_only_context():
+        router.set_read_only(False)
+        return
     if error is not None and current_atomic:
         current_atomic.__exit__(error.__class__, error, None)
 
@@ -1,23 +1,102 @@
+import contextlib
+import logging
+import random
+import threading
+import time
+
 from django.conf import settings
+from django.db import connections, DatabaseError
 import psycopg2
 
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+# Seconds the replica is behind the master; 0 when it has replayed everything it received.
+# PostgreSQL 10 renamed the xlog functions, see REPLICA_LAG_SQL_PRE_10
+REPLICA_LAG_SQL = '''
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END;
+'''
+REPLICA_LAG_SQL_PRE_10 = '''
+    SELECT CASE
+        WHEN pg_last_xlog_receive_location() = pg_last_xlog_replay_location() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END;
+'''
+
+
+def set_read_only(read_only=True):
+    """
+    Marks the current request or task as read-only, making its reads eligible to be served by a replica.
+    Also forgets any write made earlier on this thread.
+    :param read_only: bool
+    :return: None
+    """
+    _local.read_only = read_only
+    _local.wrote_to_master = False
+
+
+def is_read_only():
+    return getattr(_local, 'read_only', False)
+
+
+def has_written():
+    return getattr(_local, 'wrote_to_master', False)
+
+
+@contextlib.contextmanager
+def read_from_replica():
+    """
+    Context manager that lets the reads made inside it be served by a replica, e.g. for reporting scripts.
+    """
+    previous = (is_read_only(), has_written())
+    set_read_only(True)
+    try:
+        yield
+    finally:
+        _local.read_only, _local.wrote_to_master = previous
+
 
 class PostgreSQLFailoverRouter(object):
     """
     A custom database router that loops through the databases defined in django.conf.settings.DATABASES and returns the
     first one that is not read only. If it finds none that are writable it calls exit() in order to convince docker
-    to restart the container.
+    to restart the container. Reads made while `is_read_only()` is set are sent to one of the read only databases,
+    unless all of them lag more than settings.REPLICA_MAX_LAG seconds behind or the request has already written to
+    the master, in which case the master is used so the request reads its own writes.
     """
     DSNS = dict()
     CACHED_MASTER = None
+    CACHED_REPLICAS = None
+    REPLICA_LAG = dict()
 
     def __init__(self):
         """
-        Builds the list of DSNs from django's config and determines the writeable host.
+        Builds the list of DSNs from django's config and determines the writeable host and the replicas.
         """
         self._get_dsns()
         if not self.CACHED_MASTER:
             self.CACHED_MASTER = self._get_master()
+        if self.CACHED_REPLICAS is None:
+            self.CACHED_REPLICAS = self._get_replicas()
+
+    def _is_read_only(self, dsn):
+        """
+        Checks whether the database behind a DSN is read only
+        :param dsn: postgres DSN
+        :return: bool
+        """
+        conn = self._get_conn(dsn)
+        cur = conn.cursor()
+        try:
+            cur.execute('SHOW transaction_read_only;')  # 'on' for slaves, 'off' for masters
+            return cur.fetchone()[0] == u'on'
+        finally:
+            cur.close()
+            conn.close()
 
     def _get_master(self):
         """
@@ -25,18 +104,51 @@ class PostgreSQLFailoverRouter(object):
         :return: :str: name of database config or None
         """
         for name, dsn in self.DSNS.iteritems():
-            conn = self._get_conn(dsn)
-            cur = conn.cursor()
-            cur.execute('SHOW transaction_read_only;')  # 'on' for slaves, 'off' for masters
-            row = cur.fetchone()
-            if row[0] == u'off':
-                cur.close()
-                conn.close()
+            if not self._is_read_only(dsn):
                 return name
-            cur.close()
-            conn.close()
         return None
 
+    def _get_replicas(self):
+        """
+        Finds the databases that are read only
+        :return: :list: names of database configs
+        """
+        return sorted(name for name, dsn in self.DSNS.iteritems() if name != self.CACHED_MASTER and self._is_read_only(dsn))
+
+    def _get_replica_lag(self, name):
+        """
+        Returns the replication lag of a replica in seconds, re-checked at most every
+        settings.REPLICA_LAG_CHECK_INTERVAL seconds
+        :param name: name of database config
+        :return: :float: lag or None if the replica could not be reached
+        """
+        checked_at, lag = self.REPLICA_LAG.get(name, (0, None))
+        now = time.time()
+        if now - checked_at < settings.REPLICA_LAG_CHECK_INTERVAL:
+            return lag
+        try:
+            connection = connections[name]
+            with connection.cursor() as cursor:
+                cursor.execute(REPLICA_LAG_SQL if connection.pg_version >= 100000 else REPLICA_LAG_SQL_PRE_10)
+                lag = float(cursor.fetchone()[0])
+        except DatabaseError:
+            logger.exception('Unable to check replication lag of {}'.format(name))
+            lag = None
+        self.REPLICA_LAG[name] = (now, lag)
+        return lag
+
+    def _get_replica(self):
+        """
+        Picks a replica that is close enough to the master to read from
+        :return: :str: name of database config or None
+        """
+        replicas = []
+        for name in self.CACHED_REPLICAS:
+            lag = self._get_replica_lag(name)
+            if lag is not None and lag <= settings.REPLICA_MAX_LAG:
+                replicas.append(name)
+        return random.choice(replicas) if replicas else None
+
     def _get_dsns(self):
         """
         Builds a list of databases DSNs
@@ -67,6 +179,8 @@ class PostgreSQLFailoverRouter(object):
         """
         if not self.CACHED_MASTER:
             exit()
+        if self.CACHED_REPLICAS and is_read_only() and not has_written():
+            return self._get_replica() or self.CACHED_MASTER
         return self.CACHED_MASTER
 
     def db_for_write(self, model, **hints):
@@ -78,11 +192,15 @@ class PostgreSQLFailoverRouter(object):
         """
         if not self.CACHED_MASTER:
             exit()
+        # Stick to the master for the remainder of the request
+        _local.wrote_to_master = True
         return self.CACHED_MASTER
 
     def allow_relation(self, obj1, obj2, **hints):
-        # None if the router has no opinion
+        # Objects read from a replica may be related to objects from the master, they hold the same data
         # https://docs.djangoproject.com/en/1.10/topics/db/multi-db/#allow_relation
+        if obj1._state.db in self.DSNS and obj2._state.db in self.DSNS:
+            return True
         return None
 
     def allow_migrate(self, db, app_label, model_name=None, **hints):
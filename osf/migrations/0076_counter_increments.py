@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.7 on 2017-12-12 15:02
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0075_merge_20171207_1511'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageCounterIncrement',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('page', models.CharField(db_index=True, max_length=300)),
+                ('date', models.CharField(max_length=10)),
+                ('total', models.PositiveSmallIntegerField(default=0)),
+                ('unique', models.PositiveSmallIntegerField(default=0)),
+                ('date_total', models.PositiveSmallIntegerField(default=0)),
+                ('date_unique', models.PositiveSmallIntegerField(default=0)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='UserActivityIncrement',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('user_id', models.CharField(db_index=True, max_length=5)),
+                ('action', models.CharField(max_length=255)),
+                ('date', models.CharField(max_length=10)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
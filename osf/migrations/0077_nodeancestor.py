@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.7 on 2017-12-14 10:21
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0076_counter_increments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NodeAncestor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_relations', to='osf.AbstractNode')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_relations', to='osf.AbstractNode')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='nodeancestor',
+            unique_together=set([('ancestor', 'descendant')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='nodeancestor',
+            index_together=set([('descendant', 'depth')]),
+        ),
+        migrations.RunSQL([
+            '''
+            INSERT INTO osf_nodeancestor (ancestor_id, descendant_id, depth)
+            WITH RECURSIVE closure AS (
+                SELECT parent_id AS ancestor_id, child_id AS descendant_id, 1 AS depth, ARRAY[child_id] AS path
+                FROM osf_noderelation
+                WHERE is_node_link IS FALSE
+              UNION ALL
+                SELECT R.parent_id, C.descendant_id, C.depth + 1, C.path || R.child_id
+                FROM closure AS C
+                JOIN osf_noderelation AS R ON R.child_id = C.ancestor_id
+                WHERE R.is_node_link IS FALSE
+                AND NOT R.parent_id = ANY(C.path)
+            ) SELECT ancestor_id, descendant_id, MIN(depth)
+            FROM closure
+            GROUP BY ancestor_id, descendant_id;
+            '''
+        ], [
+            'DELETE FROM osf_nodeancestor;'
+        ]),
+    ]
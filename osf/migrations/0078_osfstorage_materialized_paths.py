@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.7 on 2017-12-18 15:02
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0077_nodeancestor'),
+    ]
+
+    operations = [
+        # Trashed files keep the path they had when they were deleted
+        migrations.RunSQL([
+            """
+            WITH RECURSIVE paths(id, path) AS (
+              SELECT T.id, T.name || '/'
+              FROM osf_basefilenode AS T
+              WHERE T.parent_id IS NULL
+              AND T.type = 'osf.osfstoragefolder'
+              UNION ALL
+              SELECT
+                T.id,
+                P.path || T.name || CASE WHEN T.type = 'osf.osfstoragefolder' THEN '/' ELSE '' END
+              FROM paths AS P
+                JOIN osf_basefilenode AS T ON T.parent_id = P.id
+              WHERE T.type IN ('osf.osfstoragefile', 'osf.osfstoragefolder')
+            )
+            UPDATE osf_basefilenode AS T
+            SET _materialized_path = P.path
+            FROM paths AS P
+            WHERE T.id = P.id;
+            """,
+            'CREATE INDEX osf_basefilenode_materialized_path ON osf_basefilenode (node_id, _materialized_path text_pattern_ops);',
+        ], [
+            'DROP INDEX IF EXISTS osf_basefilenode_materialized_path RESTRICT;',
+            "UPDATE osf_basefilenode SET _materialized_path = '' WHERE type IN ('osf.osfstoragefile', 'osf.osfstoragefolder');",
+        ])
+    ]
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.7 on 2017-12-19 11:40
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0078_osfstorage_materialized_paths'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='basefilenode',
+            name='download_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='basefilenode',
+            name='earliest_version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='osf.FileVersion'),
+        ),
+        migrations.AddField(
+            model_name='basefilenode',
+            name='latest_version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='osf.FileVersion'),
+        ),
+        migrations.AddField(
+            model_name='basefilenode',
+            name='version_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunSQL([
+            """
+            UPDATE osf_basefilenode AS F
+            SET version_count = V.version_count,
+                earliest_version_id = V.earliest_version_id,
+                latest_version_id = V.latest_version_id
+            FROM (
+                SELECT
+                    BV.basefilenode_id,
+                    COUNT(*) AS version_count,
+                    (array_agg(FV.id ORDER BY FV.created ASC))[1] AS earliest_version_id,
+                    (array_agg(FV.id ORDER BY FV.created DESC))[1] AS latest_version_id
+                FROM osf_basefilenode_versions AS BV
+                JOIN osf_fileversion AS FV ON FV.id = BV.fileversion_id
+                GROUP BY BV.basefilenode_id
+            ) AS V
+            WHERE F.id = V.basefilenode_id
+            AND F.type = 'osf.osfstoragefile';
+            """,
+            # Download counters are keyed by download:<node>:<file>; later folds keep them up to date
+            """
+            UPDATE osf_basefilenode AS F
+            SET download_count = P.total
+            FROM osf_pagecounter AS P
+            WHERE P._id LIKE 'download:%'
+            AND split_part(P._id, ':', 4) = ''
+            AND F._id = split_part(P._id, ':', 3)
+            AND F.type = 'osf.osfstoragefile';
+            """,
+        ], migrations.RunSQL.noop),
+    ]
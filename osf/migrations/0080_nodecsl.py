@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.7 on 2017-12-20 09:12
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django_extensions.db.fields
+import osf.utils.datetime_aware_jsonfield
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0079_basefilenode_version_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NodeCSL',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('csl', osf.utils.datetime_aware_jsonfield.DateTimeAwareJSONField(default=dict)),
+                ('node', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='cached_csl', to='osf.AbstractNode')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -11,7 +11,7 @@ from osf.models.nodelog import NodeLog  # noqa
 from osf.models.tag import Tag  # noqa
 from osf.models.comment import Comment  # noqa
 from osf.models.conference import Conference, MailRecord  # noqa
-from osf.models.citation import CitationStyle  # noqa
+from osf.models.citation import CitationStyle, NodeCSL  # noqa
 from osf.models.archive import ArchiveJob, ArchiveTarget  # noqa
 from osf.models.queued_mail import QueuedMail  # noqa
 from osf.models.external import ExternalAccount, ExternalProvider  # noqa
@@ -29,8 +29,8 @@ from osf.models.files import (  # noqa
     File, Folder,  # noqa
     FileVersion, TrashedFile, TrashedFileNode, TrashedFolder,  # noqa
 )  # noqa
-from osf.models.node_relation import NodeRelation  # noqa
-from osf.models.analytics import UserActivityCounter, PageCounter  # noqa
+from osf.models.node_relation import NodeAncestor, NodeRelation  # noqa
+from osf.models.analytics import UserActivityCounter, UserActivityIncrement, PageCounter, PageCounterIncrement  # noqa
 from osf.models.admin_profile import AdminProfile  # noqa
 from osf.models.admin_log_entry import AdminLogEntry  # noqa
 from osf.models.maintenance_state import MaintenanceState  # noqa
@@ -1,16 +1,29 @@
 import logging
+from collections import defaultdict
 
 from dateutil import parser
-from django.db import models, transaction
+from django.db import connection, models, transaction
+from django.db.models import Count, Sum
 from django.utils import timezone
 
 from framework.sessions import session
 from osf.models.base import BaseModel
 from osf.utils.datetime_aware_jsonfield import DateTimeAwareJSONField
+from website import settings
 
 logger = logging.getLogger(__name__)
 
 
+class UserActivityIncrement(BaseModel):
+    """Append-only record of a single user action. Rows are folded into
+    ``UserActivityCounter`` by ``UserActivityCounter.fold_increments`` so that
+    recording an action never contends for the counter row lock.
+    """
+    user_id = models.CharField(max_length=5, db_index=True)
+    action = models.CharField(max_length=255)
+    date = models.CharField(max_length=10)
+
+
 class UserActivityCounter(BaseModel):
     primary_identifier_name = '_id'
 
@@ -22,36 +35,70 @@ class UserActivityCounter(BaseModel):
 
     @classmethod
     def get_total_activity_count(cls, user_id):
+        pending = UserActivityIncrement.objects.filter(user_id=user_id).count()
         try:
-            return cls.objects.get(_id=user_id).total
+            return cls.objects.get(_id=user_id).total + pending
         except cls.DoesNotExist:
-            return 0
+            return pending
 
     @classmethod
     def increment(cls, user_id, action, date_string):
         date = parser.parse(date_string).strftime('%Y/%m/%d')
-        with transaction.atomic():
-            # select_for_update locks the row but only inside a transaction
-            uac, created = cls.objects.select_for_update().get_or_create(_id=user_id)
-            if uac.total > 0:
-                uac.total += 1
-            else:
-                uac.total = 1
-            if action in uac.action:
-                uac.action[action]['total'] += 1
-                if date in uac.action[action]['date']:
-                    uac.action[action]['date'][date] += 1
-                else:
-                    uac.action[action]['date'][date] = 1
-            else:
-                uac.action[action] = dict(total=1, date={date: 1})
-            if date in uac.date:
-                uac.date[date]['total'] += 1
-            else:
-                uac.date[date] = dict(total=1)
-            uac.save()
+        UserActivityIncrement.objects.create(user_id=user_id, action=action, date=date)
         return True
 
+    @classmethod
+    def fold_increments(cls, batch_size=None):
+        """Fold up to ``batch_size`` pending increments into their counters.
+        Rows locked by a concurrent fold are skipped, so folds may overlap.
+
+        :return int: Number of increments folded
+        """
+        batch_size = batch_size or settings.ANALYTICS_FOLD_BATCH_SIZE
+        with transaction.atomic():
+            pending = list(
+                UserActivityIncrement.objects.select_for_update(skip_locked=True)
+                .order_by('id').values_list('id', 'user_id', 'action', 'date')[:batch_size]
+            )
+            if not pending:
+                return 0
+
+            folded = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+            for _, user_id, action, date in pending:
+                folded[user_id][action][date] += 1
+
+            # Lock counters in a stable order to avoid deadlocking with another fold
+            for user_id in sorted(folded):
+                uac, created = cls.objects.select_for_update().get_or_create(_id=user_id)
+                for action, dates in folded[user_id].items():
+                    action_counts = uac.action.setdefault(action, dict(total=0, date={}))
+                    for date, count in dates.items():
+                        uac.total += count
+                        action_counts['total'] += count
+                        action_counts['date'][date] = action_counts['date'].get(date, 0) + count
+                        date_counts = uac.date.setdefault(date, dict(total=0))
+                        date_counts['total'] += count
+                uac.save()
+
+            UserActivityIncrement.objects.filter(id__in=[row[0] for row in pending]).delete()
+        return len(pending)
+
+
+class PageCounterIncrement(BaseModel):
+    """Append-only record of a single page view or download. ``total`` and
+    ``unique`` are 0 or 1 depending on whether the hit counts towards the
+    all-time totals; ``date_total`` and ``date_unique`` do the same for the
+    per-day breakdown. Rows are folded into ``PageCounter`` by
+    ``PageCounter.fold_increments``.
+    """
+    page = models.CharField(max_length=300, db_index=True)
+    date = models.CharField(max_length=10)
+
+    total = models.PositiveSmallIntegerField(default=0)
+    unique = models.PositiveSmallIntegerField(default=0)
+    date_total = models.PositiveSmallIntegerField(default=0)
+    date_unique = models.PositiveSmallIntegerField(default=0)
+
 
 class PageCounter(BaseModel):
     primary_identifier_name = '_id'
@@ -77,68 +124,133 @@ class PageCounter(BaseModel):
         date = timezone.now()
         date_string = date.strftime('%Y/%m/%d')
         visited_by_date = session.data.get('visited_by_date', {'date': date_string, 'pages': []})
+        increment = PageCounterIncrement(page=cleaned_page, date=date_string, date_total=1)
+
+        # if they visited something today
+        if date_string == visited_by_date['date']:
+            # if they haven't visited this page today
+            if cleaned_page not in visited_by_date['pages']:
+                increment.date_unique = 1
+        # if they haven't visited something today
+        else:
+            # set their visited by date to blank
+            visited_by_date['date'] = date_string
+            visited_by_date['pages'] = []
+            increment.date_unique = 1
+
+        # update their sessions
+        visited_by_date['pages'].append(cleaned_page)
+        session.data['visited_by_date'] = visited_by_date
+
+        # if a download counter is being updated, only perform the update
+        # if the user who is downloading isn't a contributor to the project
+        page_type = cleaned_page.split(':')[0]
+        if page_type == 'download' and node_info:
+            if node_info['contributors'].filter(guids___id__isnull=False, guids___id=session.data.get('auth_user_id')).exists():
+                increment.save()
+                return
+
+        visited = session.data.get('visited', [])
+        if page not in visited:
+            increment.unique = 1
+            visited.append(page)
+            session.data['visited'] = visited
 
+        session.save()
+        increment.total = 1
+
+        increment.save()
+
+    @classmethod
+    def fold_increments(cls, batch_size=None):
+        """Fold up to ``batch_size`` pending increments into their counters.
+        Rows locked by a concurrent fold are skipped, so folds may overlap.
+
+        :return int: Number of increments folded
+        """
+        batch_size = batch_size or settings.ANALYTICS_FOLD_BATCH_SIZE
         with transaction.atomic():
-            model_instance, created = cls.objects.select_for_update().get_or_create(_id=cleaned_page)
-
-            # if they visited something today
-            if date_string == visited_by_date['date']:
-                # if they haven't visited this page today
-                if cleaned_page not in visited_by_date['pages']:
-                    # if the model_instance has today in it
-                    if date_string in model_instance.date.keys():
-                        # increment the number of unique visitors for today
-                        model_instance.date[date_string]['unique'] += 1
-                    else:
-                        # set the number of unique visitors for today to 1
-                        model_instance.date[date_string] = dict(unique=1)
-            # if they haven't visited something today
-            else:
-                # set their visited by date to blank
-                visited_by_date['date'] = date_string
-                visited_by_date['pages'] = []
-                # if the model_instance has today in it
-                if date_string in model_instance.date.keys():
-                    # increment the number of unique visitors for today
-                    model_instance.date[date_string]['unique'] += 1
-                else:
-                    # set the number of unique visitors to 1
-                    model_instance.date[date_string] = dict(unique=1)
-
-            # update their sessions
-            visited_by_date['pages'].append(cleaned_page)
-            session.data['visited_by_date'] = visited_by_date
-
-            if date_string in model_instance.date.keys():
-                if 'total' not in model_instance.date[date_string].keys():
-                    model_instance.date[date_string].update(total=0)
-                model_instance.date[date_string]['total'] += 1
-            else:
-                model_instance.date[date_string] = dict(total=1)
-
-            # if a download counter is being updated, only perform the update
-            # if the user who is downloading isn't a contributor to the project
-            page_type = cleaned_page.split(':')[0]
-            if page_type == 'download' and node_info:
-                if node_info['contributors'].filter(guids___id__isnull=False, guids___id=session.data.get('auth_user_id')).exists():
-                    model_instance.save()
-                    return
-
-            visited = session.data.get('visited', [])
-            if page not in visited:
-                model_instance.unique += 1
-                visited.append(page)
-                session.data['visited'] = visited
-
-            session.save()
-            model_instance.total += 1
-
-            model_instance.save()
+            pending = list(
+                PageCounterIncrement.objects.select_for_update(skip_locked=True)
+                .order_by('id').values_list('id', 'page', 'date', 'total', 'unique', 'date_total', 'date_unique')[:batch_size]
+            )
+            if not pending:
+                return 0
+
+            folded = defaultdict(lambda: {'total': 0, 'unique': 0, 'date': defaultdict(lambda: defaultdict(int))})
+            for _, page, date, total, unique, date_total, date_unique in pending:
+                folded[page]['total'] += total
+                folded[page]['unique'] += unique
+                folded[page]['date'][date]['total'] += date_total
+                folded[page]['date'][date]['unique'] += date_unique
+
+            # Lock counters in a stable order to avoid deadlocking with another fold
+            downloads = {}
+            for page in sorted(folded):
+                counts = folded[page]
+                model_instance, created = cls.objects.select_for_update().get_or_create(_id=page)
+                model_instance.total += counts['total']
+                model_instance.unique += counts['unique']
+                for date, date_counts in counts['date'].items():
+                    day = model_instance.date.setdefault(date, {})
+                    day['total'] = day.get('total', 0) + date_counts['total']
+                    if date_counts['unique']:
+                        day['unique'] = day.get('unique', 0) + date_counts['unique']
+                model_instance.save()
+
+                # download:<node>:<file>, but not download:<node>:<file>:<version>
+                parts = page.split(':')
+                if parts[0] == 'download' and len(parts) == 3:
+                    downloads[parts[2]] = model_instance.total
+
+            cls._update_file_download_counts(downloads)
+            PageCounterIncrement.objects.filter(id__in=[row[0] for row in pending]).delete()
+        return len(pending)
+
+    @staticmethod
+    def _update_file_download_counts(downloads):
+        """Copy the folded download totals to ``BaseFileNode.download_count``.
+
+        :param dict downloads: Mapping of file _id to total downloads
+        """
+        if not downloads:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                UPDATE osf_basefilenode AS F
+                SET download_count = D.total
+                FROM (VALUES {}) AS D(_id, total)
+                WHERE F._id = D._id;
+                """.format(', '.join(['(%s, %s)'] * len(downloads))),
+                [value for item in downloads.items() for value in item]
+            )
+
+    @classmethod
+    def get_download_counts(cls, prefix):
+        """Return a mapping of page id to total count, including increments
+        that have not been folded yet, for every counter starting with ``prefix``.
+        """
+        # Don't worry. The only % at the end of the LIKE clause, the index is still used
+        counts = defaultdict(int, cls.objects.filter(_id__startswith=prefix).values_list('_id', 'total'))
+        pending = (
+            PageCounterIncrement.objects.filter(page__startswith=prefix)
+            .values('page').annotate(pending_total=Sum('total')).values_list('page', 'pending_total')
+        )
+        for page, total in pending:
+            counts[page] += total
+        return dict(counts)
 
     @classmethod
     def get_basic_counters(cls, page):
+        cleaned_page = cls.clean_page(page)
+        pending = PageCounterIncrement.objects.filter(page=cleaned_page).aggregate(
+            hits=Count('id'), total=Sum('total'), unique=Sum('unique')
+        )
         try:
-            counter = cls.objects.get(_id=cls.clean_page(page))
-            return (counter.unique, counter.total)
+            counter = cls.objects.get(_id=cleaned_page)
         except cls.DoesNotExist:
-            return (None, None)
+            if not pending['hits']:
+                return (None, None)
+            return (pending['unique'], pending['total'])
+        return (counter.unique + (pending['unique'] or 0), counter.total + (pending['total'] or 0))
@@ -1,6 +1,10 @@
+from django.contrib.contenttypes.models import ContentType
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils import timezone
 from osf.models.base import BaseModel
+from osf.utils.datetime_aware_jsonfield import DateTimeAwareJSONField
 from osf.utils.fields import NonNaiveDateTimeField
 
 
@@ -36,3 +40,33 @@ class CitationStyle(BaseModel):
             'summary': self.summary,
             'has_bibliography': self.has_bibliography
         }
+
+
+class NodeCSL(BaseModel):
+    """CSL-JSON of a node as built by ``AbstractNode.csl``, except for the issued
+    date, which changes with every log.
+
+    Deleted, to be built again on the next read, when the title, the
+    contributors, their names or the DOI of the node change.
+    """
+    node = models.OneToOneField('osf.AbstractNode', related_name='cached_csl', on_delete=models.CASCADE)
+    csl = DateTimeAwareJSONField(default=dict)
+
+    @classmethod
+    def invalidate(cls, **filters):
+        cls.objects.filter(**filters).delete()
+
+
+@receiver(post_save, sender='osf.Contributor')
+@receiver(post_delete, sender='osf.Contributor')
+def invalidate_contributor_csl(sender, instance, **kwargs):
+    NodeCSL.invalidate(node_id=instance.node_id)
+
+
+@receiver(post_save, sender='osf.Identifier')
+@receiver(post_delete, sender='osf.Identifier')
+def invalidate_identifier_csl(sender, instance, **kwargs):
+    if instance.category != 'doi' or not instance.content_type_id:
+        return
+    if ContentType.objects.get_for_id(instance.content_type_id).model == 'abstractnode':
+        NodeCSL.invalidate(node_id=instance.object_id)
@@ -90,6 +90,12 @@ class BaseFileNode(TypedModel, CommentableMixin, OptionalGuidMixin, Taggable, Ob
     _history = DateTimeAwareJSONField(default=list, blank=True)
     # A concrete version of a FileNode, must have an identifier
     versions = models.ManyToManyField('FileVersion')
+    # Denormalized from versions and the download PageCounter for folder listings,
+    # only maintained for OsfStorage
+    latest_version = models.ForeignKey('FileVersion', blank=True, null=True, related_name='+', on_delete=models.SET_NULL)
+    earliest_version = models.ForeignKey('FileVersion', blank=True, null=True, related_name='+', on_delete=models.SET_NULL)
+    version_count = models.PositiveIntegerField(default=0)
+    download_count = models.PositiveIntegerField(default=0)
 
     node = models.ForeignKey('osf.AbstractNode', blank=True, null=True, related_name='files', on_delete=models.CASCADE)
     parent = models.ForeignKey('self', blank=True, null=True, default=None, related_name='_children', on_delete=models.CASCADE)
@@ -5,16 +5,14 @@ import re
 import urlparse
 import warnings
 
-import bson
 from django.db.models import Q
 from dirtyfields import DirtyFieldsMixin
 from django.apps import apps
 from django.contrib.contenttypes.fields import GenericRelation
-from django.core.paginator import Paginator
 from django.core.exceptions import ValidationError
 from django.core.urlresolvers import reverse
 from django.db import models, transaction, connection
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.functional import cached_property
@@ -28,15 +26,17 @@ from framework.celery_tasks.handlers import enqueue_task
 from framework.exceptions import PermissionsError
 from framework.sentry import log_exception
 from reviews.workflow import States
+from addons.wiki import settings as wiki_settings
 from addons.wiki.utils import to_mongo_key
 from osf.exceptions import ValidationValueError
+from osf.models.citation import NodeCSL
 from osf.models.contributor import (Contributor, RecentlyAddedContributor,
                                     get_contributor_permissions)
 from osf.models.identifiers import Identifier, IdentifierMixin
 from osf.models.licenses import NodeLicenseRecord
 from osf.models.mixins import (AddonModelMixin, CommentableMixin, Loggable,
                                NodeLinkMixin, Taggable)
-from osf.models.node_relation import NodeRelation
+from osf.models.node_relation import NodeAncestor, NodeRelation
 from osf.models.nodelog import NodeLog
 from osf.models.sanctions import RegistrationApproval
 from osf.models.private_link import PrivateLink
@@ -45,6 +45,7 @@ from osf.models.tag import Tag
 from osf.models.user import OSFUser
 from osf.models.validators import validate_doi, validate_title
 from framework.auth.core import Auth, get_user
+from osf.utils import permission_cache
 from osf.utils.datetime_aware_jsonfield import DateTimeAwareJSONField
 from osf.utils.fields import NonNaiveDateTimeField
 from osf.utils.requests import DummyRequest, get_request_and_user_id
@@ -85,44 +86,12 @@ class AbstractNodeQuerySet(GuidMixinQuerySet):
                 query = query.filter(is_deleted=False)
             return query
         else:
-            sql = """
-                WITH RECURSIVE descendants AS (
-                SELECT
-                    parent_id,
-                    child_id,
-                    1 AS LEVEL,
-                    ARRAY[parent_id] as pids
-                FROM %s
-                %s
-                WHERE is_node_link IS FALSE AND parent_id = %s %s
-                UNION ALL
-                SELECT
-                    d.parent_id,
-                    s.child_id,
-                    d.level + 1,
-                    d.pids || s.parent_id
-                FROM descendants AS d
-                    JOIN %s AS s
-                    ON d.child_id = s.parent_id
-                WHERE s.is_node_link IS FALSE AND %s = ANY(pids)
-                ) SELECT array_agg(DISTINCT child_id)
-                FROM descendants
-                WHERE parent_id = %s;
-            """
-            with connection.cursor() as cursor:
-                node_relation_table = AsIs(NodeRelation._meta.db_table)
-                cursor.execute(sql, [
-                    node_relation_table,
-                    AsIs('LEFT JOIN osf_abstractnode ON {}.child_id = osf_abstractnode.id'.format(node_relation_table) if active else ''),
-                    root.pk,
-                    AsIs('AND osf_abstractnode.is_deleted IS FALSE' if active else ''),
-                    node_relation_table,
-                    root.pk,
-                    root.pk])
-                row = cursor.fetchone()[0]
-                if not row:
-                    return AbstractNode.objects.none()
-                return AbstractNode.objects.filter(id__in=row)
+            query = AbstractNode.objects.filter(
+                id__in=NodeAncestor.objects.filter(ancestor=root).values('descendant_id')
+            )
+            if active:
+                query = query.filter(is_deleted=False)
+            return query
 
     def can_view(self, user=None, private_link=None):
         qs = self.filter(is_public=True)
@@ -145,19 +114,18 @@ class AbstractNodeQuerySet(GuidMixinQuerySet):
             qs |= self.annotate(can_view=models.Exists(sqs)).filter(can_view=True)
             qs |= self.extra(where=['''
                 "osf_abstractnode".id in (
-                    WITH RECURSIVE implicit_read AS (
-                        SELECT "osf_contributor"."node_id"
-                        FROM "osf_contributor"
-                        WHERE "osf_contributor"."user_id" = %s
-                        AND "osf_contributor"."admin" is TRUE
-                    UNION ALL
-                        SELECT "osf_noderelation"."child_id"
-                        FROM "implicit_read"
-                        LEFT JOIN "osf_noderelation" ON "osf_noderelation"."parent_id" = "implicit_read"."node_id"
-                        WHERE "osf_noderelation"."is_node_link" IS FALSE
-                    ) SELECT * FROM implicit_read
+                    SELECT "osf_contributor"."node_id"
+                    FROM "osf_contributor"
+                    WHERE "osf_contributor"."user_id" = %s
+                    AND "osf_contributor"."admin" is TRUE
+                UNION ALL
+                    SELECT "osf_nodeancestor"."descendant_id"
+                    FROM "osf_nodeancestor"
+                    JOIN "osf_contributor" ON "osf_contributor"."node_id" = "osf_nodeancestor"."ancestor_id"
+                    WHERE "osf_contributor"."user_id" = %s
+                    AND "osf_contributor"."admin" is TRUE
                 )
-            '''], params=(user, ))
+            '''], params=(user, user))
 
         return qs
 
@@ -248,25 +216,16 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
     PRIVATE = 'private'
     PUBLIC = 'public'
 
-    LICENSE_QUERY = re.sub('\s+', ' ', '''WITH RECURSIVE ascendants AS (
-            SELECT
-                N.node_license_id,
-                R.parent_id
-            FROM "{noderelation}" AS R
-                JOIN "{abstractnode}" AS N ON N.id = R.parent_id
-            WHERE R.is_node_link IS FALSE
-                AND R.child_id = %s
-        UNION ALL
-            SELECT
-                N.node_license_id,
-                R.parent_id
-            FROM ascendants AS D
-                JOIN "{noderelation}" AS R ON D.parent_id = R.child_id
-                JOIN "{abstractnode}" AS N ON N.id = R.parent_id
-            WHERE R.is_node_link IS FALSE
-            AND D.node_license_id IS NULL
-    ) SELECT {fields} FROM "{nodelicenserecord}"
-    WHERE id = (SELECT node_license_id FROM ascendants WHERE node_license_id IS NOT NULL) LIMIT 1;''')
+    LICENSE_QUERY = re.sub('\s+', ' ', '''SELECT {fields} FROM "{nodelicenserecord}"
+    WHERE id = (
+        SELECT N.node_license_id
+        FROM "{nodeancestor}" AS A
+            JOIN "{abstractnode}" AS N ON N.id = A.ancestor_id
+        WHERE A.descendant_id = %s
+            AND N.node_license_id IS NOT NULL
+        ORDER BY A.depth
+        LIMIT 1
+    );''')
 
     affiliated_institutions = models.ManyToManyField('Institution', related_name='nodes')
     category = models.CharField(max_length=255,
@@ -660,6 +619,19 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
         For details on this schema, see:
             https://github.com/citation-style-language/schema#csl-json-schema
         """
+        cached = NodeCSL.objects.filter(node=self).values_list('csl', flat=True).first()
+        if cached is None:
+            cached = self._build_csl()
+            NodeCSL.objects.get_or_create(node=self, defaults={'csl': cached})
+        csl = dict(cached)
+
+        issued = self.logs.order_by('-date').values_list('date', flat=True).first()
+        if issued:
+            csl['issued'] = datetime_to_csl(issued)
+
+        return csl
+
+    def _build_csl(self):
         csl = {
             'id': self._id,
             'title': sanitize.unescape_entities(self.title),
@@ -676,9 +648,6 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
         if doi:
             csl['DOI'] = doi
 
-        if self.logs.exists():
-            csl['issued'] = datetime_to_csl(self.logs.latest().date)
-
         return csl
 
     @classmethod
@@ -691,11 +660,11 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
             logger.exception(e)
             log_exception()
 
-    def update_search(self):
+    def update_search(self, saved_fields=None):
         from website import search
 
         try:
-            search.search.update_node(self, bulk=False, async=True)
+            search.search.update_node(self, bulk=False, async=True, saved_fields=saved_fields)
         except search.exceptions.SearchUnavailableError as e:
             logger.exception(e)
             log_exception()
@@ -814,6 +783,9 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
         return self.absolute_api_v2_url
 
     def get_permissions(self, user):
+        lineage = permission_cache.get_lineage_permissions(user, self)
+        if lineage is not None:
+            return get_contributor_permissions(lineage[0])
         if hasattr(self.contributor_set.all(), '_result_cache'):
             for contrib in self.contributor_set.all():
                 if contrib.user_id == user.id:
@@ -840,6 +812,12 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
         """
         if not user:
             return False
+        lineage = permission_cache.get_lineage_permissions(user, self)
+        if lineage is not None:
+            has_permission = getattr(lineage[0], permission)
+            if not has_permission and permission == 'read' and check_parent:
+                return any(permissions.admin for permissions in lineage)
+            return has_permission
         query = {'node': self, permission: True}
         has_permission = user.contributor_set.filter(**query).exists()
         if not has_permission and permission == 'read' and check_parent:
@@ -858,6 +836,9 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
         return False
 
     def is_admin_parent(self, user):
+        lineage = permission_cache.get_lineage_permissions(user, self)
+        if lineage is not None:
+            return any(permissions.admin for permissions in lineage)
         if self.has_permission(user, 'admin', check_parent=False):
             return True
         parent = self.parent_node
@@ -882,25 +863,25 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
 
     @property
     def parents(self):
-        if self.parent_node:
-            return [self.parent_node] + self.parent_node.parents
-        return []
+        ancestor_ids = self.get_ancestor_ids()
+        if not ancestor_ids:
+            return []
+        ancestors = AbstractNode.objects.in_bulk(ancestor_ids)
+        return [ancestors[pk] for pk in ancestor_ids]
 
     @property
     def admin_contributor_ids(self):
-        def get_admin_contributor_ids(node):
-            return Contributor.objects.select_related('user').filter(
-                node=node,
-                user__is_active=True,
-                admin=True
-            ).values_list('user__guids___id', flat=True)
-
         contributor_ids = set(self.contributors.values_list('guids___id', flat=True))
-        admin_ids = set(get_admin_contributor_ids(self))
-        for parent in self.parents:
-            admins = get_admin_contributor_ids(parent)
-            admin_ids.update(set(admins).difference(contributor_ids))
-        return admin_ids
+        admins = Contributor.objects.filter(
+            node_id__in=[self.pk] + self.get_ancestor_ids(),
+            user__is_active=True,
+            admin=True
+        ).values_list('node_id', 'user__guids___id')
+        # Admins of parents are implicit admins unless they are contributors here
+        return {
+            user_id for node_id, user_id in admins
+            if node_id == self.pk or user_id not in contributor_ids
+        }
 
     @property
     def admin_contributors(self):
@@ -987,7 +968,7 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
         with connection.cursor() as cursor:
             cursor.execute(self.LICENSE_QUERY.format(
                 abstractnode=AbstractNode._meta.db_table,
-                noderelation=NodeRelation._meta.db_table,
+                nodeancestor=NodeAncestor._meta.db_table,
                 nodelicenserecord=NodeLicenseRecord._meta.db_table,
                 fields=', '.join('"{}"."{}"'.format(NodeLicenseRecord._meta.db_table, f.column) for f in NodeLicenseRecord._meta.concrete_fields)
             ), [self.id])
@@ -1079,6 +1060,7 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
             Contributor.objects.filter(node=self, user=user, visible=True).update(visible=False)
         else:
             return
+        NodeCSL.invalidate(node=self)
         message = (
             NodeLog.MADE_CONTRIBUTOR_VISIBLE
             if visible
@@ -1431,6 +1413,7 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
         old_index = contributor_ids.index(contributor.id)
         contributor_ids.insert(index, contributor_ids.pop(old_index))
         self.set_contributor_order(contributor_ids)
+        NodeCSL.invalidate(node=self)
         self.add_log(
             action=NodeLog.CONTRIB_REORDERED,
             params={
@@ -1576,39 +1559,16 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
         return self.private_links.filter(is_deleted=True).values_list('key', flat=True)
 
     def get_root(self):
-        sql = """
-            WITH RECURSIVE ascendants AS (
-              SELECT
-                parent_id,
-                child_id,
-                1 AS LEVEL,
-                ARRAY[child_id] as cids
-              FROM %s
-              WHERE is_node_link IS FALSE and child_id = %s
-              UNION ALL
-              SELECT
-                S.parent_id,
-                D.child_id,
-                D.level + 1,
-                D.cids || S.child_id
-              FROM ascendants AS D
-                JOIN %s AS S
-                  ON D.parent_id = S.child_id
-              WHERE S.is_node_link IS FALSE
-                AND %s = ANY(cids)
-            ) SELECT parent_id
-              FROM ascendants
-              WHERE child_id = %s
-              ORDER BY level DESC
-              LIMIT 1;
-        """
-        with connection.cursor() as cursor:
-            node_relation_table = AsIs(NodeRelation._meta.db_table)
-            cursor.execute(sql, [node_relation_table, self.pk, node_relation_table, self.pk, self.pk])
-            res = cursor.fetchone()
-            if res:
-                return AbstractNode.objects.get(pk=res[0])
-            return self
+        root_id = NodeAncestor.objects.filter(descendant_id=self.pk).order_by('-depth').values_list('ancestor_id', flat=True).first()
+        if root_id:
+            return AbstractNode.objects.get(pk=root_id)
+        return self
+
+    def get_ancestor_ids(self):
+        """Primary keys of the parents of this node up to its root, nearest first."""
+        if not self.pk:
+            return []
+        return list(NodeAncestor.objects.filter(descendant_id=self.pk).order_by('depth').values_list('ancestor_id', flat=True))
 
     def find_readable_antecedent(self, auth):
         """ Returns first antecendant node readable by <user>.
@@ -1620,13 +1580,18 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
             next_parent = next_parent.parent_node
 
     def copy_contributors_from(self, node):
-        """Copies the contibutors from node (including permissions and visibility) into this node."""
-        contribs = []
-        for contrib in node.contributor_set.all():
-            contrib.id = None
-            contrib.node = self
-            contribs.append(contrib)
-        Contributor.objects.bulk_create(contribs)
+        """Copies the contibutors from node (including permissions, visibility and order) into this node."""
+        contributor_table = AsIs(Contributor._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO %s (read, write, admin, visible, user_id, node_id, _order)
+                SELECT read, write, admin, visible, user_id, %s, _order
+                FROM %s
+                WHERE node_id = %s
+                ORDER BY _order;
+            """, [contributor_table, self.pk, contributor_table, node.pk])
+        permission_cache.clear()
+        NodeCSL.invalidate(node=self)
 
     def register_node(self, schema, auth, data, parent=None):
         """Make a frozen copy of a node.
@@ -1937,29 +1902,24 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
 
         return forked
 
-    def clone_logs(self, node, page_size=100):
-        paginator = Paginator(self.logs.order_by('pk').all(), page_size)
-        for page_num in paginator.page_range:
-            page = paginator.page(page_num)
-            # Instantiate NodeLogs "manually"
-            # because BaseModel#clone() is too slow for large projects
-            logs_to_create = [
-                NodeLog(
-                    _id=bson.ObjectId(),
-                    action=log.action,
-                    date=log.date,
-                    params=log.params,
-                    should_hide=log.should_hide,
-                    foreign_user=log.foreign_user,
-                    # Set foreign keys, not their objects
-                    # to speed things up
-                    node_id=node.pk,
-                    user_id=log.user_id,
-                    original_node_id=log.original_node_id
-                )
-                for log in page
-            ]
-            NodeLog.objects.bulk_create(logs_to_create)
+    def clone_logs(self, node):
+        """Copy every log of this node onto `node` with a single INSERT ... SELECT, so
+        nothing is loaded into Python no matter how many logs there are. New `_id`s are
+        generated in the ObjectId shape: a hex epoch timestamp followed by random hex.
+        """
+        nodelog_table = AsIs(NodeLog._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO %s (_id, created, modified, date, action, params, should_hide, foreign_user,
+                                node_id, user_id, original_node_id)
+                SELECT
+                  lpad(to_hex(extract(EPOCH FROM now())::BIGINT), 8, '0') || substr(md5(random()::TEXT || id::TEXT), 1, 16),
+                  now(), now(), date, action, params, should_hide, foreign_user,
+                  %s, user_id, original_node_id
+                FROM %s
+                WHERE node_id = %s
+                ORDER BY id;
+            """, [nodelog_table, node.pk, nodelog_table, self.pk])
 
     def use_as_template(self, auth, changes=None, top_level=True, parent=None):
         """Create a new project, using an existing project as a template.
@@ -2212,6 +2172,7 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
                     each.id for each in sorted(self.contributor_set.all(), key=lambda c: user_ids.index(c.user._id))
                 ]
                 self.set_contributor_order(sorted_contrib_ids)
+                NodeCSL.invalidate(node=self)
                 self.add_log(
                     action=NodeLog.CONTRIB_REORDERED,
                     params={
@@ -2306,6 +2267,9 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
         if saved_fields:
             self.on_update(first_save, saved_fields)
 
+        if 'title' in saved_fields and not first_save:
+            NodeCSL.invalidate(node=self)
+
         if 'node_license' in saved_fields:
             children = list(self.descendants.filter(node_license=None, is_public=True, is_deleted=False))
             while len(children):
@@ -2720,6 +2684,8 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
             node=self,
             content=content
         )
+        if current and wiki_settings.DELTA_STORAGE:
+            new_page.store_as_delta(current)
         new_page.save()
 
         if has_comments:
@@ -3039,3 +3005,11 @@ def set_parent_and_root(sender, instance, created, *args, **kwargs):
     if not instance.root:
         instance.root = instance.get_root()
         instance.save()
+
+
+@receiver(post_save, sender=Contributor)
+@receiver(post_delete, sender=Contributor)
+@receiver(post_save, sender=NodeRelation)
+@receiver(post_delete, sender=NodeRelation)
+def clear_permission_cache(sender, instance, **kwargs):
+    permission_cache.clear()
@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import connection, models
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
 
 from .base import BaseModel, ObjectIDMixin
 
@@ -25,3 +27,84 @@ class NodeRelation(ObjectIDMixin, BaseModel):
         index_together = (
             ('is_node_link', 'child', 'parent'),
         )
+
+
+class NodeAncestor(models.Model):
+    """Closure table of the component hierarchy: one row for each node and each of
+    its ancestors, following NodeRelations that aren't node links. Kept up to date
+    by the NodeRelation signal handlers below.
+    """
+    ancestor = models.ForeignKey('AbstractNode', related_name='descendant_relations', on_delete=models.CASCADE)
+    descendant = models.ForeignKey('AbstractNode', related_name='ancestor_relations', on_delete=models.CASCADE)
+    # Number of levels between the two nodes, 1 for a parent
+    depth = models.PositiveIntegerField()
+
+    LINK_QUERY = '''
+        INSERT INTO "{table}" (ancestor_id, descendant_id, depth)
+        SELECT A.ancestor_id, D.descendant_id, A.depth + D.depth + 1
+        FROM (
+            SELECT ancestor_id, depth FROM "{table}" WHERE descendant_id = %(parent)s
+            UNION ALL SELECT %(parent)s, 0
+        ) AS A CROSS JOIN (
+            SELECT descendant_id, depth FROM "{table}" WHERE ancestor_id = %(child)s
+            UNION ALL SELECT %(child)s, 0
+        ) AS D
+        ON CONFLICT (ancestor_id, descendant_id) DO NOTHING;
+    '''
+
+    UNLINK_QUERY = '''
+        DELETE FROM "{table}"
+        WHERE descendant_id IN (
+            SELECT descendant_id FROM "{table}" WHERE ancestor_id = %(child)s
+            UNION ALL SELECT %(child)s
+        ) AND ancestor_id IN (
+            SELECT ancestor_id FROM "{table}" WHERE descendant_id = %(parent)s
+            UNION ALL SELECT %(parent)s
+        );
+    '''
+
+    class Meta:
+        unique_together = ('ancestor', 'descendant')
+        index_together = (
+            ('descendant', 'depth'),
+        )
+
+    @classmethod
+    def link(cls, parent_id, child_id):
+        """Add the rows for making `parent_id` the parent of `child_id` and its descendants."""
+        with connection.cursor() as cursor:
+            cursor.execute(cls.LINK_QUERY.format(table=cls._meta.db_table), {'parent': parent_id, 'child': child_id})
+
+    @classmethod
+    def unlink(cls, parent_id, child_id):
+        """Remove the rows relating `child_id` and its descendants to `parent_id` and its ancestors."""
+        with connection.cursor() as cursor:
+            cursor.execute(cls.UNLINK_QUERY.format(table=cls._meta.db_table), {'parent': parent_id, 'child': child_id})
+
+
+@receiver(pre_save, sender=NodeRelation)
+def remember_node_relation(sender, instance, **kwargs):
+    # Moving a relation to another parent or turning it into a link changes the hierarchy
+    if instance.pk:
+        instance._original_hierarchy = NodeRelation.objects.filter(pk=instance.pk).values_list(
+            'parent_id', 'child_id', 'is_node_link'
+        ).first()
+
+
+@receiver(post_save, sender=NodeRelation)
+def update_node_ancestors(sender, instance, created, **kwargs):
+    original = getattr(instance, '_original_hierarchy', None)
+    instance._original_hierarchy = None
+    current = (instance.parent_id, instance.child_id, instance.is_node_link)
+    if not created and original == current:
+        return
+    if original and not original[2]:
+        NodeAncestor.unlink(original[0], original[1])
+    if not instance.is_node_link:
+        NodeAncestor.link(instance.parent_id, instance.child_id)
+
+
+@receiver(post_delete, sender=NodeRelation)
+def remove_node_ancestors(sender, instance, **kwargs):
+    if not instance.is_node_link:
+        NodeAncestor.unlink(instance.parent_id, instance.child_id)
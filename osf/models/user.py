@@ -35,12 +35,14 @@ from framework.sessions.utils import remove_sessions_for_user
 from osf.utils.requests import get_current_request
 from osf.exceptions import reraise_django_validation_errors, MaxRetriesError
 from osf.models.base import BaseModel, GuidMixin, GuidMixinQuerySet
+from osf.models.citation import NodeCSL
 from osf.models.contributor import Contributor, RecentlyAddedContributor
 from osf.models.institution import Institution
 from osf.models.mixins import AddonModelMixin
 from osf.models.session import Session
 from osf.models.tag import Tag
 from osf.models.validators import validate_email, validate_social, validate_history_item
+from osf.utils import permission_cache
 from osf.utils.datetime_aware_jsonfield import DateTimeAwareJSONField
 from osf.utils.fields import NonNaiveDateTimeField, LowercaseEmailField
 from osf.utils.names import impute_names
@@ -135,6 +137,18 @@ class OSFUser(DirtyFieldsMixin, GuidMixin, BaseModel, AbstractBaseUser, Permissi
     TRACK_FIELDS = SEARCH_UPDATE_FIELDS.copy()
     TRACK_FIELDS.update({'password', 'last_login'})
 
+    # Fields used by csl_name, see NodeCSL
+    CSL_FIELDS = {
+        'fullname',
+        'given_name',
+        'middle_names',
+        'family_name',
+        'suffix',
+        'is_registered',
+        'date_disabled',
+        'unclaimed_records',
+    }
+
     # TODO: Add SEARCH_UPDATE_NODE_FIELDS, for fields that should trigger a
     #   search update for all nodes to which the user is a contributor.
 
@@ -681,6 +695,8 @@ class OSFUser(DirtyFieldsMixin, GuidMixin, BaseModel, AbstractBaseUser, Permissi
                 node.contributor_set.filter(user=user).delete()
             else:
                 node.contributor_set.filter(user=user).update(user=self)
+                permission_cache.clear()
+                NodeCSL.invalidate(node=node)
 
             node.save()
 
@@ -801,11 +817,14 @@ class OSFUser(DirtyFieldsMixin, GuidMixin, BaseModel, AbstractBaseUser, Permissi
     def save(self, *args, **kwargs):
         self.update_is_active()
         self.username = self.username.lower().strip() if self.username else None
+        first_save = not self.pk
         dirty_fields = set(self.get_dirty_fields(check_relationship=True))
         ret = super(OSFUser, self).save(*args, **kwargs)
         if self.SEARCH_UPDATE_FIELDS.intersection(dirty_fields) and self.is_confirmed:
             self.update_search()
             self.update_search_nodes_contributors()
+        if self.CSL_FIELDS.intersection(dirty_fields) and not first_save:
+            NodeCSL.invalidate(node__contributor__user=self)
         if 'fullname' in dirty_fields:
             from osf.models.quickfiles import get_quickfiles_project_title, QuickFilesNode
 
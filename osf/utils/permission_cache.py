@@ -0,0 +1,79 @@
+"""
+A request-scoped cache of users' permissions on nodes.
+
+Checking a permission on a node needs the user's contributor record on the node
+and on each of its ancestors, since admins of a parent can read its children.
+While the cache is enabled, for the length of a request, these are loaded with
+one query per (user, node) pair and later checks are answered from memory.
+Saving or deleting a contributor or a node relation clears the cache.
+"""
+import collections
+import contextlib
+import threading
+
+from django.db import connection
+
+_local = threading.local()
+
+# The user's contributor flags on a node; all False if they aren't a contributor
+Permissions = collections.namedtuple('Permissions', ['read', 'write', 'admin'])
+
+LINEAGE_PERMISSIONS_QUERY = '''
+    SELECT C.read, C.write, C.admin
+    FROM (
+        SELECT %s AS node_id, 0 AS depth
+      UNION ALL
+        SELECT ancestor_id, depth FROM osf_nodeancestor WHERE descendant_id = %s
+    ) AS L
+    LEFT JOIN osf_contributor AS C ON C.node_id = L.node_id AND C.user_id = %s
+    ORDER BY L.depth;
+'''
+
+
+def enable():
+    _local.permissions = {}
+
+
+def disable(error=None):
+    _local.permissions = None
+
+
+def is_enabled():
+    return getattr(_local, 'permissions', None) is not None
+
+
+def clear():
+    if is_enabled():
+        _local.permissions = {}
+
+
+@contextlib.contextmanager
+def enabled():
+    """Cache permissions inside the block, e.g. in scripts and tasks."""
+    if is_enabled():
+        yield
+        return
+    enable()
+    try:
+        yield
+    finally:
+        disable()
+
+
+def get_lineage_permissions(user, node):
+    """Return the user's `Permissions` on the node and each of its ancestors,
+    ordered from the node to the top most project, or ``None`` if the cache is
+    disabled.
+    """
+    if not is_enabled() or not user or user.pk is None or node.pk is None:
+        return None
+    key = (user.pk, node.pk)
+    lineage = _local.permissions.get(key)
+    if lineage is None:
+        with connection.cursor() as cursor:
+            cursor.execute(LINEAGE_PERMISSIONS_QUERY, [node.pk, node.pk, user.pk])
+            lineage = _local.permissions[key] = [
+                Permissions(bool(read), bool(write), bool(admin))
+                for read, write, admin in cursor.fetchall()
+            ]
+    return lineage
@@ -5,6 +5,7 @@ Unit tests for analytics logic in framework/analytics/__init__.py
 
 import unittest
 
+import mock
 import pytest
 from django.utils import timezone
 from nose.tools import *  # flake8: noqa  (PEP8 asserts)
@@ -14,9 +15,10 @@ from datetime import datetime
 
 from framework import analytics, sessions
 from framework.sessions import session
-from osf.models import PageCounter, Session
+from osf.models import PageCounter, PageCounterIncrement, Session, UserActivityCounter, UserActivityIncrement
 
 from tests.base import OsfTestCase
+from website import settings
 from osf_tests.factories import UserFactory, ProjectFactory
 
 pytestmark = pytest.mark.django_db
@@ -43,6 +45,35 @@ class TestAnalytics(OsfTestCase):
         analytics.increment_user_activity_counters(user._id, 'project_created', date.isoformat())
         assert_equal(user.get_activity_points(), 1)
 
+    def test_fold_user_activity_increments(self):
+        user = UserFactory()
+        date = timezone.now()
+        date_string = date.strftime('%Y/%m/%d')
+
+        analytics.increment_user_activity_counters(user._id, 'project_created', date.isoformat())
+        analytics.increment_user_activity_counters(user._id, 'project_created', date.isoformat())
+        assert_equal(UserActivityIncrement.objects.filter(user_id=user._id).count(), 2)
+
+        assert_equal(UserActivityCounter.fold_increments(), 2)
+        assert_false(UserActivityIncrement.objects.filter(user_id=user._id).exists())
+
+        counter = UserActivityCounter.objects.get(_id=user._id)
+        assert_equal(counter.total, 2)
+        assert_equal(counter.action['project_created'], {'total': 2, 'date': {date_string: 2}})
+        assert_equal(counter.date[date_string], {'total': 2})
+        assert_equal(user.get_activity_points(), 2)
+
+    def test_fold_counter_increments_drains_pending_increments(self):
+        user = UserFactory()
+        date = timezone.now()
+        for _ in range(3):
+            analytics.increment_user_activity_counters(user._id, 'project_created', date.isoformat())
+
+        with mock.patch.object(settings, 'ANALYTICS_FOLD_BATCH_SIZE', 1):
+            analytics.fold_counter_increments()
+        assert_false(UserActivityIncrement.objects.exists())
+        assert_equal(UserActivityCounter.objects.get(_id=user._id).total, 3)
+
 
 class UpdateCountersTestCase(OsfTestCase):
 
@@ -165,6 +196,41 @@ class TestUpdateCounters(UpdateCountersTestCase):
         count = analytics.get_basic_counters(page)
         assert_equal(count, (3, 5))
 
+    def test_fold_increments(self):
+        @analytics.update_counters('download:{target_id}:{fid}')
+        def download_file_(**kwargs):
+            return kwargs.get('node') or kwargs.get('project')
+
+        page = 'download:{0}:{1}'.format(self.node._id, self.fid)
+        download_file_(node=self.node, fid=self.fid)
+        download_file_(node=self.node, fid=self.fid)
+        assert_equal(PageCounterIncrement.objects.filter(page=page).count(), 2)
+
+        assert_equal(PageCounter.fold_increments(), 2)
+        assert_false(PageCounterIncrement.objects.filter(page=page).exists())
+
+        counter = PageCounter.objects.get(_id=page)
+        assert_equal((counter.unique, counter.total), (1, 2))
+        assert_equal(counter.date[timezone.now().strftime('%Y/%m/%d')], {'total': 2, 'unique': 1})
+
+        download_file_(node=self.node, fid=self.fid)
+        count = analytics.get_basic_counters(page)
+        assert_equal(count, (1, 3))
+        assert_equal(PageCounter.get_download_counts('download:{0}:'.format(self.node._id)), {page: 3})
+
+    def test_fold_increments_updates_file_download_count(self):
+        @analytics.update_counters('download:{target_id}:{fid}')
+        def download_file_(**kwargs):
+            return kwargs.get('node') or kwargs.get('project')
+
+        file_node = self.node.get_addon('osfstorage').get_root().append_file('Carp')
+        download_file_(node=self.node, fid=file_node._id)
+        download_file_(node=self.node, fid=file_node._id)
+        assert_equal(PageCounter.fold_increments(), 2)
+
+        file_node.reload()
+        assert_equal(file_node.download_count, 2)
+
     @unittest.skip('Reverted the fix for #2281. Unskip this once we use GUIDs for keys in the download counts collection')
     def test_update_counters_different_files(self):
         # Regression test for https://github.com/CenterForOpenScience/osf.io/issues/2281
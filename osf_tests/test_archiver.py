@@ -120,6 +120,29 @@ def select_files_from_tree(file_tree):
             stack.append(target_folders[0])
     return selected
 
+def iter_tree_files(file_tree):
+    """Yield `(sha256, metadata)` for every file in `file_tree`, breadth-first, like
+    `BaseStorageAddon._iter_file_tree_files`
+    """
+    queue = [file_tree]
+    while queue:
+        file_node = queue.pop(0)
+        for child in file_node['children']:
+            if child['kind'] == 'file':
+                yield child['extra']['hashes']['sha256'], child
+            else:
+                queue.append(child)
+
+def patch_file_tree(file_tree):
+    """Serve `file_tree` from both `_get_file_tree` and `_iter_file_tree_files` of every
+    storage addon. `file_tree` may also be a function of the addon returning its tree.
+    """
+    get_tree = file_tree if callable(file_tree) else lambda addon: file_tree
+    return nested(
+        mock.patch.object(BaseStorageAddon, '_get_file_tree', lambda self, *args, **kwargs: get_tree(self)),
+        mock.patch.object(BaseStorageAddon, '_iter_file_tree_files', lambda self, *args, **kwargs: iter_tree_files(get_tree(self))),
+    )
+
 FILE_TREE = {
     'path': '/',
     'name': '',
@@ -194,6 +217,9 @@ class MockAddon(object):
     def _get_file_tree(self, user, version):
         return FILE_TREE
 
+    def _iter_file_tree_files(self, user):
+        return iter_tree_files(FILE_TREE)
+
     def after_register(self, *args):
         return None, None
 
@@ -455,6 +481,49 @@ class TestStorageAddonBase(ArchiverTestCase):
         for addon in [a for a in settings.ADDONS_ARCHIVABLE if a not in ['wiki', 'forward']]:
             self._test_addon(addon)
 
+    def test_get_file_tree_version_applies_to_top_level(self):
+        def children(filenode, user, **kwargs):
+            if filenode['path'] == '/':
+                return [
+                    {'path': '/a', 'name': 'a', 'kind': 'file'},
+                    {'path': '/b/', 'name': 'b', 'kind': 'folder'},
+                ]
+            return [{'path': '/b/c', 'name': 'c', 'kind': 'file'}]
+
+        addon = self.src.get_addon('osfstorage')
+        with mock.patch.object(BaseStorageAddon, '_get_fileobj_child_metadata', side_effect=children) as mock_children:
+            file_tree = addon._get_file_tree(user=self.user, version='latest-published')
+        assert_equal([child['name'] for child in file_tree['children']], ['a', 'b'])
+        assert_equal(file_tree['children'][1]['children'][0]['name'], 'c')
+        assert_equal([call[1]['version'] for call in mock_children.call_args_list], ['latest-published', None])
+
+    def test_iter_file_tree_files_streams_hashes(self):
+        def children(filenode, user, **kwargs):
+            if filenode['path'] == '/':
+                return [
+                    {'path': '/a', 'name': 'a', 'kind': 'file', 'extra': {'hashes': {'sha256': 'aaa'}}},
+                    {'path': '/b/', 'name': 'b', 'kind': 'folder'},
+                ]
+            return [{'path': '/b/c', 'name': 'c', 'kind': 'file', 'extra': {'hashes': {'sha256': 'ccc'}}}]
+
+        addon = self.src.get_addon('osfstorage')
+        with mock.patch.object(BaseStorageAddon, '_get_fileobj_child_metadata', side_effect=children) as mock_children:
+            files = list(addon._iter_file_tree_files(user=self.user))
+        assert_equal([sha for sha, _ in files], ['aaa', 'ccc'])
+        assert_equal(mock_children.call_count, 2)
+
+    def test_token_bucket_throttles_after_burst(self):
+        from addons.base.utils import TokenBucket
+        bucket = TokenBucket(rate=10, capacity=2)
+        with mock.patch('addons.base.utils.time.sleep') as mock_sleep:
+            with mock.patch('addons.base.utils.time.time', return_value=bucket.updated):
+                bucket.consume()
+                bucket.consume()
+            assert_false(mock_sleep.called)
+            with mock.patch('addons.base.utils.time.time', side_effect=[bucket.updated, bucket.updated + 1]):
+                bucket.consume()
+            mock_sleep.assert_called_once_with(0.1)
+
 class TestArchiverTasks(ArchiverTestCase):
 
     @mock.patch('framework.celery_tasks.handlers.enqueue_task')
@@ -579,7 +648,7 @@ class TestArchiverTasks(ArchiverTestCase):
         )
         schema = generate_schema_from_data(data)
         with test_utils.mock_archive(node, schema=schema, data=data, autocomplete=True, autoapprove=True) as registration:
-            with mock.patch.object(BaseStorageAddon, '_get_file_tree', mock.Mock(return_value=file_trees[node._id])):
+            with patch_file_tree(file_trees[node._id]):
                 job = factories.ArchiveJobFactory(initiator=registration.creator)
                 archive_success(registration._id, job._id)
                 registration.reload()
@@ -623,7 +692,7 @@ class TestArchiverTasks(ArchiverTestCase):
         draft = factories.DraftRegistrationFactory(branched_from=node, registration_schema=schema, registered_metadata=data)
 
         with test_utils.mock_archive(node, schema=schema, data=data, autocomplete=True, autoapprove=True) as registration:
-            with mock.patch.object(BaseStorageAddon, '_get_file_tree', mock.Mock(return_value=file_tree)):
+            with patch_file_tree(file_tree):
                 job = factories.ArchiveJobFactory(initiator=registration.creator)
                 archive_success(registration._id, job._id)
                 registration.reload()
@@ -647,7 +716,7 @@ class TestArchiverTasks(ArchiverTestCase):
         }
         schema = generate_schema_from_data(data)
         with test_utils.mock_archive(node, schema=schema, data=data, autocomplete=True, autoapprove=True) as registration:
-            with mock.patch.object(BaseStorageAddon, '_get_file_tree', mock.Mock(return_value=file_trees[node._id])):
+            with patch_file_tree(file_trees[node._id]):
                 job = factories.ArchiveJobFactory(initiator=registration.creator)
                 archive_success(registration._id, job._id)
                 registration.reload()
@@ -681,9 +750,9 @@ class TestArchiverTasks(ArchiverTestCase):
         schema = generate_schema_from_data(data)
 
         with test_utils.mock_archive(node, schema=schema, data=copy.deepcopy(data), autocomplete=True, autoapprove=True) as registration:
-            def mock_get_file_tree(self, *args, **kwargs):
-                return file_trees[self.owner.registered_from._id]
-            with mock.patch.object(BaseStorageAddon, '_get_file_tree', mock_get_file_tree):
+            def mock_get_file_tree(addon):
+                return file_trees[addon.owner.registered_from._id]
+            with patch_file_tree(mock_get_file_tree):
                 job = factories.ArchiveJobFactory(initiator=registration.creator)
                 archive_success(registration._id, job._id)
 
@@ -737,7 +806,7 @@ class TestArchiverTasks(ArchiverTestCase):
         schema = generate_schema_from_data(data)
 
         with test_utils.mock_archive(node, schema=schema, data=data, autocomplete=True, autoapprove=True) as registration:
-            with mock.patch.object(BaseStorageAddon, '_get_file_tree', mock.Mock(return_value=file_tree)):
+            with patch_file_tree(file_tree):
                 job = factories.ArchiveJobFactory(initiator=registration.creator)
                 archive_success(registration._id, job._id)
                 for key, question in registration.registered_meta[schema._id].items():
@@ -768,7 +837,7 @@ class TestArchiverTasks(ArchiverTestCase):
         draft = factories.DraftRegistrationFactory(branched_from=node, registration_schema=schema, registered_metadata=data)
 
         with test_utils.mock_archive(node, schema=schema, data=data, autocomplete=True, autoapprove=True) as registration:
-            with mock.patch.object(BaseStorageAddon, '_get_file_tree', mock.Mock(return_value=file_tree)):
+            with patch_file_tree(file_tree):
                 job = factories.ArchiveJobFactory(initiator=registration.creator)
                 draft.registered_node = registration
                 draft.save()
@@ -802,7 +871,7 @@ class TestArchiverTasks(ArchiverTestCase):
         schema = generate_schema_from_data(data)
 
         with test_utils.mock_archive(node, schema=schema, data=data, autocomplete=True, autoapprove=True) as registration:
-            with mock.patch.object(BaseStorageAddon, '_get_file_tree', mock.Mock(return_value=file_tree)):
+            with patch_file_tree(file_tree):
                 job = factories.ArchiveJobFactory(initiator=registration.creator)
                 archive_success(registration._id, job._id)
                 registration.reload()
@@ -916,7 +985,7 @@ class TestArchiverUtils(ArchiverTestCase):
     def test_get_file_map(self):
         node = factories.NodeFactory(creator=self.user)
         file_tree = file_tree_factory(3, 3, 3)
-        with mock.patch.object(BaseStorageAddon, '_get_file_tree', mock.Mock(return_value=file_tree)):
+        with patch_file_tree(file_tree):
             file_map = archiver_utils.get_file_map(node)
         stack = [file_tree]
         file_map = {
@@ -940,7 +1009,7 @@ class TestArchiverUtils(ArchiverTestCase):
         factories.NodeFactory(parent=node)
 
         file_tree = file_tree_factory(3, 3, 3)
-        with mock.patch.object(BaseStorageAddon, '_get_file_tree', mock.Mock(return_value=file_tree)):
+        with patch_file_tree(file_tree):
             file_map = archiver_utils.get_file_map(node)
             stack = [file_tree]
             file_map = {
@@ -963,15 +1032,33 @@ class TestArchiverUtils(ArchiverTestCase):
         factories.NodeFactory(parent=comp1)
         factories.NodeFactory(parent=node)
 
-        with mock.patch.object(BaseStorageAddon, '_get_file_tree') as mock_get_file_tree:
-            mock_get_file_tree.return_value = file_tree_factory(3, 3, 3)
+        file_tree = file_tree_factory(3, 3, 3)
+        with mock.patch.object(BaseStorageAddon, '_iter_file_tree_files') as mock_iter_files:
+            mock_iter_files.side_effect = lambda *args, **kwargs: iter_tree_files(file_tree)
 
             # first call
             archiver_utils.get_file_map(node)
-            call_count = mock_get_file_tree.call_count
+            call_count = mock_iter_files.call_count
             # second call
             archiver_utils.get_file_map(node)
-            assert_equal(mock_get_file_tree.call_count, call_count)
+            assert_equal(mock_iter_files.call_count, call_count)
+
+    def test_file_map_cache_is_bounded(self):
+        nodes = [factories.NodeFactory() for _ in range(3)]
+        file_map_cache = archiver_utils.FileMapCache(max_size=2)
+
+        file_tree = file_tree_factory(1, 1, 1)
+        with mock.patch.object(BaseStorageAddon, '_iter_file_tree_files') as mock_iter_files:
+            mock_iter_files.side_effect = lambda *args, **kwargs: iter_tree_files(file_tree)
+            for node in nodes:
+                file_map_cache.get_file_map(node)
+            assert_equal(mock_iter_files.call_count, 3)
+            # Most recently used entries are kept
+            file_map_cache.get_file_map(nodes[2])
+            assert_equal(mock_iter_files.call_count, 3)
+            # The oldest entry was evicted
+            file_map_cache.get_file_map(nodes[0])
+            assert_equal(mock_iter_files.call_count, 4)
 
 
 class TestArchiverListeners(ArchiverTestCase):
@@ -0,0 +1,67 @@
+import mock
+import pytest
+
+from osf.db import router
+from osf.db.router import PostgreSQLFailoverRouter, REPLICA_LAG_SQL, REPLICA_LAG_SQL_PRE_10
+
+
+@pytest.fixture()
+def db_router():
+    with mock.patch.object(PostgreSQLFailoverRouter, '_get_dsns'), \
+            mock.patch.object(PostgreSQLFailoverRouter, '_get_master', return_value='default'), \
+            mock.patch.object(PostgreSQLFailoverRouter, '_get_replicas', return_value=['replica']):
+        db_router = PostgreSQLFailoverRouter()
+    db_router.REPLICA_LAG = {}
+    yield db_router
+    router.set_read_only(False)
+
+
+class TestPostgreSQLFailoverRouter:
+
+    def test_reads_go_to_master_outside_read_only_requests(self, db_router):
+        with mock.patch.object(db_router, '_get_replica_lag', return_value=0):
+            assert db_router.db_for_read(None) == 'default'
+
+    def test_read_only_requests_read_from_replica(self, db_router):
+        router.set_read_only(True)
+        with mock.patch.object(db_router, '_get_replica_lag', return_value=0):
+            assert db_router.db_for_read(None) == 'replica'
+        assert db_router.db_for_write(None) == 'default'
+
+    def test_lagging_or_unreachable_replicas_fall_back_to_master(self, db_router, settings):
+        settings.REPLICA_MAX_LAG = 5
+        router.set_read_only(True)
+        with mock.patch.object(db_router, '_get_replica_lag', return_value=30):
+            assert db_router.db_for_read(None) == 'default'
+        with mock.patch.object(db_router, '_get_replica_lag', return_value=None):
+            assert db_router.db_for_read(None) == 'default'
+
+    def test_reads_stick_to_master_after_write(self, db_router):
+        router.set_read_only(True)
+        with mock.patch.object(db_router, '_get_replica_lag', return_value=0):
+            db_router.db_for_write(None)
+            assert db_router.db_for_read(None) == 'default'
+
+            # A new request starts with a clean slate
+            router.set_read_only(True)
+            assert db_router.db_for_read(None) == 'replica'
+
+    def test_read_from_replica_restores_previous_mode(self, db_router):
+        router.set_read_only(False)
+        with router.read_from_replica():
+            assert router.is_read_only()
+        assert not router.is_read_only()
+
+    @pytest.mark.parametrize('pg_version, query', [
+        (90605, REPLICA_LAG_SQL_PRE_10),
+        (100001, REPLICA_LAG_SQL),
+    ])
+    def test_replica_lag_query_matches_server_version(self, db_router, settings, pg_version, query):
+        settings.REPLICA_LAG_CHECK_INTERVAL = 10
+        with mock.patch('osf.db.router.connections') as connections:
+            connection = connections.__getitem__.return_value
+            connection.pg_version = pg_version
+            cursor = connection.cursor.return_value.__enter__.return_value
+            cursor.fetchone.return_value = (2,)
+            assert db_router._get_replica_lag('replica') == 2
+        cursor.execute.assert_called_once_with(query)
@@ -813,6 +813,115 @@ class TestSearchExceptions(OsfTestCase):
         self.project.save()
 
 
+class TestIndexingBuffer(unittest.TestCase):
+
+    @mock.patch('website.search.elastic_search.flush_actions')
+    def test_writes_are_deduplicated_and_flushed_once(self, mock_flush):
+        with elastic_search.buffered_indexing():
+            elastic_search.index_document('test', 'file', 'abc12', {'name': 'old'})
+            with elastic_search.buffered_indexing():
+                elastic_search.index_document('test', 'file', 'abc12', {'name': 'new'})
+                elastic_search.delete_document('test', 'user', 'def34')
+            assert_false(mock_flush.called)
+
+        assert_equal(mock_flush.call_count, 1)
+        actions = mock_flush.call_args[0][0]
+        assert_equal(len(actions), 2)
+        assert_equal(actions[0]['_source'], {'name': 'new'})
+        assert_equal(actions[1]['_op_type'], 'delete')
+
+    @mock.patch('website.search.elastic_search.flush_actions')
+    def test_buffer_flushes_when_full(self, mock_flush):
+        buffer_ = elastic_search.IndexingBuffer(chunk_size=2)
+        buffer_.index('test', 'file', 'abc12', {})
+        assert_false(mock_flush.called)
+        buffer_.index('test', 'file', 'def34', {})
+        assert_equal(mock_flush.call_count, 1)
+        assert_equal(len(buffer_), 0)
+
+    @mock.patch('website.search.elastic_search.flush_actions')
+    def test_buffer_discarded_on_error(self, mock_flush):
+        with assert_raises(ValueError):
+            with elastic_search.buffered_indexing():
+                elastic_search.index_document('test', 'file', 'abc12', {})
+                raise ValueError
+        assert_false(mock_flush.called)
+        assert_is_none(elastic_search._buffer_local.buffer)
+
+    @mock.patch('website.search.elastic_search.client')
+    @mock.patch('website.search.elastic_search.helpers.bulk')
+    def test_flush_raises_on_failures(self, mock_bulk, mock_client):
+        mock_bulk.return_value = (0, [
+            {'delete': {'_id': 'abc12', 'status': 404}},
+            {'update': {'_id': 'def34', 'status': 404}},
+        ])
+        elastic_search.flush_actions([])
+
+        mock_bulk.return_value = (0, [{'index': {'_id': 'abc12', 'status': 429}}])
+        with assert_raises(elastic_search.exceptions.SearchException):
+            elastic_search.flush_actions([])
+
+    @mock.patch('website.search.elastic_search.flush_actions')
+    def test_update_merges_into_buffered_write(self, mock_flush):
+        with elastic_search.buffered_indexing():
+            elastic_search.index_document('test', 'component', 'abc12', {'title': 'Title'})
+            elastic_search.update_document('test', 'component', 'abc12', {'parent_info': None})
+            elastic_search.update_document('test', 'file', 'def34', {'parent_info': None})
+        actions = mock_flush.call_args[0][0]
+        assert_equal(actions[0]['_source'], {'title': 'Title', 'parent_info': None})
+        assert_equal(actions[1]['_op_type'], 'update')
+        assert_equal(actions[1]['doc'], {'parent_info': None})
+
+
+class TestUpdateChildrenParentInfo(OsfTestCase):
+
+    def setUp(self):
+        super(TestUpdateChildrenParentInfo, self).setUp()
+        self.project = factories.ProjectFactory(is_public=True)
+
+    @mock.patch('website.search.elastic_search.update_children_parent_info')
+    @mock.patch('website.search.elastic_search.index_document')
+    def test_children_updated_when_parent_info_changes(self, mock_index, mock_update_children):
+        elastic_search.update_node(self.project, saved_fields=['description'])
+        assert_false(mock_update_children.called)
+
+        elastic_search.update_node(self.project)
+        assert_false(mock_update_children.called)
+
+        elastic_search.update_node(self.project, saved_fields=['description', 'title'])
+        mock_update_children.assert_called_once_with(self.project, elastic_search.INDEX)
+
+
+class TestFormatResults(unittest.TestCase):
+
+    def file_result(self, **kwargs):
+        result = {'category': 'file', 'id': 'abc12', 'parent_id': 'def34'}
+        result.update(kwargs)
+        return result
+
+    @mock.patch('website.search.elastic_search.load_parents')
+    def test_stored_parent_info_is_used(self, mock_load_parents):
+        mock_load_parents.return_value = {}
+        parent_info = {'title': 'Parent', 'url': '/def34/', 'is_registration': False, 'id': 'def34'}
+        results = elastic_search.format_results([self.file_result(parent_info=parent_info)])
+        mock_load_parents.assert_called_once_with([])
+        assert_equal(results[0]['parent_title'], 'Parent')
+        assert_equal(results[0]['parent_url'], '/def34/')
+
+    @mock.patch('website.search.elastic_search.load_parents')
+    def test_parents_are_loaded_together(self, mock_load_parents):
+        mock_load_parents.return_value = {
+            'def34': {'title': 'Parent', 'url': '/def34/', 'is_registration': False, 'id': 'def34'}
+        }
+        results = elastic_search.format_results([
+            self.file_result(),
+            self.file_result(id='ghi56'),
+            self.file_result(id='jkl78', parent_id=None),
+        ])
+        mock_load_parents.assert_called_once_with(['def34', 'def34', None])
+        assert_equal([result['parent_title'] for result in results], ['Parent', 'Parent', None])
+
+
 class TestSearchMigration(OsfTestCase):
     # Verify that the correct indices are created/deleted during migration
 
@@ -25,6 +25,8 @@ from osf.models import (
     Contributor,
     MetaSchema,
     Sanction,
+    NodeAncestor,
+    NodeCSL,
     NodeRelation,
     Registration,
     DraftRegistration,
@@ -515,6 +517,53 @@ class TestRoot:
                 assert p.parent_node._id in parent_list
 
 
+class TestNodeAncestors:
+
+    @pytest.fixture()
+    def project(self, user):
+        return ProjectFactory(creator=user)
+
+    @pytest.fixture()
+    def child(self, project):
+        return NodeFactory(parent=project, creator=project.creator)
+
+    @pytest.fixture()
+    def grandchild(self, child):
+        return NodeFactory(parent=child, creator=child.creator)
+
+    def ancestors(self, node):
+        return list(NodeAncestor.objects.filter(descendant=node).order_by('depth').values_list('ancestor_id', 'depth'))
+
+    def test_ancestors_are_recorded(self, project, child, grandchild):
+        assert self.ancestors(grandchild) == [(child.id, 1), (project.id, 2)]
+        assert grandchild.get_ancestor_ids() == [child.id, project.id]
+        assert grandchild.parents == [child, project]
+        assert self.ancestors(project) == []
+
+    def test_node_links_are_not_ancestors(self, project, child, user):
+        other = ProjectFactory(creator=user)
+        other.add_pointer(child, auth=Auth(user))
+        assert self.ancestors(child) == [(project.id, 1)]
+
+    def test_moving_a_component_moves_its_descendants(self, project, child, grandchild, user):
+        other = ProjectFactory(creator=user)
+        relation = NodeRelation.objects.get(child=child, is_node_link=False)
+        relation.parent = other
+        relation.save()
+        assert self.ancestors(child) == [(other.id, 1)]
+        assert self.ancestors(grandchild) == [(child.id, 1), (other.id, 2)]
+        assert grandchild.get_root() == other
+
+    def test_removing_a_relation_removes_ancestors(self, project, child, grandchild):
+        NodeRelation.objects.get(child=child, is_node_link=False).delete()
+        assert self.ancestors(child) == []
+        assert self.ancestors(grandchild) == [(child.id, 1)]
+
+    def test_get_children_of_component(self, child, grandchild):
+        great_grandchild = NodeFactory(parent=grandchild, creator=grandchild.creator)
+        assert set(Node.objects.get_children(child)) == {grandchild, great_grandchild}
+
+
 class TestNodeMODMCompat:
 
     def test_basic_querying(self):
@@ -712,6 +761,26 @@ class TestLogging:
         # updates node.modified
         assert_datetime_equal(node.modified, last_log.date)
 
+    def test_clone_logs(self, node, auth):
+        node.add_log(NodeLog.EMBARGO_INITIATED, params={'node': node._id}, auth=auth)
+        node.save()
+        other = NodeFactory()
+        other_log_count = other.logs.count()
+
+        node.clone_logs(other)
+
+        original_logs = list(node.logs.order_by('id'))
+        cloned_logs = list(other.logs.order_by('id'))[other_log_count:]
+        assert len(cloned_logs) == len(original_logs)
+        for original, cloned in zip(original_logs, cloned_logs):
+            assert cloned._id != original._id
+            assert len(cloned._id) == 24
+            assert cloned.action == original.action
+            assert cloned.params == original.params
+            assert cloned.date == original.date
+            assert cloned.user_id == original.user_id
+            assert cloned.original_node_id == original.original_node_id
+
 
 class TestTagging:
 
@@ -3185,6 +3254,39 @@ class TestCitationsProperties:
 
         assert node.csl['author'] == expected_authors
 
+    def test_csl_is_stored(self, node):
+        csl = node.csl
+        assert NodeCSL.objects.get(node=node).csl == {k: v for k, v in csl.items() if k != 'issued'}
+        assert node.csl == csl
+
+    def test_csl_updated_on_title_change(self, node):
+        node.csl
+        node.title = 'Gatorade as a Cure for Hangovers'
+        node.save()
+        assert node.csl['title'] == 'Gatorade as a Cure for Hangovers'
+
+    def test_csl_updated_on_contributor_changes(self, node, auth):
+        node.csl
+        user = UserFactory()
+        node.add_contributor(user, auth=auth, save=True)
+        assert node.csl['author'][1] == user.csl_name(node._id)
+
+        node.set_visible(user, False, auth=auth, save=True)
+        assert len(node.csl['author']) == 1
+
+        node.set_visible(user, True, auth=auth, save=True)
+        node.move_contributor(user, auth, 0, save=True)
+        assert node.csl['author'][0] == user.csl_name(node._id)
+
+        node.remove_contributor(user, auth=auth)
+        assert len(node.csl['author']) == 1
+
+    def test_csl_updated_on_name_change(self, node):
+        node.csl
+        node.creator.family_name = 'Hendrix'
+        node.creator.save()
+        assert node.csl['author'][0]['family'] == 'Hendrix'
+
 
 # copied from tests/test_models.py
 class TestNodeUpdate:
@@ -0,0 +1,60 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from framework.auth.core import Auth
+from osf.utils import permission_cache
+from osf_tests.factories import NodeFactory, ProjectFactory, UserFactory
+from website.util.permissions import ADMIN, READ, WRITE
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture()
+def user():
+    return UserFactory()
+
+
+@pytest.fixture()
+def project(user):
+    return ProjectFactory(creator=user)
+
+
+@pytest.fixture()
+def component(project):
+    return NodeFactory(parent=project, creator=UserFactory())
+
+
+class TestPermissionCache:
+
+    def test_disabled_outside_requests(self, user, project):
+        assert permission_cache.get_lineage_permissions(user, project) is None
+
+    def test_checks_are_answered_from_memory(self, user, project):
+        with permission_cache.enabled():
+            with CaptureQueriesContext(connection) as queries:
+                assert project.has_permission(user, ADMIN)
+            assert len(queries) == 1
+
+            with CaptureQueriesContext(connection) as queries:
+                assert project.can_edit(user=user)
+                assert project.can_view(Auth(user))
+                assert project.is_admin_parent(user)
+                assert project.get_permissions(user) == [READ, WRITE, ADMIN]
+            assert len(queries) == 0
+
+    def test_parent_admins_can_read(self, user, component):
+        with permission_cache.enabled():
+            assert component.has_permission(user, READ)
+            assert not component.has_permission(user, READ, check_parent=False)
+            assert not component.has_permission(user, WRITE)
+            assert component.is_admin_parent(user)
+            assert component.get_permissions(user) == []
+
+    def test_cleared_on_contributor_changes(self, user, component):
+        with permission_cache.enabled():
+            assert not component.has_permission(user, WRITE)
+            component.add_contributor(user, permissions=[READ, WRITE], auth=Auth(component.creator), save=True)
+            assert component.has_permission(user, WRITE)
+            component.remove_contributor(user, auth=Auth(component.creator))
+            assert not component.has_permission(user, WRITE)
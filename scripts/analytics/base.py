@@ -5,6 +5,7 @@ import importlib
 from datetime import datetime, timedelta
 from dateutil.parser import parse
 
+from osf.db import router
 from website.app import init_app
 from website.settings import KEEN as keen_settings
 from keen.client import KeenClient
@@ -165,10 +166,11 @@ class BaseAnalyticsHarness(object):
             if args.analytics_scripts:
                 analytics_classes = self.try_to_import_from_args(args.analytics_scripts)
 
-        for analytics_class in analytics_classes:
-            class_instance = analytics_class()
-            events = class_instance.get_events()
-            class_instance.send_events(events)
+        with router.read_from_replica():
+            for analytics_class in analytics_classes:
+                class_instance = analytics_class()
+                events = class_instance.get_events()
+                class_instance.send_events(events)
 
 
 class DateAnalyticsHarness(BaseAnalyticsHarness):
@@ -200,7 +202,8 @@ class DateAnalyticsHarness(BaseAnalyticsHarness):
             if args.analytics_scripts:
                 analytics_classes = self.try_to_import_from_args(args.analytics_scripts)
 
-        for analytics_class in analytics_classes:
-            class_instance = analytics_class()
-            events = class_instance.get_events(date)
-            class_instance.send_events(events)
+        with router.read_from_replica():
+            for analytics_class in analytics_classes:
+                class_instance = analytics_class()
+                events = class_instance.get_events(date)
+                class_instance.send_events(events)
@@ -15,6 +15,7 @@ import logging
 
 from framework import sentry
 from framework.celery_tasks import app as celery_app
+from osf.db import router
 from osf.models import OSFUser, AbstractNode, PreprintService, PreprintProvider
 from scripts import utils as script_utils
 from website import settings
@@ -252,7 +253,8 @@ class Sitemap(object):
 @celery_app.task(name='scripts.generate_sitemap')
 def main():
     init_app(routes=False)  # Sets the storage backends on all models
-    Sitemap().generate()
+    with router.read_from_replica():
+        Sitemap().generate()
 
 if __name__ == '__main__':
     init_app(set_backends=True, routes=False)
@@ -0,0 +1,51 @@
+"""Delete stored wiki renderings that no current wiki page uses, see RenderedWiki.unused
+"""
+import logging
+import sys
+
+import django
+from django.db import transaction
+from django.utils import timezone
+django.setup()
+
+from framework.celery_tasks import app as celery_app
+from osf.models import AbstractNode
+from addons.wiki import settings as wiki_settings
+from addons.wiki.models import RenderedWiki
+from website.app import init_app
+
+from scripts.utils import add_file_logger
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+BATCH_SIZE = 500
+
+
+def main(dry_run=True):
+    before = timezone.now() - wiki_settings.RENDERED_WIKI_RETENTION
+    node_ids = list(RenderedWiki.objects.order_by('node_id').values_list('node_id', flat=True).distinct())
+    removed = 0
+    for i in range(0, len(node_ids), BATCH_SIZE):
+        nodes = AbstractNode.objects.filter(id__in=node_ids[i:i + BATCH_SIZE])
+        with transaction.atomic():
+            unused = RenderedWiki.unused(nodes, before=before)
+            if dry_run:
+                removed += unused.count()
+            else:
+                removed += unused.delete()[0]
+    logger.info('{} {} unused wiki renderings of {} nodes'.format(
+        'Would remove' if dry_run else 'Removed', removed, len(node_ids)
+    ))
+
+
+@celery_app.task(name='scripts.remove_unused_rendered_wikis')
+def run_main(dry_run=True):
+    init_app(routes=False)
+    if not dry_run:
+        add_file_logger(logger, __file__)
+    main(dry_run=dry_run)
+
+
+if __name__ == '__main__':
+    run_main(dry_run='--dry' in sys.argv)
@@ -0,0 +1,33 @@
+import datetime
+
+import pytest
+
+from framework.auth import Auth
+from addons.wiki import settings as wiki_settings
+from addons.wiki.models import RenderedWiki
+from osf_tests.factories import ProjectFactory
+from scripts.remove_unused_rendered_wikis import main
+
+pytestmark = pytest.mark.django_db
+
+
+class TestRemoveUnusedRenderedWikis:
+
+    @pytest.fixture()
+    def project(self):
+        project = ProjectFactory()
+        project.update_node_wiki('home', '*foo*', Auth(project.creator))
+        project.get_wiki_page('home').html(project)
+        project.update_node_wiki('home', '*bar*', Auth(project.creator))
+        project.get_wiki_page('home').html(project)
+        return project
+
+    def test_dry_run(self, project):
+        main(dry_run=True)
+        assert RenderedWiki.objects.filter(node=project).count() == 2
+
+    def test_removes_renderings_of_edited_content(self, project, monkeypatch):
+        monkeypatch.setattr(wiki_settings, 'RENDERED_WIKI_RETENTION', datetime.timedelta(0))
+        main(dry_run=False)
+        remaining = RenderedWiki.objects.get(node=project)
+        assert remaining.content_hash == RenderedWiki.hash_content('*bar*')
@@ -6,8 +6,8 @@ import mock
 from nose.tools import *  # flake8: noqa (PEP8 asserts)
 import sendgrid
 
-from framework.email.tasks import send_email, _send_with_sendgrid
-from website import settings
+from framework.email.tasks import send_email, send_emails, _send_with_sendgrid, SMTPConnectionPool
+from website import mails, settings
 from tests.base import fake
 from osf_tests.factories import fake_email
 
@@ -77,5 +77,68 @@ class TestEmail(unittest.TestCase):
         assert_false(ret)
 
 
+class TestSMTPConnectionPool(unittest.TestCase):
+
+    @mock.patch('framework.email.tasks.smtplib.SMTP')
+    def test_connection_is_reused(self, mock_smtp):
+        mock_smtp.return_value.noop.return_value = (250, 'OK')
+        pool = SMTPConnectionPool(max_idle=1)
+        for _ in range(3):
+            with pool.connection('user', 'pass') as connection:
+                connection.sendmail(from_addr='a@b.com', to_addrs=['c@d.com'], msg='hi')
+        assert_equal(mock_smtp.call_count, 1)
+        assert_equal(mock_smtp.return_value.login.call_count, 1)
+        assert_equal(mock_smtp.return_value.sendmail.call_count, 3)
+
+    @mock.patch('framework.email.tasks.smtplib.SMTP')
+    def test_dropped_connection_is_replaced(self, mock_smtp):
+        mock_smtp.return_value.noop.side_effect = smtplib.SMTPServerDisconnected
+        pool = SMTPConnectionPool(max_idle=1)
+        for _ in range(2):
+            with pool.connection('user', 'pass'):
+                pass
+        assert_equal(mock_smtp.call_count, 2)
+
+    @mock.patch('framework.email.tasks.smtplib.SMTP')
+    def test_failed_connection_is_not_reused(self, mock_smtp):
+        pool = SMTPConnectionPool(max_idle=1)
+        with assert_raises(smtplib.SMTPRecipientsRefused):
+            with pool.connection('user', 'pass'):
+                raise smtplib.SMTPRecipientsRefused({})
+        assert_equal(pool._idle, {})
+
+
+class TestSendEmails(unittest.TestCase):
+
+    @mock.patch('framework.email.tasks._send')
+    def test_send_emails_continues_after_failure(self, mock_send):
+        mock_send.side_effect = [True, Exception('failed'), True]
+        messages = [{'to_addr': fake_email()} for _ in range(3)]
+        with mock.patch.object(settings, 'USE_EMAIL', True):
+            assert_equal(send_emails(messages), 2)
+        assert_equal(mock_send.call_count, 3)
+
+    @mock.patch('framework.email.tasks.send_emails')
+    def test_batched_sends_in_chunks(self, mock_send_emails):
+        with mock.patch.object(settings, 'USE_EMAIL', True), \
+                mock.patch.object(settings, 'USE_CELERY', False), \
+                mock.patch.object(settings, 'MAIL_BATCH_SIZE', 2):
+            with mails.batched():
+                for _ in range(3):
+                    mails.send_mail(fake_email(), mails.TEST, mimetype='plain', name=fake.name())
+                assert_false(mock_send_emails.called)
+        assert_equal([len(call[0][0]) for call in mock_send_emails.call_args_list], [2, 1])
+
+    @mock.patch('framework.email.tasks.send_emails')
+    def test_batched_sends_nothing_on_error(self, mock_send_emails):
+        with mock.patch.object(settings, 'USE_EMAIL', True), \
+                mock.patch.object(settings, 'USE_CELERY', False):
+            with assert_raises(ValueError):
+                with mails.batched():
+                    mails.send_mail(fake_email(), mails.TEST, mimetype='plain', name=fake.name())
+                    raise ValueError
+        assert_false(mock_send_emails.called)
+
+
 if __name__ == '__main__':
     unittest.main()
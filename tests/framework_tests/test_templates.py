@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from mako.lookup import TemplateLookup
+from nose.tools import *  # flake8: noqa (PEP8 asserts)
+
+from framework.templates import TemplateCache, find_templates
+
+
+class TestTemplateCache(unittest.TestCase):
+
+    def setUp(self):
+        self.template_dir = tempfile.mkdtemp()
+        self.module_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.template_dir, 'base.mako'), 'w') as fp:
+            fp.write('<b>${self.body()}</b>')
+        with open(os.path.join(self.template_dir, 'page.mako'), 'w') as fp:
+            fp.write('<%inherit file="base.mako"/>${name}')
+        self.lookup = TemplateLookup(
+            directories=[self.template_dir],
+            module_directory=os.path.join(self.module_dir, 'trusted'),
+        )
+        self.escaped_lookup = TemplateLookup(
+            directories=[self.template_dir],
+            module_directory=os.path.join(self.module_dir, 'escaped'),
+            default_filters=['h'],
+        )
+        self.cache = TemplateCache()
+
+    def tearDown(self):
+        shutil.rmtree(self.template_dir)
+        shutil.rmtree(self.module_dir)
+
+    def get_template(self, lookup, name):
+        return self.cache.get_template(lookup, os.path.join(self.template_dir, name))
+
+    def test_compiles_once(self):
+        template = self.get_template(self.lookup, 'page.mako')
+        assert_is(self.get_template(self.lookup, 'page.mako'), template)
+        stats = self.cache.stats()
+        assert_equal(stats['templates'], 1)
+        assert_equal(stats['misses'], 1)
+        assert_equal(stats['hits'], 1)
+
+    def test_keyed_by_lookup(self):
+        page = self.get_template(self.lookup, 'page.mako')
+        escaped_page = self.get_template(self.escaped_lookup, 'page.mako')
+        assert_equal(page.render(name='<i>'), '<b><i></b>')
+        assert_equal(escaped_page.render(name='<i>'), '<b>&lt;i&gt;</b>')
+
+    def test_writes_modules(self):
+        self.get_template(self.lookup, 'page.mako')
+        assert_equal(len(list(find_templates(self.module_dir, extension='.py'))), 2)
+
+    def test_uncached(self):
+        template = self.cache.get_template(
+            self.lookup, os.path.join(self.template_dir, 'page.mako'), cached=False
+        )
+        assert_equal(template.render(name='x'), '<b>x</b>')
+        assert_equal(self.cache.stats()['templates'], 0)
+
+    def test_missing_template(self):
+        with assert_raises(IOError):
+            self.get_template(self.lookup, 'missing.mako')
+
+    def test_warm(self):
+        compiled = self.cache.warm(self.lookup, find_templates(self.template_dir))
+        assert_equal(compiled, 2)
+        assert_equal(self.cache.stats()['misses'], 2)
+        self.get_template(self.lookup, 'page.mako')
+        assert_equal(self.cache.stats()['hits'], 1)
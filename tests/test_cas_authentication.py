@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 import furl
 import httpretty
+import json
 import mock
+import time
 from nose.tools import *  # flake8: noqa (PEP8 asserts)
 import unittest
 
@@ -164,6 +166,60 @@ class TestCASClient(OsfTestCase):
         with assert_raises(cas.CasHTTPError):
             self.client.profile('invalid-access-token')
 
+    @httpretty.activate
+    def test_profile_is_cached_until_token_revoked(self):
+        user = UserFactory()
+        url = furl.furl(self.base_url)
+        url.path.segments.extend(('oauth2', 'profile',))
+        httpretty.register_uri(
+            httpretty.GET,
+            url.url,
+            body=json.dumps({'id': user._id, 'scope': ['osf.full_read']}),
+            status=200,
+        )
+        httpretty.register_uri(httpretty.POST, self.client.get_auth_token_revocation_url(), status=204)
+        access_token = fake.md5()
+
+        resp = self.client.profile(access_token)
+        assert_equal(resp.user, user._id)
+        assert_equal(resp.attributes['accessTokenScope'], {'osf.full_read'})
+        cached = self.client.profile(access_token)
+        assert_equal(cached.user, user._id)
+        assert_equal(cached.attributes['accessTokenScope'], {'osf.full_read'})
+        assert_equal(cached.attributes['accessToken'], access_token)
+        assert_equal(len([req for req in httpretty.HTTPretty.latest_requests if req.method == 'GET']), 1)
+
+        self.client.revoke_tokens({'token': access_token})
+        assert_is_none(cas.token_cache.get(access_token))
+
+    def test_token_cache_does_not_store_access_token(self):
+        cache = cas.TokenCache(max_size=2, ttl=60)
+        cache.set('secret-token', cas.CasResponse(
+            authenticated=True,
+            user='a',
+            attributes={'accessToken': 'secret-token', 'accessTokenScope': {'osf.full_read'}},
+        ))
+        for expires, user, attributes in cache._entries.values():
+            assert_not_in('accessToken', attributes)
+            assert_not_in('secret-token', attributes.values())
+        assert_equal(cache.get('secret-token').attributes['accessToken'], 'secret-token')
+
+    def test_token_cache_evicts_least_recently_used(self):
+        cache = cas.TokenCache(max_size=2, ttl=60)
+        for token in ('a', 'b'):
+            cache.set(token, cas.CasResponse(authenticated=True, user=token))
+        cache.get('a')
+        cache.set('c', cas.CasResponse(authenticated=True, user='c'))
+        assert_is_none(cache.get('b'))
+        assert_equal(cache.get('a').user, 'a')
+        assert_equal(cache.get('c').user, 'c')
+
+    def test_token_cache_expires_entries(self):
+        cache = cas.TokenCache(max_size=2, ttl=60)
+        cache.set('a', cas.CasResponse(authenticated=True, user='a'))
+        with mock.patch('framework.auth.cas.time.time', return_value=time.time() + 61):
+            assert_is_none(cache.get('a'))
+
     @httpretty.activate
     def test_application_token_revocation_succeeds(self):
         url = self.client.get_auth_token_revocation_url()
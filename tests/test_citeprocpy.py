@@ -1,8 +1,12 @@
+import collections
 import os
 import json
+
+import mock
 from nose.tools import *
 
-from api.citations.utils import render_citation
+from api.citations import utils
+from api.citations.utils import get_style, render_citation, render_citations
 
 
 class Node:
@@ -43,3 +47,22 @@ class TestCiteprocpy:
                 print k
         assert(len(not_matches) == 0)
 
+    def test_render_citations(self):
+        node = Node()
+        assert_equal(render_citations([node, node], 'apa'), [render_citation(node, 'apa')] * 2)
+
+
+@mock.patch.object(utils, '_styles', collections.OrderedDict())
+class TestStyleCache:
+    def test_styles_are_parsed_once(self):
+        assert_is(get_style('apa'), get_style('apa'))
+
+    @mock.patch('api.citations.utils.CITATION_STYLE_CACHE_SIZE', 2)
+    def test_least_recently_used_style_is_dropped(self):
+        utils._styles.clear()
+        apa = get_style('apa')
+        get_style('modern-language-association')
+        get_style('apa')
+        get_style('chicago-author-date')
+        assert_equal(len(utils._styles), 2)
+        assert_is(get_style('apa'), apa)
@@ -2,6 +2,8 @@ import collections
 import mock
 from babel import dates, Locale
 from schema import Schema, And, Use, Or
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from nose.tools import *  # noqa PEP8 asserts
@@ -9,7 +11,7 @@ from nose.tools import *  # noqa PEP8 asserts
 from framework.auth import Auth
 from osf.models import Comment, NotificationDigest, NotificationSubscription, Guid, OSFUser
 
-from website.notifications.tasks import get_users_emails, send_users_email, group_by_node, remove_notifications
+from website.notifications.tasks import get_users_emails, get_users_email_batches, send_users_email, group_by_node, remove_notifications
 from website.notifications import constants
 from website.notifications import emails
 from website.notifications import utils
@@ -1240,6 +1242,20 @@ class TestCompileSubscriptions(NotificationTestCase):
         subs = emails.compile_subscriptions(node5, 'file_updated')
         assert_equal(subs, {'email_transactional': [], 'email_digest': [self.user_1._id], 'none': []})
 
+    def test_query_count_does_not_grow_with_depth(self):
+        self.base_sub.email_transactional.add(self.user_1, self.user_2, self.user_3)
+        self.base_sub.save()
+        node = self.shared_node
+        with CaptureQueriesContext(connection) as shallow:
+            emails.compile_subscriptions(node, 'file_updated')
+        for _ in range(4):
+            node = factories.NodeFactory(parent=node, creator=self.user_1)
+        with CaptureQueriesContext(connection) as deep:
+            subs = emails.compile_subscriptions(node, 'file_updated')
+        assert_equal(len(deep.captured_queries), len(shallow.captured_queries))
+        # user_2 reads the new nodes as an admin on the project, user_3 cannot read them
+        assert_equal(set(subs['email_transactional']), {self.user_1._id, self.user_2._id})
+
 
 class TestMoveSubscription(NotificationTestCase):
     def setUp(self):
@@ -1589,6 +1605,27 @@ class TestSendEmails(NotificationTestCase):
         assert_true(mock_notify.called)
         assert_equal(mock_notify.call_count, 1)
 
+    @mock.patch('website.mails.render_message', return_value='rendered')
+    def test_store_emails_renders_once_per_localization(self, mock_render):
+        recipients = [factories.UserFactory(timezone='Etc/UTC', locale='en_US') for _ in range(3)]
+        recipients.append(factories.UserFactory(timezone='Europe/Moscow', locale='ru_RU'))
+        disabled = factories.UserFactory()
+        disabled.date_disabled = timezone.now()
+        disabled.save()
+        recipient_ids = [recipient._id for recipient in recipients] + [disabled._id, self.user._id]
+
+        emails.store_emails(recipient_ids, 'email_digest', 'file_updated', self.user, self.node,
+                            timezone.now(), message='updated a file', profile_image_url='', url='')
+
+        assert_equal(mock_render.call_count, 2)
+        digests = NotificationDigest.objects.filter(event='file_updated')
+        assert_equal(
+            set(digests.values_list('user__id', flat=True)),
+            set(recipient.id for recipient in recipients)
+        )
+        for digest in digests:
+            assert_equal(digest.node_lineage, [self.project._id, self.node._id])
+
     def test_get_settings_url_for_node(self):
         url = emails.get_settings_url(self.project._id, self.user)
         assert_equal(url, self.project.absolute_url + 'settings/')
@@ -1766,6 +1803,43 @@ class TestSendDigest(OsfTestCase):
         digest_ids = [d._id, d2._id, d3._id]
         remove_notifications(email_notification_ids=digest_ids)
 
+    def test_get_users_email_batches(self):
+        send_type = 'email_transactional'
+        users = [self.user_1, self.user_2, factories.UserFactory()]
+        for user in users:
+            factories.NotificationDigestFactory(
+                user=user,
+                send_type=send_type,
+                timestamp=self.timestamp,
+                message='Hello',
+                node_lineage=[self.project._id]
+            )
+
+        batches = list(get_users_email_batches(send_type, batch_size=2))
+        assert_equal(
+            [[group['user_id'] for group in batch] for batch in batches],
+            [[self.user_1._id, self.user_2._id], [users[2]._id]]
+        )
+
+        shards = [
+            [group['user_id'] for group in get_users_emails(send_type, shard=shard, shards=2)]
+            for shard in range(2)
+        ]
+        assert_equal(sorted(shards[0] + shards[1]), sorted(user._id for user in users))
+        for user in users:
+            assert_in(user._id, shards[user.id % 2])
+
+    @mock.patch('website.mails.send_mail')
+    @mock.patch('website.notifications.tasks.send_users_email.delay')
+    def test_send_users_email_fans_out_to_shards(self, mock_delay, mock_send_mail):
+        with mock.patch.object(settings, 'NOTIFICATION_DIGEST_SHARDS', 3):
+            send_users_email('email_digest')
+        assert_equal(
+            mock_delay.call_args_list,
+            [mock.call('email_digest', shard=shard, shards=3) for shard in range(3)]
+        )
+        assert_false(mock_send_mail.called)
+
     @mock.patch('website.mails.send_mail')
     def test_send_users_email_called_with_correct_args(self, mock_send_mail):
         send_type = 'email_transactional'
@@ -1816,6 +1890,29 @@ class TestSendDigest(OsfTestCase):
         send_users_email(send_type)
         assert_false(mock_send_mail.called)
 
+    @mock.patch('website.mails.send_mail')
+    def test_send_users_email_keeps_digests_of_failed_emails(self, mock_send_mail):
+        send_type = 'email_transactional'
+        digests = [
+            factories.NotificationDigestFactory(
+                user=user,
+                send_type=send_type,
+                event='comment_replies',
+                timestamp=timezone.now(),
+                message='Hello',
+                node_lineage=[self.project._id]
+            )
+            for user in [self.user_1, self.user_2]
+        ]
+        mock_send_mail.side_effect = [Exception, None]
+
+        send_users_email(send_type)
+        assert_equal(mock_send_mail.call_count, 2)
+        assert_equal(
+            list(NotificationDigest.objects.filter(send_type=send_type).values_list('_id', flat=True)),
+            [digests[0]._id]
+        )
+
     def test_remove_sent_digest_notifications(self):
         d = factories.NotificationDigestFactory(
             event='comment_replies',
@@ -34,7 +34,7 @@ from framework.auth.utils import impute_names_model, ensure_external_identity_un
 from framework.auth.views import login_and_register_handler
 from framework.celery_tasks import handlers
 from framework.exceptions import HTTPError
-from framework.transactions.handlers import no_auto_transaction
+from framework.transactions.handlers import no_auto_transaction, read_only_request
 from website import mailchimp_utils, mails, settings, language
 from addons.osfstorage import settings as osfstorage_settings
 from osf.models import AbstractNode, NodeLog
@@ -99,6 +99,12 @@ def error500():
     UserFactory()
     return 'error', 500
 
+@mock_app.route('/readonly500', methods=['GET', 'POST'])
+@read_only_request
+def read_only_error500():
+    UserFactory()
+    return 'error', 500
+
 @mock_app.route('/noautotransact')
 @no_auto_transaction
 def no_auto_transact():
@@ -122,6 +128,16 @@ class TestViewsAreAtomic(OsfTestCase):
         self.app.get('/noautotransact', expect_errors=True)
         assert_equal(OSFUser.objects.count(), original_user_count + 1)
 
+    def test_safe_requests_to_read_only_views_are_not_atomic(self):
+        original_user_count = OSFUser.objects.count()
+        self.app.get('/readonly500', expect_errors=True)
+        assert_equal(OSFUser.objects.count(), original_user_count + 1)
+
+    def test_unsafe_requests_to_read_only_views_are_atomic(self):
+        original_user_count = OSFUser.objects.count()
+        self.app.post('/readonly500', expect_errors=True)
+        assert_equal(OSFUser.objects.count(), original_user_count)
+
 
 class TestViewingProjectWithPrivateLink(OsfTestCase):
 
@@ -19,10 +19,14 @@ from framework.flask import add_handlers, app
 # Import necessary to initialize the root logger
 from framework.logging import logger as root_logger  # noqa
 from framework.postcommit_tasks import handlers as postcommit_handlers
+from framework.routing import warm_templates
 from framework.sentry import sentry
+from framework.templates import template_cache
 from framework.transactions import handlers as transaction_handlers
+from osf.utils import permission_cache
 # Imports necessary to connect signals
 from website.archiver import listeners  # noqa
+from website import mails
 from website.mails import listeners  # noqa
 from website.notifications import listeners  # noqa
 from website.identifiers import listeners  # noqa
@@ -57,6 +61,8 @@ def attach_handlers(app, settings):
     add_handlers(app, celery_task_handlers.handlers)
     add_handlers(app, transaction_handlers.handlers)
     add_handlers(app, postcommit_handlers.handlers)
+    add_handlers(app, {'before_request': permission_cache.enable,
+                       'teardown_request': permission_cache.disable})
 
     # Attach handler for checking view-only link keys.
     # NOTE: This must be attached AFTER the TokuMX to avoid calling
@@ -120,6 +126,9 @@ def init_app(settings_module='website.settings', set_backends=True, routes=True,
     if attach_request_handlers:
         attach_handlers(app, settings)
 
+    if routes and settings.WARM_TEMPLATE_CACHE and not app.debug:
+        warm_template_cache()
+
     if app.debug:
         logger.info("Sentry disabled; Flask's debug mode enabled")
     else:
@@ -132,6 +141,12 @@ def init_app(settings_module='website.settings', set_backends=True, routes=True,
     return app
 
 
+def warm_template_cache():
+    """Compile the templates of the routes and emails before the first requests."""
+    compiled = warm_templates() + mails.warm_templates()
+    logger.info('Compiled {} templates: {}'.format(compiled, template_cache.stats()))
+
+
 def apply_middlewares(flask_app, settings):
     # Use ProxyFix to respect X-Forwarded-Proto header
     # https://stackoverflow.com/questions/23347387/x-forwarded-proto-and-flask
@@ -288,13 +288,10 @@ def archive_success(dst_pk, job_pk):
 
     :param str dst_pk: primary key of registration Node
 
-    note:: At first glance this task makes redundant calls to utils.get_file_map (which
-    returns a generator yielding  (<sha256>, <file_metadata>) pairs) on the dst Node. Two
-    notes about utils.get_file_map: 1) this function memoizes previous results to reduce
-    overhead and 2) this function returns a generator that lazily fetches the file metadata
-    of child Nodes (it is possible for a selected file to belong to a child Node) using a
-    non-recursive DFS. Combined this allows for a relatively effient implementation with
-    seemingly redundant calls.
+    note:: Selected files are looked up by sha256 in an index of every file on the dst Node
+    and its components (it is possible for a selected file to belong to a child Node). The
+    index and the underlying file maps live in a utils.FileMapCache scoped to this job, so
+    they are built once for all schemas and released when the task finishes.
     """
     create_app_context()
     dst = AbstractNode.load(dst_pk)
@@ -303,9 +300,10 @@ def archive_success(dst_pk, job_pk):
     # questions. These files are references to files on the unregistered Node, and
     # consequently we must migrate those file paths after archiver has run. Using
     # sha256 hashes is a convenient way to identify files post-archival.
+    file_map_cache = utils.FileMapCache()
     for schema in dst.registered_schema.all():
         if schema.has_files:
-            utils.migrate_file_metadata(dst, schema)
+            utils.migrate_file_metadata(dst, schema, file_map_cache)
     job = ArchiveJob.load(job_pk)
     if not job.sent:
         job.sent = True
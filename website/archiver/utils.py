@@ -1,4 +1,4 @@
-import functools
+from collections import defaultdict, deque, OrderedDict
 
 from framework.auth import Auth
 
@@ -176,45 +176,81 @@ def before_archive(node, user):
     )
     job.set_targets()
 
-def _do_get_file_map(file_tree):
-    """Reduces a tree of folders and files into a list of (<sha256>, <file_metadata>) pairs
+class FileMapCache(object):
+    """Size-bounded LRU of file maps keyed by node id, plus a per-root sha256 index used
+    by `find_registration_file`. Create one per `ArchiveJob` so its contents are released
+    with the job; `get_file_map` falls back to a small process-wide instance.
     """
-    file_map = []
-    stack = [file_tree]
-    while len(stack):
-        tree_node = stack.pop(0)
-        if tree_node['kind'] == 'file':
-            file_map.append((tree_node['extra']['hashes']['sha256'], tree_node))
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size or settings.ARCHIVE_FILE_MAP_CACHE_SIZE
+        self._entries = OrderedDict()
+
+    def _get(self, key, compute):
+        if key in self._entries:
+            value = self._entries.pop(key)
         else:
-            stack = stack + tree_node['children']
-    return file_map
-
-def _memoize_get_file_map(func):
-    cache = {}
-    @functools.wraps(func)
-    def wrapper(node):
-        if node._id not in cache:
+            value = compute()
+        self._entries[key] = value
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return value
+
+    def get_file_map(self, node):
+        def compute():
             osf_storage = node.get_addon('osfstorage')
-            file_tree = osf_storage._get_file_tree(user=node.creator)
-            cache[node._id] = _do_get_file_map(file_tree)
-        return func(node, cache[node._id])
-    return wrapper
+            return list(osf_storage._iter_file_tree_files(user=node.creator))
+        return self._get(('file_map', node._id), compute)
+
+    def get_sha256_index(self, node):
+        """Map each sha256 in the file maps of `node` and its primary descendants to a
+        list of (<file_metadata>, <node_id>, <registered_from_id>) tuples
+        """
+        def compute():
+            index = defaultdict(list)
+            for tree_node in _iter_primary_node_tree(node):
+                registered_from_id = tree_node.registered_from._id if tree_node.registered_from else None
+                for sha256, value in self.get_file_map(tree_node):
+                    index[sha256].append((value, tree_node._id, registered_from_id))
+            return dict(index)
+        return self._get(('sha256_index', node._id), compute)
+
+    def clear(self):
+        self._entries.clear()
 
-@_memoize_get_file_map
-def get_file_map(node, file_map):
-    """
-    note:: file_map is injected implictly by the decorator; this method is called like:
 
-    get_file_map(node)
+_default_file_map_cache = None
+
+def _get_default_file_map_cache():
+    global _default_file_map_cache
+    if _default_file_map_cache is None:
+        _default_file_map_cache = FileMapCache()
+    return _default_file_map_cache
+
+def _iter_primary_node_tree(node):
+    queue = deque([node])
+    while queue:
+        tree_node = queue.popleft()
+        yield tree_node
+        queue.extend(tree_node.nodes_primary)
+
+def get_file_map(node, file_map_cache=None):
+    """Yield (<sha256>, <file_metadata>, <node_id>) for every file in the osfstorage of
+    `node` and its primary descendants. File maps are read through `file_map_cache`, which
+    defaults to a bounded process-wide cache.
     """
-    for (key, value) in file_map:
-        yield (key, value, node._id)
-    for child in node.nodes_primary:
-        for key, value, node_id in get_file_map(child):
-            yield (key, value, node_id)
-
-def find_registration_file(value, node):
-    from osf.models import AbstractNode
+    file_map_cache = file_map_cache or _get_default_file_map_cache()
+    file_map = file_map_cache.get_file_map(node)
+
+    def iter_file_map():
+        for (key, value) in file_map:
+            yield (key, value, node._id)
+        for child in node.nodes_primary:
+            for key, value, node_id in get_file_map(child, file_map_cache):
+                yield (key, value, node_id)
+    return iter_file_map()
+
+def find_registration_file(value, node, file_map_cache=None):
     orig_sha256 = value['sha256']
     orig_name = sanitize.unescape_entities(
         value['selectedFileName'],
@@ -224,17 +260,16 @@ def find_registration_file(value, node):
         }
     )
     orig_node = value['nodeId']
-    file_map = get_file_map(node)
-    for sha256, value, node_id in file_map:
-        registered_from_id = AbstractNode.load(node_id).registered_from._id
-        if sha256 == orig_sha256 and registered_from_id == orig_node and orig_name == value['name']:
-            return value, node_id
+    file_map_cache = file_map_cache or _get_default_file_map_cache()
+    for file_value, node_id, registered_from_id in file_map_cache.get_sha256_index(node).get(orig_sha256, []):
+        if registered_from_id == orig_node and orig_name == file_value['name']:
+            return file_value, node_id
     return None, None
 
-def find_registration_files(values, node):
+def find_registration_files(values, node, file_map_cache=None):
     ret = []
     for i in range(len(values.get('extra', []))):
-        ret.append(find_registration_file(values['extra'][i], node) + (i,))
+        ret.append(find_registration_file(values['extra'][i], node, file_map_cache) + (i,))
     return ret
 
 def get_title_for_question(schema, path):
@@ -289,12 +324,12 @@ def deep_get(obj, path):
         item = item[key]
     return item
 
-def migrate_file_metadata(dst, schema):
+def migrate_file_metadata(dst, schema, file_map_cache=None):
     metadata = dst.registered_meta[schema._id]
     missing_files = []
     selected_files = find_selected_files(schema, metadata)
     for path, selected in selected_files.items():
-        for registration_file, node_id, index in find_registration_files(selected, dst):
+        for registration_file, node_id, index in find_registration_files(selected, dst, file_map_cache):
             if not registration_file:
                 missing_files.append({
                     'file_name': selected['extra'][index]['selectedFileName'],
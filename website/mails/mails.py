@@ -18,12 +18,15 @@ Usage: ::
     mails.send_mail('foo@bar.com', mails.CONFIRM_EMAIL, user=user)
 
 """
+import contextlib
 import os
 import logging
+import threading
 
 from mako.lookup import TemplateLookup, Template
 
 from framework.email import tasks
+from framework.templates import find_templates, template_cache
 from website import settings
 
 logger = logging.getLogger(__name__)
@@ -32,11 +35,14 @@ EMAIL_TEMPLATES_DIR = os.path.join(settings.TEMPLATES_PATH, 'emails')
 
 _tpl_lookup = TemplateLookup(
     directories=[EMAIL_TEMPLATES_DIR],
+    module_directory=os.path.join(settings.MAKO_MODULE_DIRECTORY, 'emails'),
 )
 
 TXT_EXT = '.txt.mako'
 HTML_EXT = '.html.mako'
 
+_batch = threading.local()
+
 
 class Mail(object):
     """An email object.
@@ -51,6 +57,7 @@ class Mail(object):
     def __init__(self, tpl_prefix, subject, categories=None):
         self.tpl_prefix = tpl_prefix
         self._subject = subject
+        self._subject_template = None
         self.categories = categories
 
     def html(self, **context):
@@ -64,15 +71,40 @@ class Mail(object):
         return render_message(tpl_name, **context)
 
     def subject(self, **context):
-        return Template(self._subject).render(**context)
+        if self._subject_template is None:
+            self._subject_template = Template(self._subject)
+        return self._subject_template.render(**context)
+
+
+def get_template(tpl_name):
+    return template_cache.get_template(
+        _tpl_lookup,
+        os.path.join(EMAIL_TEMPLATES_DIR, tpl_name),
+        cached=not settings.DEBUG_MODE,
+    )
 
 
 def render_message(tpl_name, **context):
     """Render an email message."""
-    tpl = _tpl_lookup.get_template(tpl_name)
+    tpl = get_template(tpl_name)
     return tpl.render(**context)
 
 
+def template_references(tpl_name, name):
+    """Whether the source of a template mentions ``name``, e.g. to tell if its
+    output can vary with a context variable.
+    """
+    return name in get_template(tpl_name).source
+
+
+def warm_templates():
+    """Compile the email templates before the first emails are sent.
+
+    :return: Number of templates compiled
+    """
+    return template_cache.warm(_tpl_lookup, find_templates(EMAIL_TEMPLATES_DIR))
+
+
 def send_mail(to_addr, mail, mimetype='plain', from_addr=None, mailer=None,
             username=None, password=None, callback=None, attachment_name=None, attachment_content=None, **context):
     """Send an email from the OSF.
@@ -118,6 +150,10 @@ def send_mail(to_addr, mail, mimetype='plain', from_addr=None, mailer=None,
 
     logger.debug('Preparing to send...')
     if settings.USE_EMAIL:
+        if getattr(_batch, 'messages', None) is not None and mailer is tasks.send_email and not callback:
+            logger.debug('Adding to batch...')
+            _batch.messages.append(kwargs)
+            return
         if settings.USE_CELERY:
             logger.debug('Sending via celery...')
             return mailer.apply_async(kwargs=kwargs, link=callback)
@@ -130,6 +166,31 @@ def send_mail(to_addr, mail, mimetype='plain', from_addr=None, mailer=None,
             return ret
 
 
+@contextlib.contextmanager
+def batched():
+    """Collect the emails sent with `send_mail` inside the block and send them in
+    batches of ``settings.MAIL_BATCH_SIZE`` when it exits, each batch over a single
+    pooled connection. Emails with a callback or a custom mailer are sent as usual.
+    Nothing is sent if the block raises.
+    """
+    if getattr(_batch, 'messages', None) is not None:
+        # Already batching, the outermost block sends
+        yield
+        return
+    _batch.messages = []
+    try:
+        yield
+        messages = _batch.messages
+    finally:
+        _batch.messages = None
+    for i in range(0, len(messages), settings.MAIL_BATCH_SIZE):
+        chunk = messages[i:i + settings.MAIL_BATCH_SIZE]
+        if settings.USE_CELERY:
+            tasks.send_emails.apply_async(kwargs={'messages': chunk})
+        else:
+            tasks.send_emails(chunk)
+
+
 def get_english_article(word):
     """
     Decide whether to use 'a' or 'an' for a given English word.
@@ -1,6 +1,6 @@
 from babel import dates, core, Locale
 
-from osf.models import AbstractNode, OSFUser, NotificationDigest, NotificationSubscription
+from osf.models import AbstractNode, Contributor, OSFUser, NotificationDigest, NotificationSubscription
 
 from website import mails
 from website.notifications import constants
@@ -95,55 +95,136 @@ def store_emails(recipient_ids, notification_type, event, user, node, timestamp,
     context['user'] = user
     node_lineage_ids = get_node_lineage(node) if node else []
 
-    for recipient_id in recipient_ids:
-        if recipient_id == user._id:
-            continue
-        recipient = OSFUser.load(recipient_id)
-        if recipient.is_disabled:
-            continue
-        context['localized_timestamp'] = localize_timestamp(timestamp, recipient)
-        context['recipient'] = recipient
-        message = mails.render_message(template, **context)
+    recipients = OSFUser.objects.filter(
+        guids___id__in=[recipient_id for recipient_id in recipient_ids if recipient_id != user._id],
+        date_disabled__isnull=True,
+    )
+    # Only templates that address the recipient need one render per recipient,
+    # the rest differ by localized timestamp alone
+    per_recipient = mails.template_references(template, 'recipient')
+    localized_timestamps = {}
+    messages = {}
+    digests = []
+
+    for recipient in recipients:
+        locale_key = (recipient.timezone, recipient.locale)
+        if locale_key not in localized_timestamps:
+            localized_timestamps[locale_key] = localize_timestamp(timestamp, recipient)
+        context['localized_timestamp'] = localized_timestamps[locale_key]
 
-        digest = NotificationDigest(
+        message_key = (context['localized_timestamp'], recipient.id if per_recipient else None)
+        if message_key not in messages:
+            context['recipient'] = recipient
+            messages[message_key] = mails.render_message(template, **context)
+
+        digests.append(NotificationDigest(
             timestamp=timestamp,
             send_type=notification_type,
             event=event,
             user=recipient,
-            message=message,
+            message=messages[message_key],
             node_lineage=node_lineage_ids
-        )
-        digest.save()
+        ))
+
+    NotificationDigest.objects.bulk_create(digests)
 
 
-def compile_subscriptions(node, event_type, event=None, level=0):
-    """Recurse through node and parents for subscriptions.
+def compile_subscriptions(node, event_type, event=None):
+    """Resolve the subscriptions of node and its parents for an event.
+
+    Subscriptions on a node take precedence over those on its parents, and
+    subscriptions to a particular event over those to its event type. Users
+    only count at a level if they can read that level's node, and must be able
+    to read ``node`` to be notified at all.
 
     :param node: current node
     :param event_type: Generally node_subscriptions_available
     :param event: Particular event such a file_updated that has specific file subs
-    :param level: How deep the recursion is
     :return: a dict of notification types with lists of users.
     """
-    subscriptions = check_node(node, event_type)
+    lineage = get_node_lineage_ids(node)  # [(pk, _id)] from the node to the top most project
+    # Levels from the most to the least specific subscription
+    levels = [(pk, utils.to_subscription_key(guid, event_type)) for pk, guid in lineage]
     if event:
-        subscriptions = check_node(node, event)  # Gets particular event subscriptions
-        parent_subscriptions = compile_subscriptions(node, event_type, level=level + 1)  # get node and parent subs
-    elif node.parent_id:
-        parent_subscriptions = \
-            compile_subscriptions(AbstractNode.load(node.parent_id), event_type, level=level + 1)
-    else:
-        parent_subscriptions = check_node(None, event_type)
-    for notification_type in parent_subscriptions:
-        p_sub_n = parent_subscriptions[notification_type]
-        p_sub_n.extend(subscriptions[notification_type])
-        for nt in subscriptions:
-            if notification_type != nt:
-                p_sub_n = list(set(p_sub_n).difference(set(subscriptions[nt])))
-        if level == 0:
-            p_sub_n, removed = utils.separate_users(node, p_sub_n)
-        parent_subscriptions[notification_type] = p_sub_n
-    return parent_subscriptions
+        levels.insert(0, (node.pk, utils.to_subscription_key(node._id, event)))
+
+    subscription_ids = dict(
+        NotificationSubscription.objects.filter(_id__in=[key for _, key in levels]).values_list('_id', 'id')
+    )
+    subscribed = {
+        subscription_id: {notification_type: set() for notification_type in constants.NOTIFICATION_TYPES}
+        for subscription_id in subscription_ids.values()
+    }
+    for notification_type in constants.NOTIFICATION_TYPES:
+        through = getattr(NotificationSubscription, notification_type).through
+        rows = through.objects.filter(
+            notificationsubscription_id__in=subscription_ids.values(),
+            osfuser__date_disabled__isnull=True,
+        ).values_list('notificationsubscription_id', 'osfuser_id')
+        for subscription_id, user_id in rows:
+            subscribed[subscription_id][notification_type].add(user_id)
+
+    user_ids = set()
+    for users in subscribed.values():
+        for ids in users.values():
+            user_ids.update(ids)
+    readable = get_readable_user_ids([pk for pk, _ in lineage], user_ids)
+
+    compiled = {notification_type: set() for notification_type in constants.NOTIFICATION_TYPES}
+    for node_id, key in reversed(levels):
+        subscription_id = subscription_ids.get(key)
+        if subscription_id is None:
+            continue
+        level = {
+            notification_type: users & readable[node_id]
+            for notification_type, users in subscribed[subscription_id].items()
+        }
+        for notification_type in compiled:
+            users = compiled[notification_type] | level[notification_type]
+            for nt in level:
+                if notification_type != nt:
+                    users -= level[nt]
+            compiled[notification_type] = users
+
+    guids = dict(OSFUser.objects.filter(id__in=user_ids).values_list('id', 'guids___id')) if user_ids else {}
+    return {
+        notification_type: [guids[user_id] for user_id in users if user_id in readable[node.pk]]
+        for notification_type, users in compiled.items()
+    }
+
+
+def get_node_lineage_ids(node):
+    """Get the primary keys and guids of a node and its parents, in order from
+    the node to the top most project, with two queries.
+    """
+    ancestor_ids = node.get_ancestor_ids()
+    guids = dict(AbstractNode.objects.filter(id__in=ancestor_ids).values_list('id', 'guids___id')) if ancestor_ids else {}
+    return [(node.pk, node._id)] + [(pk, guids[pk]) for pk in ancestor_ids]
+
+
+def get_readable_user_ids(lineage_ids, user_ids):
+    """Map each node of a lineage, ordered from the node to the top most project,
+    to the users in ``user_ids`` who can read it: its read contributors plus the
+    admins of it or any of its parents.
+    """
+    readers = {node_id: set() for node_id in lineage_ids}
+    admins = {node_id: set() for node_id in lineage_ids}
+    if user_ids:
+        contributors = Contributor.objects.filter(
+            node_id__in=lineage_ids, user_id__in=user_ids
+        ).values_list('node_id', 'user_id', 'read', 'admin')
+        for node_id, user_id, read, admin in contributors:
+            if read:
+                readers[node_id].add(user_id)
+            if admin:
+                admins[node_id].add(user_id)
+
+    readable = {}
+    inherited_admins = set()
+    for node_id in reversed(lineage_ids):
+        inherited_admins |= admins[node_id]
+        readable[node_id] = readers[node_id] | inherited_admins
+    return readable
 
 
 def check_node(node, event):
@@ -174,13 +255,7 @@ def get_node_lineage(node):
     """ Get a list of node ids in order from the node to top most project
         e.g. [parent._id, node._id]
     """
-    lineage = [node._id]
-
-    while node.parent_id:
-        node = node.parent_node
-        lineage = [node._id] + lineage
-
-    return lineage
+    return [guid for pk, guid in reversed(get_node_lineage_ids(node))]
 
 
 def get_settings_url(uid, user):
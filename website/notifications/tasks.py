@@ -1,47 +1,71 @@
 """
 Tasks for making even transactional emails consolidated.
 """
-import itertools
-
 from django.db import connection
 
 from framework.celery_tasks import app as celery_app
 from framework.sentry import log_exception
 from osf.models import OSFUser
 from osf.models import NotificationDigest
-from website import mails
+from website import mails, settings
 from website.notifications.utils import NotificationsDict
 
 
 @celery_app.task(name='website.notifications.tasks.send_users_email', max_retries=0)
-def send_users_email(send_type):
+def send_users_email(send_type, shard=None, shards=None):
     """Find pending Emails and amalgamates them into a single Email.
 
+    Without a shard, the work is split into settings.NOTIFICATION_DIGEST_SHARDS
+    tasks by user id when there is more than one shard.
+
     :param send_type
+    :param shard: which of the `shards` to send, by user id modulo `shards`
+    :param shards: total number of shards
     :return:
     """
-    grouped_emails = get_users_emails(send_type)
-    for group in grouped_emails:
-        user = OSFUser.load(group['user_id'])
-        if not user:
-            log_exception()
-            continue
-        info = group['info']
-        notification_ids = [message['_id'] for message in info]
-        sorted_messages = group_by_node(info)
-        if sorted_messages:
-            if not user.is_disabled:
-                mails.send_mail(
-                    to_addr=user.username,
-                    mimetype='html',
-                    mail=mails.DIGEST,
-                    name=user.fullname,
-                    message=sorted_messages,
-                )
-            remove_notifications(email_notification_ids=notification_ids)
-
-
-def get_users_emails(send_type):
+    if shard is None:
+        shards = settings.NOTIFICATION_DIGEST_SHARDS
+        if shards > 1:
+            for shard in range(shards):
+                send_users_email.delay(send_type, shard=shard, shards=shards)
+            return
+        shard = 0
+
+    for batch in get_users_email_batches(send_type, shard=shard, shards=shards or 1):
+        users = {
+            user._id: user
+            for user in OSFUser.objects.filter(guids___id__in=[group['user_id'] for group in batch])
+        }
+        # The batch is only sent if the block exits cleanly, so a user's digests
+        # are removed exactly when their email has been handed to the mailer
+        sent_notification_ids = []
+        with mails.batched():
+            for group in batch:
+                user = users.get(group['user_id'])
+                if not user:
+                    log_exception()
+                    continue
+                info = group['info']
+                sorted_messages = group_by_node(info)
+                if sorted_messages:
+                    if not user.is_disabled:
+                        try:
+                            mails.send_mail(
+                                to_addr=user.username,
+                                mimetype='html',
+                                mail=mails.DIGEST,
+                                name=user.fullname,
+                                message=sorted_messages,
+                            )
+                        except Exception:
+                            # Keep the user's digests for the next run
+                            log_exception()
+                            continue
+                    sent_notification_ids.extend(message['_id'] for message in info)
+        remove_notifications(email_notification_ids=sent_notification_ids)
+
+
+def get_users_emails(send_type, shard=0, shards=1):
     """Get all emails that need to be sent.
 
     :param send_type: from NOTIFICATION_TYPES
@@ -62,29 +86,64 @@ def get_users_emails(send_type):
             }
         }
     """
+    for batch in get_users_email_batches(send_type, shard=shard, shards=shards):
+        for group in batch:
+            yield group
+
+
+def get_users_email_batches(send_type, shard=0, shards=1, batch_size=None):
+    """Walk the users with pending emails in order of user id, `batch_size` users
+    at a time, so only one batch of digests is held in memory.
+
+    :param send_type: from NOTIFICATION_TYPES
+    :param shard: only include users whose id modulo `shards` is `shard`
+    :param shards: total number of shards
+    :return: Iterable of lists of dicts, in the format of `get_users_emails`
+    """
+    batch_size = batch_size or settings.NOTIFICATION_DIGEST_BATCH_SIZE
 
     sql = """
-    SELECT json_build_object(
-            'user_id', osf_guid._id,
-            'info', json_agg(
+    SELECT batch.user_id, (
+            SELECT osf_guid._id FROM osf_guid
+            WHERE osf_guid.object_id = batch.user_id
+            AND osf_guid.content_type_id = (SELECT id FROM django_content_type WHERE model = 'osfuser')
+            ORDER BY osf_guid.id ASC
+            LIMIT 1
+        ), batch.info
+    FROM (
+        SELECT nd.user_id, json_agg(
                 json_build_object(
                     'message', nd.message,
                     'node_lineage', nd.node_lineage,
                     '_id', nd._id
-                )
-            )
-        )
-    FROM osf_notificationdigest AS nd
-      LEFT JOIN osf_guid ON nd.user_id = osf_guid.object_id
-    WHERE send_type = %s
-    AND osf_guid.content_type_id = (SELECT id FROM django_content_type WHERE model = 'osfuser')
-    GROUP BY osf_guid.id
-    ORDER BY osf_guid.id ASC
+                ) ORDER BY nd.id
+            ) AS info
+        FROM osf_notificationdigest AS nd
+        WHERE nd.send_type = %s
+        AND nd.user_id > %s
+        AND nd.user_id %% %s = %s
+        GROUP BY nd.user_id
+        ORDER BY nd.user_id ASC
+        LIMIT %s
+    ) AS batch
+    ORDER BY batch.user_id ASC
     """
 
-    with connection.cursor() as cursor:
-        cursor.execute(sql, [send_type, ])
-        return itertools.chain.from_iterable(cursor.fetchall())
+    last_user_id = 0
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [send_type, last_user_id, shards, shard, batch_size])
+            rows = cursor.fetchall()
+        if not rows:
+            return
+        yield [
+            {'user_id': guid, 'info': info}
+            for _, guid, info in rows
+            if guid is not None
+        ]
+        last_user_id = rows[-1][0]
+        if len(rows) < batch_size:
+            return
 
 
 def group_by_node(notifications, limit=15):
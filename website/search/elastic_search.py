@@ -3,12 +3,15 @@
 
 from __future__ import division
 
+import contextlib
 import copy
 import functools
 import logging
 import math
 import re
+import threading
 import unicodedata
+from collections import OrderedDict
 from framework import sentry
 
 import six
@@ -68,6 +71,8 @@ INDEX = settings.ELASTIC_INDEX
 
 CLIENT = None
 
+_buffer_local = threading.local()
+
 
 def client():
     global CLIENT
@@ -102,6 +107,108 @@ def client():
     return CLIENT
 
 
+class IndexingBuffer(object):
+    """Collects index and delete actions and sends them to Elasticsearch with the
+    bulk API. Actions are keyed by (index, doc_type, id), so writing the same document
+    several times before a flush only sends the last version.
+    """
+
+    def __init__(self, chunk_size=None):
+        self.chunk_size = chunk_size or settings.ELASTIC_BULK_CHUNK_SIZE
+        self.actions = OrderedDict()
+
+    def __len__(self):
+        return len(self.actions)
+
+    def _add(self, action):
+        key = (action['_index'], action['_type'], action['_id'])
+        self.actions.pop(key, None)
+        self.actions[key] = action
+        if len(self.actions) >= self.chunk_size:
+            self.flush()
+
+    def index(self, index, doc_type, id, body):
+        self._add({
+            '_op_type': 'index',
+            '_index': index,
+            '_type': doc_type,
+            '_id': id,
+            '_source': body,
+        })
+
+    def update(self, index, doc_type, id, doc):
+        key = (index, doc_type, id)
+        action = self.actions.get(key)
+        if action is None:
+            self._add({
+                '_op_type': 'update',
+                '_index': index,
+                '_type': doc_type,
+                '_id': id,
+                'doc': doc,
+            })
+        elif action['_op_type'] == 'index':
+            action['_source'].update(doc)
+        elif action['_op_type'] == 'update':
+            action['doc'].update(doc)
+
+    def delete(self, index, doc_type, id):
+        self._add({
+            '_op_type': 'delete',
+            '_index': index,
+            '_type': doc_type,
+            '_id': id,
+        })
+
+    def flush(self):
+        if not self.actions:
+            return
+        actions, self.actions = list(self.actions.values()), OrderedDict()
+        flush_actions(actions)
+
+
+@contextlib.contextmanager
+def buffered_indexing():
+    """Buffer every search document write made inside the block and send them with
+    the bulk API when the outermost block exits. Nested blocks share the outer buffer.
+    """
+    if getattr(_buffer_local, 'buffer', None) is not None:
+        yield _buffer_local.buffer
+        return
+
+    _buffer_local.buffer = IndexingBuffer()
+    try:
+        yield _buffer_local.buffer
+        _buffer_local.buffer.flush()
+    finally:
+        _buffer_local.buffer = None
+
+
+def index_document(index, doc_type, id, body):
+    buffer_ = getattr(_buffer_local, 'buffer', None)
+    if buffer_ is not None:
+        buffer_.index(index, doc_type, id, body)
+    else:
+        client().index(index=index, doc_type=doc_type, id=id, body=body, refresh=settings.ELASTIC_REFRESH_ON_WRITE)
+
+
+def update_document(index, doc_type, id, doc):
+    """Update fields of a document. Documents that are not in the index are skipped."""
+    buffer_ = getattr(_buffer_local, 'buffer', None)
+    if buffer_ is not None:
+        buffer_.update(index, doc_type, id, doc)
+    else:
+        client().update(index=index, doc_type=doc_type, id=id, body={'doc': doc}, refresh=settings.ELASTIC_REFRESH_ON_WRITE, ignore=[404])
+
+
+def delete_document(index, doc_type, id):
+    buffer_ = getattr(_buffer_local, 'buffer', None)
+    if buffer_ is not None:
+        buffer_.delete(index, doc_type, id)
+    else:
+        client().delete(index=index, doc_type=doc_type, id=id, refresh=settings.ELASTIC_REFRESH_ON_WRITE, ignore=[404])
+
+
 def requires_search(func):
     def wrapped(*args, **kwargs):
         if client() is not None:
@@ -133,6 +240,28 @@ def requires_search(func):
     return wrapped
 
 
+@requires_search
+def flush_actions(actions):
+    """Send buffered actions with one bulk request per chunk. Deleting or updating a
+    document that is not in the index is not an error; any other failure raises a
+    SearchException once all chunks have been sent, so that indexing tasks are retried.
+    """
+    _, errors = helpers.bulk(
+        client(),
+        actions,
+        chunk_size=settings.ELASTIC_BULK_CHUNK_SIZE,
+        raise_on_error=False,
+        refresh=settings.ELASTIC_REFRESH_ON_WRITE,
+    )
+    errors = [
+        error for error in errors
+        if not any(error.get(op_type, {}).get('status') == 404 for op_type in ('delete', 'update'))
+    ]
+    if errors:
+        logger.error('Failed to index {} search documents: {!r}'.format(len(errors), errors[:10]))
+        raise exceptions.SearchException(errors)
+
+
 @requires_search
 def get_aggregations(query, doc_type):
     query['aggregations'] = {
@@ -235,24 +364,31 @@ def search(query, index=None, doc_type='_all', raw=False):
     }
     return return_value
 
+PARENT_CATEGORIES = {'file', 'project', 'component', 'registration', 'preprint'}
+
 def format_results(results):
+    # Documents indexed before parent info was stored need their parents loaded
+    parents = load_parents([
+        result.get('parent_id') for result in results
+        if result.get('category') in PARENT_CATEGORIES and 'parent_info' not in result
+    ])
     ret = []
     for result in results:
+        if result.get('category') in PARENT_CATEGORIES:
+            parent_info = result['parent_info'] if 'parent_info' in result else parents.get(result.get('parent_id'))
         if result.get('category') == 'user':
             result['url'] = '/profile/' + result['id']
         elif result.get('category') == 'file':
-            parent_info = load_parent(result.get('parent_id'))
             result['parent_url'] = parent_info.get('url') if parent_info else None
             result['parent_title'] = parent_info.get('title') if parent_info else None
         elif result.get('category') in {'project', 'component', 'registration', 'preprint'}:
-            result = format_result(result, result.get('parent_id'))
+            result = format_result(result, parent_info)
         elif not result.get('category'):
             continue
         ret.append(result)
     return ret
 
-def format_result(result, parent_id=None):
-    parent_info = load_parent(parent_id)
+def format_result(result, parent_info=None):
     formatted_result = {
         'contributors': result['contributors'],
         'wiki_link': result['url'] + 'wiki/',
@@ -282,12 +418,18 @@ def format_result(result, parent_id=None):
     return formatted_result
 
 
-def load_parent(parent_id):
-    parent = AbstractNode.load(parent_id)
+# Fields of a node that its children's parent_info is built from
+PARENT_INFO_FIELDS = {'title', 'is_public'}
+
+
+def serialize_parent_info(parent):
+    """The parent details shown with search results, stored in the documents of
+    the parent's children and of their files.
+    """
     if parent is None:
         return None
     parent_info = {}
-    if parent is not None and parent.is_public:
+    if parent.is_public:
         parent_info['title'] = parent.title
         parent_info['url'] = parent.url
         parent_info['is_registration'] = parent.is_registration
@@ -300,6 +442,17 @@ def load_parent(parent_id):
     return parent_info
 
 
+def load_parents(parent_ids):
+    """Parent info of the nodes with the given ids, keyed by id, with one query."""
+    parent_ids = {parent_id for parent_id in parent_ids if parent_id}
+    if not parent_ids:
+        return {}
+    return {
+        parent._id: serialize_parent_info(parent)
+        for parent in AbstractNode.objects.filter(guids___id__in=parent_ids)
+    }
+
+
 COMPONENT_CATEGORIES = set(settings.NODE_CATEGORY_MAP.keys())
 
 def get_doctype_from_node(node):
@@ -316,11 +469,12 @@ def get_doctype_from_node(node):
         return node.category
 
 @celery_app.task(bind=True, max_retries=5, default_retry_delay=60)
-def update_node_async(self, node_id, index=None, bulk=False):
+def update_node_async(self, node_id, index=None, bulk=False, saved_fields=None):
     AbstractNode = apps.get_model('osf.AbstractNode')
     node = AbstractNode.load(node_id)
     try:
-        update_node(node=node, index=index, bulk=bulk, async=True)
+        with buffered_indexing():
+            update_node(node=node, index=index, bulk=bulk, async=True, saved_fields=saved_fields)
     except Exception as exc:
         self.retry(exc=exc)
 
@@ -329,15 +483,17 @@ def update_user_async(self, user_id, index=None):
     OSFUser = apps.get_model('osf.OSFUser')
     user = OSFUser.objects.get(id=user_id)
     try:
-        update_user(user, index)
+        with buffered_indexing():
+            update_user(user, index)
     except Exception as exc:
         self.retry(exc)
 
 def serialize_node(node, category):
     NodeWikiPage = apps.get_model('addons_wiki.NodeWikiPage')
+    RenderedWiki = apps.get_model('addons_wiki.RenderedWiki')
 
     elastic_document = {}
-    parent_id = node.parent_id
+    parent = node.parent_node
 
     try:
         normalized_title = six.u(node.title)
@@ -369,7 +525,8 @@ def serialize_node(node, category):
         'is_pending_embargo': node.is_pending_embargo,
         'registered_date': node.registered_date,
         'wikis': {},
-        'parent_id': parent_id,
+        'parent_id': parent._id if parent else None,
+        'parent_info': serialize_parent_info(parent),
         'date_created': node.created,
         'license': serialize_node_license_record(node.license),
         'affiliated_institutions': list(node.affiliated_institutions.values_list('name', flat=True)),
@@ -378,29 +535,55 @@ def serialize_node(node, category):
         'preprint_url': node.preprint_url,
     }
     if not node.is_retracted:
-        for wiki in NodeWikiPage.objects.filter(guids___id__in=node.wiki_pages_current.values()):
+        wikis = list(NodeWikiPage.objects.filter(guids___id__in=node.wiki_pages_current.values()))
+        rendered = RenderedWiki.get_many([(wiki.content, node) for wiki in wikis])
+        for wiki, rendered_wiki in zip(wikis, rendered):
             # '.' is not allowed in field names in ES2
-            elastic_document['wikis'][wiki.page_name.replace('.', ' ')] = wiki.raw_text(node)
+            elastic_document['wikis'][wiki.page_name.replace('.', ' ')] = rendered_wiki.text
 
     return elastic_document
 
 @requires_search
-def update_node(node, index=None, bulk=False, async=False):
+def update_node(node, index=None, bulk=False, async=False, saved_fields=None):
+    """Index the node and its files. The documents of its children are updated
+    too when `saved_fields` includes fields their parent_info is built from.
+    """
     from addons.osfstorage.models import OsfStorageFile
     index = index or INDEX
-    for file_ in paginated(OsfStorageFile, Q(node=node)):
-        update_file(file_, index=index)
+    with buffered_indexing():
+        for file_ in paginated(OsfStorageFile, Q(node=node)):
+            update_file(file_, index=index)
 
-    is_qa_node = bool(set(settings.DO_NOT_INDEX_LIST['tags']).intersection(node.tags.all().values_list('name', flat=True))) or any(substring in node.title for substring in settings.DO_NOT_INDEX_LIST['titles'])
-    if node.is_deleted or not node.is_public or node.archiving or (node.is_spammy and settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH) or node.is_quickfiles or is_qa_node:
-        delete_doc(node._id, node, index=index)
-    else:
-        category = get_doctype_from_node(node)
-        elastic_document = serialize_node(node, category)
-        if bulk:
-            return elastic_document
+        is_qa_node = bool(set(settings.DO_NOT_INDEX_LIST['tags']).intersection(node.tags.all().values_list('name', flat=True))) or any(substring in node.title for substring in settings.DO_NOT_INDEX_LIST['titles'])
+        if node.is_deleted or not node.is_public or node.archiving or (node.is_spammy and settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH) or node.is_quickfiles or is_qa_node:
+            delete_doc(node._id, node, index=index)
         else:
-            client().index(index=index, doc_type=category, id=node._id, body=elastic_document, refresh=True)
+            category = get_doctype_from_node(node)
+            elastic_document = serialize_node(node, category)
+            if bulk:
+                return elastic_document
+            else:
+                index_document(index, category, node._id, elastic_document)
+        if not bulk and not node.is_deleted and PARENT_INFO_FIELDS.intersection(saved_fields or []):
+            update_children_parent_info(node, index)
+
+def update_children_parent_info(node, index):
+    """Store the current details of `node` in the documents of its public children
+    and their files, which show them with search results.
+    """
+    from addons.osfstorage.models import OsfStorageFile
+    parent_info = serialize_parent_info(node)
+    children = AbstractNode.objects.filter(
+        _parents__parent=node,
+        _parents__is_node_link=False,
+        is_public=True,
+        is_deleted=False,
+    )
+    for child in children:
+        update_document(index, get_doctype_from_node(child), child._id, {'parent_info': parent_info})
+    file_ids = OsfStorageFile.objects.filter(node__in=children).values_list('_id', flat=True)
+    for file_id in file_ids.iterator():
+        update_document(index, 'file', file_id, {'parent_info': parent_info})
 
 def bulk_update_nodes(serialize, nodes, index=None):
     """Updates the list of input projects
@@ -455,18 +638,13 @@ def update_user(user, index=None):
     index = index or INDEX
     if not user.is_active:
         try:
-            client().delete(index=index, doc_type='user', id=user._id, refresh=True, ignore=[404])
-            # update files in their quickfiles node if the user has been marked as spam
-            if 'spam_confirmed' in user.system_tags:
-                quickfiles = QuickFilesNode.objects.get_for_user(user)
-                for quickfile_id in quickfiles.files.values_list('_id', flat=True):
-                    client().delete(
-                        index=index,
-                        doc_type='file',
-                        id=quickfile_id,
-                        refresh=True,
-                        ignore=[404]
-                    )
+            with buffered_indexing():
+                delete_document(index, 'user', user._id)
+                # update files in their quickfiles node if the user has been marked as spam
+                if 'spam_confirmed' in user.system_tags:
+                    quickfiles = QuickFilesNode.objects.get_for_user(user)
+                    for quickfile_id in quickfiles.files.values_list('_id', flat=True):
+                        delete_document(index, 'file', quickfile_id)
         except NotFoundError:
             pass
         return
@@ -505,7 +683,7 @@ def update_user(user, index=None):
         'boost': 2,  # TODO(fabianvf): Probably should make this a constant or something
     }
 
-    client().index(index=index, doc_type='user', body=user_doc, id=user._id, refresh=True)
+    index_document(index, 'user', user._id, user_doc)
 
 @requires_search
 def update_file(file_, index=None, delete=False):
@@ -514,13 +692,7 @@ def update_file(file_, index=None, delete=False):
     # TODO: Can remove 'not file_.name' if we remove all base file nodes with name=None
     file_node_is_qa = bool(set(settings.DO_NOT_INDEX_LIST['tags']).intersection(file_.node.tags.all().values_list('name', flat=True))) or any(substring in file_.node.title for substring in settings.DO_NOT_INDEX_LIST['titles'])
     if not file_.name or not file_.node.is_public or delete or file_.node.is_deleted or file_.node.archiving or file_node_is_qa:
-        client().delete(
-            index=index,
-            doc_type='file',
-            id=file_._id,
-            refresh=True,
-            ignore=[404]
-        )
+        delete_document(index, 'file', file_._id)
         return
 
     # We build URLs manually here so that this function can be
@@ -532,6 +704,7 @@ def update_file(file_, index=None, delete=False):
     )
     node_url = '/{node_id}/'.format(node_id=file_.node._id)
 
+    parent = file_.node.parent_node
     guid_url = None
     file_guid = file_.get_guid(create=False)
     if file_guid:
@@ -545,26 +718,21 @@ def update_file(file_, index=None, delete=False):
         'category': 'file',
         'node_url': node_url,
         'node_title': file_.node.title,
-        'parent_id': file_.node.parent_node._id if file_.node.parent_node else None,
+        'parent_id': parent._id if parent else None,
+        'parent_info': serialize_parent_info(parent),
         'is_registration': file_.node.is_registration,
         'is_retracted': file_.node.is_retracted,
         'extra_search_terms': clean_splitters(file_.name),
     }
 
-    client().index(
-        index=index,
-        doc_type='file',
-        body=file_doc,
-        id=file_._id,
-        refresh=True
-    )
+    index_document(index, 'file', file_._id, file_doc)
 
 @requires_search
 def update_institution(institution, index=None):
     index = index or INDEX
     id_ = institution._id
     if institution.is_deleted:
-        client().delete(index=index, doc_type='institution', id=id_, refresh=True, ignore=[404])
+        delete_document(index, 'institution', id_)
     else:
         institution_doc = {
             'id': id_,
@@ -574,7 +742,7 @@ def update_institution(institution, index=None):
             'name': institution.name,
         }
 
-        client().index(index=index, doc_type='institution', body=institution_doc, id=id_, refresh=True)
+        index_document(index, 'institution', id_, institution_doc)
 
 @requires_search
 def delete_all():
@@ -612,6 +780,9 @@ def create_index(index=None):
                 }
             }
         }
+        if type_ in project_like_types or type_ == 'file':
+            # Only shown with results, so not indexed
+            mapping['properties']['parent_info'] = {'type': 'object', 'enabled': False}
         if type_ in project_like_types:
             analyzers = {field: ENGLISH_ANALYZER_PROPERTY
                          for field in analyzed_fields}
@@ -649,7 +820,7 @@ def delete_doc(elastic_document_id, node, index=None, category=None):
             category = 'preprint'
         else:
             category = node.project_or_component
-    client().delete(index=index, doc_type=category, id=elastic_document_id, refresh=True, ignore=[404])
+    delete_document(index, category, elastic_document_id)
 
 
 @requires_search
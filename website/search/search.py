@@ -28,7 +28,8 @@ def search(query, index=None, doc_type=None, raw=None):
 def update_node(node, index=None, bulk=False, async=True, saved_fields=None):
     kwargs = {
         'index': index,
-        'bulk': bulk
+        'bulk': bulk,
+        'saved_fields': sorted(saved_fields) if saved_fields else None,
     }
     if async:
         node_id = node._id
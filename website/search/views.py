@@ -12,6 +12,7 @@ from framework.auth.decorators import collect_auth
 from framework.auth.decorators import must_be_logged_in
 from framework.exceptions import HTTPError
 from framework import sentry
+from framework.transactions.handlers import read_only_request
 from website import language
 from osf.models import OSFUser, AbstractNode
 from website.project.views.contributor import get_node_contributors_abbrev
@@ -52,6 +53,7 @@ def handle_search_errors(func):
     return wrapped
 
 
+@read_only_request
 @handle_search_errors
 def search_search(**kwargs):
     _type = kwargs.get('type', None)
@@ -10,6 +10,7 @@ from django.utils import timezone
 from elasticsearch import helpers
 
 import website.search.search as search
+from addons.wiki.models import RenderedWiki
 from framework.database import paginated
 from scripts import utils as script_utils
 from osf.models import OSFUser, Institution, AbstractNode
@@ -32,7 +33,9 @@ def migrate_nodes(index, query=None):
 
     for page_number, page in enumerate(pages):
         logger.info('Updating page {} / {}'.format(page_number + 1, total_pages))
-        AbstractNode.bulk_update_search(page, index=index)
+        nodes = list(page)
+        RenderedWiki.prerender(nodes)
+        AbstractNode.bulk_update_search(nodes, index=index)
 
     logger.info('Nodes migrated: {}'.format(total))
 
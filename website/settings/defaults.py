@@ -42,6 +42,8 @@ EXPIRATION_TIME_DICT = {
 }
 
 CITATION_STYLES_PATH = os.path.join(BASE_PATH, 'static', 'vendor', 'bower_components', 'styles')
+# Number of parsed citation styles kept in memory by each process
+CITATION_STYLE_CACHE_SIZE = 50
 
 # Minimum seconds between forgot password email attempts
 SEND_EMAIL_THROTTLE = 30
@@ -87,6 +89,11 @@ EXTERNAL_EMBER_APPS = {}
 
 LOG_PATH = os.path.join(APP_PATH, 'logs')
 TEMPLATES_PATH = os.path.join(BASE_PATH, 'templates')
+# Mako compiles templates to modules here, where later workers load them from
+MAKO_MODULE_DIRECTORY = '/tmp/mako_modules'
+# Compile the page and email templates at startup instead of on their first render.
+# Not done in DEBUG_MODE, where templates aren't cached
+WARM_TEMPLATE_CACHE = True
 ANALYTICS_PATH = os.path.join(BASE_PATH, 'analytics')
 
 # User management & registration
@@ -105,6 +112,11 @@ ELASTIC_KWARGS = {
     # 'client_cert': None,
     # 'client_key': None
 }
+# Force an index refresh after each search write. Leave off in production and let the index's
+# refresh_interval make documents searchable; tests turn it on to search right after writing.
+ELASTIC_REFRESH_ON_WRITE = False
+# Maximum number of buffered search document writes sent in one bulk request
+ELASTIC_BULK_CHUNK_SIZE = 500
 
 # Sessions
 COOKIE_NAME = 'osf'
@@ -142,6 +154,10 @@ FAKE_EMAIL_DOMAIN = 'cos.io'
 MAIL_SERVER = 'smtp.sendgrid.net'
 MAIL_USERNAME = 'osf-smtp'
 MAIL_PASSWORD = ''  # Set this in local.py
+# Authenticated SMTP connections each worker keeps open between emails
+MAIL_SMTP_POOL_SIZE = 2
+# Emails per framework.email.tasks.send_emails task when sending with website.mails.batched
+MAIL_BATCH_SIZE = 100
 
 # OR, if using Sendgrid's API
 # WARNING: If `SENDGRID_WHITELIST_MODE` is True,
@@ -150,6 +166,11 @@ SENDGRID_API_KEY = None
 SENDGRID_WHITELIST_MODE = False
 SENDGRID_EMAIL_WHITELIST = []
 
+# Notification digests are sent for this many users at a time
+NOTIFICATION_DIGEST_BATCH_SIZE = 1000
+# Number of celery tasks send_users_email splits users between, by user id
+NOTIFICATION_DIGEST_SHARDS = 1
+
 # Mailchimp
 MAILCHIMP_API_KEY = None
 MAILCHIMP_WEBHOOK_SECRET_KEY = 'CHANGEME'  # OSF secret key to ensure webhook is secure
@@ -184,6 +205,11 @@ DB_NAME = 'osf20130903'
 DB_USER = None
 DB_PASS = None
 
+# Run GET/HEAD/OPTIONS requests to Flask views annotated with
+# framework.transactions.handlers.read_only_request in autocommit rather than a
+# per-request transaction, allowing their reads to be served by a replica
+READ_ONLY_REQUESTS = True
+
 # Cache settings
 SESSION_HISTORY_LENGTH = 5
 SESSION_HISTORY_IGNORE_RULES = [
@@ -279,6 +305,13 @@ SYSTEM_ADDED_ADDONS = {
     'node': [],
 }
 
+# Maximum number of page counter/user activity increments folded into their
+# aggregates per transaction by framework.analytics.fold_counter_increments
+ANALYTICS_FOLD_BATCH_SIZE = 10000
+# Seconds fold_counter_increments keeps folding batches before leaving the
+# remaining increments to the next run, which starts every minute
+ANALYTICS_FOLD_TIME_LIMIT = 50
+
 KEEN = {
     'public': {
         'project_id': None,
@@ -345,6 +378,10 @@ SHARE_URL = None
 SHARE_API_TOKEN = None  # Required to send project updates to SHARE
 
 CAS_SERVER_URL = 'http://localhost:8080'
+# Seconds to trust a validated OAuth2 access token before asking CAS again; 0 disables the cache.
+# Revocations are only seen immediately by the process that issued them, so keep this short.
+CAS_TOKEN_CACHE_TTL = 60
+CAS_TOKEN_CACHE_SIZE = 10000
 MFR_SERVER_URL = 'http://localhost:7778'
 
 ###### ARCHIVER ###########
@@ -357,6 +394,15 @@ ARCHIVE_TIMEOUT_TIMEDELTA = timedelta(1)  # 24 hours
 
 ENABLE_ARCHIVER = True
 
+# Maximum number of node file maps the archiver keeps in memory per cache
+ARCHIVE_FILE_MAP_CACHE_SIZE = 100
+
+# WaterButler metadata requests made while walking an addon's file tree, per provider and process
+WATERBUTLER_METADATA_RATE_LIMIT = 10  # requests per second
+WATERBUTLER_METADATA_BURST = 10
+# Number of folders fetched concurrently while walking an addon's file tree
+FILE_TREE_WALK_CONCURRENCY = 5
+
 JWT_SECRET = 'changeme'
 JWT_ALGORITHM = 'HS256'
 
@@ -399,6 +445,7 @@ class CeleryConfig:
         'website.search.elastic_search',
         'scripts.generate_sitemap',
         'scripts.generate_prereg_csv',
+        'scripts.remove_unused_rendered_wikis',
     }
 
     med_pri_modules = {
@@ -453,6 +500,7 @@ class CeleryConfig:
     # Modules to import when celery launches
     imports = (
         'framework.celery_tasks',
+        'framework.analytics',
         'framework.email.tasks',
         'website.mailchimp_utils',
         'website.notifications.tasks',
@@ -474,6 +522,7 @@ class CeleryConfig:
         'scripts.analytics.run_keen_events',
         'scripts.generate_sitemap',
         'scripts.premigrate_created_modified',
+        'scripts.remove_unused_rendered_wikis',
     )
 
     # Modules that need metrics and release requirements
@@ -583,6 +632,15 @@ class CeleryConfig:
                 'task': 'scripts.generate_sitemap',
                 'schedule': crontab(minute=0, hour=5),  # Daily 12:00 a.m.
             },
+            'remove_unused_rendered_wikis': {
+                'task': 'scripts.remove_unused_rendered_wikis',
+                'schedule': crontab(minute=0, hour=8, day_of_week=0),  # Sunday 3:00 a.m.
+                'kwargs': {'dry_run': False},
+            },
+            'fold_counter_increments': {
+                'task': 'framework.analytics.fold_counter_increments',
+                'schedule': crontab(minute='*'),  # Every minute
+            },
         }
 
         # Tasks that need metrics and release requirements
@@ -649,6 +707,9 @@ ENABLE_INSTITUTIONS = True
 ENABLE_VARNISH = False
 ENABLE_ESI = False
 VARNISH_SERVERS = []  # This should be set in local.py or cache invalidation won't work
+# Largest X-Ban-Keys header sent in one BAN, keys beyond it go in further BANs. Keep it
+# well under varnish's http_req_hdr_len (8k by default).
+VARNISH_BAN_KEYS_MAX_BYTES = 4096
 ESI_MEDIA_TYPES = {'application/vnd.api+json', 'application/json'}
 
 # Used for gathering meta information about the current build
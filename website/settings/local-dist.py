@@ -55,6 +55,7 @@ EXTERNAL_EMBER_APPS = {
 
 SEARCH_ENGINE = 'elastic'
 ELASTIC_TIMEOUT = 10
+ELASTIC_REFRESH_ON_WRITE = True
 
 # Email
 USE_EMAIL = False
@@ -36,6 +36,7 @@ EXTERNAL_EMBER_APPS = {
 }
 
 SEARCH_ENGINE = 'elastic'
+ELASTIC_REFRESH_ON_WRITE = True
 
 USE_EMAIL = False
 USE_CELERY = False